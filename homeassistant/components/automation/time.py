@@ -10,7 +10,8 @@ import logging
 import voluptuous as vol
 
 from homeassistant.core import callback
-from homeassistant.const import CONF_AT, CONF_PLATFORM, CONF_AFTER
+from homeassistant.const import (
+    CONF_AT, CONF_PLATFORM, CONF_AFTER, MATCH_ALL)
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.event import async_track_time_change
 
@@ -20,13 +21,30 @@ CONF_SECONDS = 'seconds'
 
 _LOGGER = logging.getLogger(__name__)
 
+
+def _time_pattern(maximum):
+    """Validate a value from 0 to maximum, '/divisor' or '*'."""
+    def validator(value):
+        """Validate the time pattern and return it."""
+        if isinstance(value, str) and value.startswith('/'):
+            vol.All(vol.Coerce(int), vol.Range(min=1),
+                    msg='invalid divisor')(value[1:])
+            return value
+        elif value == MATCH_ALL:
+            return value
+
+        return vol.All(vol.Coerce(int), vol.Range(min=0, max=maximum))(value)
+
+    return validator
+
+
 TRIGGER_SCHEMA = vol.All(vol.Schema({
     vol.Required(CONF_PLATFORM): 'time',
     CONF_AT: cv.time,
     CONF_AFTER: cv.time,
-    CONF_HOURS: vol.Any(vol.Coerce(int), vol.Coerce(str)),
-    CONF_MINUTES: vol.Any(vol.Coerce(int), vol.Coerce(str)),
-    CONF_SECONDS: vol.Any(vol.Coerce(int), vol.Coerce(str)),
+    CONF_HOURS: _time_pattern(23),
+    CONF_MINUTES: _time_pattern(59),
+    CONF_SECONDS: _time_pattern(59),
 }), cv.has_at_least_one_key(CONF_HOURS, CONF_MINUTES,
                             CONF_SECONDS, CONF_AT, CONF_AFTER))
 
@@ -9,6 +9,7 @@ import asyncio
 import collections
 from contextlib import suppress
 from datetime import timedelta
+import io
 import logging
 import hashlib
 from random import SystemRandom
@@ -45,6 +46,8 @@ STATE_STREAMING = 'streaming'
 STATE_IDLE = 'idle'
 
 DEFAULT_CONTENT_TYPE = 'image/jpeg'
+DEFAULT_FRAME_INTERVAL = 0.5  # seconds
+RESIZE_JPEG_QUALITY = 75
 ENTITY_IMAGE_URL = '/api/camera_proxy/{0}?token={1}'
 
 TOKEN_CHANGE_INTERVAL = timedelta(minutes=5)
@@ -99,6 +102,45 @@ def async_get_image(hass, entity_id, timeout=10):
         raise HomeAssistantError("Can't connect to {0}".format(url))
 
 
+def _resize_image(image, width, height):
+    """Return a JPEG of an image scaled down to fit width and height.
+
+    Return the image if it is a JPEG that fits already, and None if Pillow
+    is not installed or the image can't be decoded.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        _LOGGER.debug("Pillow is not installed, unable to resize image")
+        return None
+
+    # Pillow 5 raises DecompressionBombError for images that are too large
+    errors = (OSError, ValueError,
+              getattr(Image, 'DecompressionBombError', ValueError))
+
+    try:
+        img = Image.open(io.BytesIO(image))
+
+        if img.format == 'JPEG' and (not width or img.width <= width) and \
+                (not height or img.height <= height):
+            return image
+
+        # Decodes JPEGs at a reduced size when possible
+        img.thumbnail((width or img.width, height or img.height),
+                      Image.ANTIALIAS)
+
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        output = io.BytesIO()
+        img.save(output, 'JPEG', quality=RESIZE_JPEG_QUALITY)
+    except errors as err:
+        _LOGGER.debug("Unable to resize image: %s", err)
+        return None
+
+    return output.getvalue()
+
+
 @asyncio.coroutine
 def async_setup(hass, config):
     """Set up the camera component."""
@@ -167,6 +209,7 @@ class Camera(Entity):
         self.content_type = DEFAULT_CONTENT_TYPE
         self.access_tokens = collections.deque([], 2)
         self.async_update_token()
+        self._frame_broker = None
 
     @property
     def should_poll(self):
@@ -188,6 +231,19 @@ class Camera(Entity):
         """Return the camera brand."""
         return None
 
+    @property
+    def frame_interval(self):
+        """Return the minimum interval between fetches of an image."""
+        return DEFAULT_FRAME_INTERVAL
+
+    @property
+    def frame_broker(self):
+        """Return the broker sharing the images of the camera."""
+        if self._frame_broker is None:
+            self._frame_broker = CameraFrameBroker(self)
+
+        return self._frame_broker
+
     @property
     def motion_detection_enabled(self):
         """Return the camera motion detection status."""
@@ -230,15 +286,18 @@ class Camera(Entity):
                     self.content_type, len(img_bytes)),
                 'utf-8') + img_bytes + b'\r\n')
 
+        broker = self.frame_broker
+        frame_id = broker.async_subscribe()
         last_image = None
 
         try:
             while True:
-                img_bytes = yield from self.async_camera_image()
+                frame_id, img_bytes = yield from broker.async_next_frame(
+                    frame_id)
                 if not img_bytes:
                     break
 
-                if img_bytes and img_bytes != last_image:
+                if img_bytes != last_image:
                     write(img_bytes)
 
                     # Chrome seems to always ignore first picture,
@@ -249,13 +308,13 @@ class Camera(Entity):
                     last_image = img_bytes
                     yield from response.drain()
 
-                yield from asyncio.sleep(.5)
-
         except asyncio.CancelledError:
             _LOGGER.debug("Stream closed by frontend.")
             response = None
 
         finally:
+            broker.async_unsubscribe()
+
             if response is not None:
                 yield from response.write_eof()
 
@@ -311,6 +370,151 @@ class Camera(Entity):
                 _RND.getrandbits(256).to_bytes(32, 'little')).hexdigest())
 
 
+class CameraFrameBroker(object):
+    """Share the images of a camera between its streams and snapshots.
+
+    The camera is asked for an image at most once per frame_interval while
+    streams are open, every stream is sent the latest image. Snapshots
+    within frame_interval of the last fetch are served the same image.
+    Resized images are cached per size until the next image is fetched.
+    """
+
+    def __init__(self, camera):
+        """Initialize the broker."""
+        self.camera = camera
+        self.hass = camera.hass
+        self.frame = None
+        self.frame_id = 0
+        self._frame_time = None
+        self._frame_event = asyncio.Event(loop=self.hass.loop)
+        self._fetch = None
+        self._resized = {}
+        self._subscribers = 0
+        self._stream_task = None
+
+    @property
+    def fresh(self):
+        """Return if the last image is recent enough to be shared."""
+        return self.frame is not None and \
+            self.hass.loop.time() - self._frame_time < \
+            self.camera.frame_interval
+
+    @asyncio.coroutine
+    def async_get_frame(self):
+        """Return the last image if it is fresh, otherwise fetch one.
+
+        Concurrent callers wait for the same fetch.
+
+        This method is a coroutine.
+        """
+        if self.fresh:
+            return self.frame
+
+        if self._fetch is None:
+            self._fetch = self.hass.async_add_job(self._async_fetch())
+
+        frame = yield from asyncio.shield(self._fetch, loop=self.hass.loop)
+        return frame
+
+    @asyncio.coroutine
+    def async_get_resized(self, width, height):
+        """Return the image scaled down to fit width and height as a JPEG.
+
+        The image is resized in the executor once per size. Return None if
+        the image can't be resized.
+
+        This method is a coroutine.
+        """
+        frame = yield from self.async_get_frame()
+
+        if frame is None:
+            return None
+
+        resize = self._resized.get((width, height))
+
+        if resize is None:
+            resize = self._resized[(width, height)] = self.hass.async_add_job(
+                _resize_image, frame, width, height)
+
+        image = yield from asyncio.shield(resize, loop=self.hass.loop)
+        return image
+
+    @asyncio.coroutine
+    def _async_fetch(self):
+        """Fetch an image from the camera and wake up the streams."""
+        try:
+            frame = yield from self.camera.async_camera_image()
+        finally:
+            self._fetch = None
+
+        self._frame_time = self.hass.loop.time()
+        self._async_publish(frame)
+        return frame
+
+    @callback
+    def _async_publish(self, frame):
+        """Make an image the last image and wake up the streams."""
+        self.frame = frame or None
+        self.frame_id += 1
+        self._resized = {}
+        self._frame_event.set()
+        self._frame_event = asyncio.Event(loop=self.hass.loop)
+
+    @callback
+    def async_subscribe(self):
+        """Start streaming images, return the id of the last image to skip.
+
+        This method must be run in the event loop.
+        """
+        self._subscribers += 1
+
+        if self._stream_task is None:
+            self._stream_task = self.hass.async_add_job(self._async_stream())
+
+        # A new stream starts with the last image if it is fresh
+        return None if self.fresh else self.frame_id
+
+    @callback
+    def async_unsubscribe(self):
+        """Stop streaming images to a stream.
+
+        This method must be run in the event loop.
+        """
+        self._subscribers -= 1
+
+    @asyncio.coroutine
+    def async_next_frame(self, frame_id):
+        """Wait for an image after the one with frame_id.
+
+        Return the id and the image, which is None if the camera returned
+        no image.
+
+        This method is a coroutine.
+        """
+        while frame_id == self.frame_id:
+            yield from self._frame_event.wait()
+
+        return self.frame_id, self.frame
+
+    @asyncio.coroutine
+    def _async_stream(self):
+        """Fetch images while there are streams."""
+        try:
+            while self._subscribers:
+                try:
+                    yield from self.async_get_frame()
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Error fetching image from %s",
+                                      self.camera.entity_id)
+                    # End the streams like an empty image
+                    self._async_publish(None)
+
+                yield from asyncio.sleep(
+                    self.camera.frame_interval, loop=self.hass.loop)
+        finally:
+            self._stream_task = None
+
+
 class CameraView(HomeAssistantView):
     """Base CameraView."""
 
@@ -352,14 +556,31 @@ class CameraImageView(CameraView):
 
     @asyncio.coroutine
     def handle(self, request, camera):
-        """Serve camera image."""
+        """Serve camera image, scaled down if a width or height is given."""
+        try:
+            width = int(request.query.get('width', 0))
+            height = int(request.query.get('height', 0))
+        except ValueError:
+            return web.Response(status=400)
+
+        if width < 0 or height < 0:
+            return web.Response(status=400)
+
         with suppress(asyncio.CancelledError, asyncio.TimeoutError):
             with async_timeout.timeout(10, loop=request.app['hass'].loop):
-                image = yield from camera.async_camera_image()
+                image = None
+
+                if width or height:
+                    image = yield from camera.frame_broker.async_get_resized(
+                        width, height)
+                    content_type = DEFAULT_CONTENT_TYPE
+
+                if image is None:
+                    image = yield from camera.frame_broker.async_get_frame()
+                    content_type = camera.content_type
 
             if image:
-                return web.Response(body=image,
-                                    content_type=camera.content_type)
+                return web.Response(body=image, content_type=content_type)
 
         return web.Response(status=500)
 
@@ -8,9 +8,10 @@ import logging
 import voluptuous as vol
 
 from homeassistant.const import (CONF_HOST, CONF_PORT, CONF_PREFIX,
-                                 EVENT_LOGBOOK_ENTRY, EVENT_STATE_CHANGED,
-                                 STATE_UNKNOWN)
+                                 EVENT_LOGBOOK_ENTRY, STATE_UNKNOWN)
+from homeassistant.core import callback
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.exporter import BatchExporter, EXPORTER_SCHEMA
 import homeassistant.helpers.config_validation as cv
 
 REQUIREMENTS = ['datadog==0.15.0']
@@ -25,7 +26,7 @@ DEFAULT_RATE = 1
 DOMAIN = 'datadog'
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Required(CONF_HOST, default=DEFAULT_HOST): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
         vol.Optional(CONF_PREFIX, default=DEFAULT_PREFIX): cv.string,
@@ -42,57 +43,71 @@ def setup(hass, config):
     conf = config[DOMAIN]
     host = conf.get(CONF_HOST)
     port = conf.get(CONF_PORT)
-    sample_rate = conf.get(CONF_RATE)
-    prefix = conf.get(CONF_PREFIX)
 
     initialize(statsd_host=host, statsd_port=port)
 
+    exporter = DatadogExporter(hass, statsd, conf)
+
+    @callback
     def logbook_entry_listener(event):
-        """Listen for logbook entries and send them as events."""
+        """Listen for logbook entries and queue them as events."""
+        exporter.async_queue(exporter.convert_logbook_entry(event))
+
+    hass.bus.listen(EVENT_LOGBOOK_ENTRY, logbook_entry_listener)
+    exporter.start()
+
+    return True
+
+
+class DatadogExporter(BatchExporter):
+    """Send the states and logbook entries to Datadog in batches.
+
+    An item is a list of calls of the statsd client, a batch of items is
+    sent in as few packets as possible.
+    """
+
+    def __init__(self, hass, statsd, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'Datadog', conf)
+        self.statsd = statsd
+        self.sample_rate = conf.get(CONF_RATE)
+        self.prefix = conf.get(CONF_PREFIX)
+
+    def convert_logbook_entry(self, event):
+        """Return the calls to send a logbook entry as an event."""
         name = event.data.get('name')
         message = event.data.get('message')
 
-        statsd.event(
-            title="Home Assistant",
-            text="%%% \n **{}** {} \n %%%".format(name, message),
-            tags=[
+        return [('event', {
+            'title': "Home Assistant",
+            'text': "%%% \n **{}** {} \n %%%".format(name, message),
+            'tags': [
                 "entity:{}".format(event.data.get('entity_id')),
                 "domain:{}".format(event.data.get('domain'))
             ]
-        )
-
-        _LOGGER.debug('Sent event %s', event.data.get('entity_id'))
-
-    def state_changed_listener(event):
-        """Listen for new messages on the bus and sends them to Datadog."""
-        state = event.data.get('new_state')
+        })]
 
-        if state is None or state.state == STATE_UNKNOWN:
-            return
+    def convert(self, event):
+        """Return the calls to send the metrics of a state change."""
+        state = event.data['new_state']
 
-        if state.attributes.get('hidden') is True:
-            return
+        if state.state == STATE_UNKNOWN or \
+                state.attributes.get('hidden') is True:
+            return None
 
-        states = dict(state.attributes)
-        metric = "{}.{}".format(prefix, state.domain)
+        metric = "{}.{}".format(self.prefix, state.domain)
         tags = ["entity:{}".format(state.entity_id)]
+        calls = []
 
-        for key, value in states.items():
+        for key, value in state.attributes.items():
             if isinstance(value, (float, int)):
                 attribute = "{}.{}".format(metric, key.replace(' ', '_'))
-                statsd.gauge(
-                    attribute,
-                    value,
-                    sample_rate=sample_rate,
-                    tags=tags
-                )
-
-                _LOGGER.debug(
-                    'Sent metric %s: %s (tags: %s)',
-                    attribute,
-                    value,
-                    tags
-                )
+                calls.append(('gauge', {
+                    'metric': attribute,
+                    'value': value,
+                    'sample_rate': self.sample_rate,
+                    'tags': tags,
+                }))
 
         try:
             value = state_helper.state_as_number(state)
@@ -103,18 +118,25 @@ def setup(hass, config):
                 state.state,
                 tags
             )
-            return
+        else:
+            calls.append(('gauge', {
+                'metric': metric,
+                'value': value,
+                'sample_rate': self.sample_rate,
+                'tags': tags,
+            }))
 
-        statsd.gauge(
-            metric,
-            value,
-            sample_rate=sample_rate,
-            tags=tags
-        )
+        return calls or None
 
-        _LOGGER.debug('Sent metric %s: %s (tags: %s)', metric, value, tags)
+    def send(self, batch):
+        """Send a batch of calls in as few packets as possible."""
+        self.statsd.open_buffer()
 
-    hass.bus.listen(EVENT_LOGBOOK_ENTRY, logbook_entry_listener)
-    hass.bus.listen(EVENT_STATE_CHANGED, state_changed_listener)
+        try:
+            for calls in batch:
+                for method, kwargs in calls:
+                    getattr(self.statsd, method)(**kwargs)
+        finally:
+            self.statsd.close_buffer()
 
-    return True
+        _LOGGER.debug('Sent %s items', len(batch))
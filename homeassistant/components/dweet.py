@@ -5,15 +5,14 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/dweet/
 """
 import logging
-from datetime import timedelta
 
 import voluptuous as vol
 
-from homeassistant.const import (
-    CONF_NAME, CONF_WHITELIST, EVENT_STATE_CHANGED, STATE_UNKNOWN)
+from homeassistant.const import CONF_NAME, CONF_WHITELIST, STATE_UNKNOWN
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers import state as state_helper
-from homeassistant.util import Throttle
+from homeassistant.helpers.exporter import (
+    BatchExporter, ExportError, EXPORTER_SCHEMA, generate_entity_filter)
 
 REQUIREMENTS = ['dweepy==0.3.0']
 
@@ -21,10 +20,8 @@ _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'dweet'
 
-MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=1)
-
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Required(CONF_NAME): cv.string,
         vol.Required(CONF_WHITELIST, default=[]):
             vol.All(cv.ensure_list, [cv.entity_id]),
@@ -37,34 +34,47 @@ def setup(hass, config):
     conf = config[DOMAIN]
     name = conf.get(CONF_NAME)
     whitelist = conf.get(CONF_WHITELIST)
-    json_body = {}
 
-    def dweet_event_listener(event):
-        """Listen for new messages on the bus and sends them to Dweet.io."""
-        state = event.data.get('new_state')
-        if state is None or state.state in (STATE_UNKNOWN, '') \
-                or state.entity_id not in whitelist:
-            return
+    DweetExporter(hass, name, conf).start(
+        generate_entity_filter(include_entities=whitelist))
+
+    return True
+
+
+class DweetExporter(BatchExporter):
+    """Send the latest states to Dweet.io.
+
+    The states of a batch are merged into the collected data, which is sent
+    once per batch.
+    """
+
+    def __init__(self, hass, name, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'Dweet.io', conf)
+        self.thing = name
+        self.json_body = {}
+
+    def convert(self, event):
+        """Return the friendly name and value of a state."""
+        state = event.data['new_state']
+
+        if state.state in (STATE_UNKNOWN, ''):
+            return None
 
         try:
             _state = state_helper.state_as_number(state)
         except ValueError:
             _state = state.state
 
-        json_body[state.attributes.get('friendly_name')] = _state
-
-        send_data(name, json_body)
+        return state.attributes.get('friendly_name'), _state
 
-    hass.bus.listen(EVENT_STATE_CHANGED, dweet_event_listener)
-
-    return True
+    def send(self, batch):
+        """Send the collected data to Dweet.io."""
+        import dweepy
 
+        self.json_body.update(batch)
 
-@Throttle(MIN_TIME_BETWEEN_UPDATES)
-def send_data(name, msg):
-    """Send the collected data to Dweet.io."""
-    import dweepy
-    try:
-        dweepy.dweet_for(name, msg)
-    except dweepy.DweepyError:
-        _LOGGER.error("Error saving data to Dweet.io: %s", msg)
+        try:
+            dweepy.dweet_for(self.thing, self.json_body)
+        except dweepy.DweepyError as err:
+            raise ExportError(err)
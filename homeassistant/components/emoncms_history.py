@@ -4,18 +4,20 @@ A component which allows you to send data to Emoncms.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/emoncms_history/
 """
+import asyncio
 import logging
 from datetime import timedelta
 
-import requests
 import voluptuous as vol
 
 import homeassistant.helpers.config_validation as cv
 from homeassistant.const import (
     CONF_API_KEY, CONF_WHITELIST, CONF_URL, STATE_UNKNOWN, STATE_UNAVAILABLE,
     CONF_SCAN_INTERVAL)
+from homeassistant.core import callback
 from homeassistant.helpers import state as state_helper
-from homeassistant.helpers.event import track_point_in_time
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.exporter import BatchExporter, CONF_BATCH_SIZE
 from homeassistant.util import dt as dt_util
 
 _LOGGER = logging.getLogger(__name__)
@@ -34,32 +36,19 @@ CONFIG_SCHEMA = vol.Schema({
 }, extra=vol.ALLOW_EXTRA)
 
 
-def setup(hass, config):
+@asyncio.coroutine
+def async_setup(hass, config):
     """Set up the Emoncms history component."""
     conf = config[DOMAIN]
     whitelist = conf.get(CONF_WHITELIST)
 
-    def send_data(url, apikey, node, payload):
-        """Send payload data to Emoncms."""
-        try:
-            fullurl = '{}/input/post.json'.format(url)
-            data = {"apikey": apikey, "data": payload}
-            parameters = {"node": node}
-            req = requests.post(
-                fullurl, params=parameters, data=data, allow_redirects=True,
-                timeout=5)
-
-        except requests.exceptions.RequestException:
-            _LOGGER.error("Error saving data '%s' to '%s'", payload, fullurl)
-
-        else:
-            if req.status_code != 200:
-                _LOGGER.error(
-                    "Error saving data %s to %s (http status code = %d)",
-                    payload, fullurl, req.status_code)
-
-    def update_emoncms(time):
-        """Send whitelisted entities states reguarly to Emoncms."""
+    # Every snapshot is posted on its own, failed posts are retried
+    exporter = EmoncmsExporter(hass, conf)
+    exporter.async_start(track_states=False)
+
+    @callback
+    def async_update_emoncms(time):
+        """Queue the whitelisted entities states reguarly for Emoncms."""
         payload_dict = {}
 
         for entity_id in whitelist:
@@ -79,11 +68,29 @@ def setup(hass, config):
                                         for key, val in
                                         payload_dict.items())
 
-            send_data(conf.get(CONF_URL), conf.get(CONF_API_KEY),
-                      str(conf.get(CONF_INPUTNODE)), payload)
+            exporter.async_queue(payload)
 
-        track_point_in_time(hass, update_emoncms, time +
-                            timedelta(seconds=conf.get(CONF_SCAN_INTERVAL)))
+        async_track_point_in_time(
+            hass, async_update_emoncms,
+            time + timedelta(seconds=conf.get(CONF_SCAN_INTERVAL)))
 
-    update_emoncms(dt_util.utcnow())
+    async_update_emoncms(dt_util.utcnow())
     return True
+
+
+class EmoncmsExporter(BatchExporter):
+    """Post the snapshots of the whitelisted states to Emoncms."""
+
+    def __init__(self, hass, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'Emoncms', {CONF_BATCH_SIZE: 1})
+        self.url = '{}/input/post.json'.format(conf.get(CONF_URL))
+        self.apikey = conf.get(CONF_API_KEY)
+        self.node = str(conf.get(CONF_INPUTNODE))
+
+    @asyncio.coroutine
+    def async_send(self, batch):
+        """Post a snapshot to Emoncms."""
+        yield from self.async_post(
+            self.url, params={"node": self.node},
+            data={"apikey": self.apikey, "data": batch[0]})
@@ -4,19 +4,19 @@ Component that sends data to a Graphite installation.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/graphite/
 """
+import asyncio
 import logging
-import queue
+import select
 import socket
-import threading
 import time
 
 import voluptuous as vol
 
 import homeassistant.helpers.config_validation as cv
-from homeassistant.const import (
-    CONF_HOST, CONF_PORT, CONF_PREFIX, EVENT_HOMEASSISTANT_START,
-    EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED)
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PREFIX
 from homeassistant.helpers import state
+from homeassistant.helpers.exporter import (
+    BatchExporter, ExportError, EXPORTER_SCHEMA)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,7 +26,7 @@ DEFAULT_PREFIX = 'ha'
 DOMAIN = 'graphite'
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Optional(CONF_HOST, default=DEFAULT_HOST): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
         vol.Optional(CONF_PREFIX, default=DEFAULT_PREFIX): cv.string,
@@ -50,65 +50,32 @@ def setup(hass, config):
         _LOGGER.error('Not able to connect to Graphite')
         return False
 
-    GraphiteFeeder(hass, host, port, prefix)
+    GraphiteFeeder(hass, host, port, prefix, conf).start()
 
     return True
 
 
-class GraphiteFeeder(threading.Thread):
-    """Feed data to Graphite."""
+class GraphiteFeeder(BatchExporter):
+    """Feed data to Graphite.
 
-    def __init__(self, hass, host, port, prefix):
+    The lines of a batch are sent over a connection that is kept open
+    between batches, as long as Graphite doesn't close it.
+    """
+
+    def __init__(self, hass, host, port, prefix, conf=None):
         """Initialize the feeder."""
-        super(GraphiteFeeder, self).__init__(daemon=True)
-        self._hass = hass
+        super().__init__(hass, 'Graphite', conf)
         self._host = host
         self._port = port
         # rstrip any trailing dots in case they think they need it
         self._prefix = prefix.rstrip('.')
-        self._queue = queue.Queue()
-        self._quit_object = object()
-        self._we_started = False
-
-        hass.bus.listen_once(EVENT_HOMEASSISTANT_START,
-                             self.start_listen)
-        hass.bus.listen_once(EVENT_HOMEASSISTANT_STOP,
-                             self.shutdown)
-        hass.bus.listen(EVENT_STATE_CHANGED, self.event_listener)
+        self._sock = None
         _LOGGER.debug("Graphite feeding to %s:%i initialized",
                       self._host, self._port)
 
-    def start_listen(self, event):
-        """Start event-processing thread."""
-        _LOGGER.debug("Event processing thread started")
-        self._we_started = True
-        self.start()
-
-    def shutdown(self, event):
-        """Signal shutdown of processing event."""
-        _LOGGER.debug("Event processing signaled exit")
-        self._queue.put(self._quit_object)
-
-    def event_listener(self, event):
-        """Queue an event for processing."""
-        if self.is_alive() or not self._we_started:
-            _LOGGER.debug("Received event")
-            self._queue.put(event)
-        else:
-            _LOGGER.error(
-                "Graphite feeder thread has died, not queuing event!")
-
-    def _send_to_graphite(self, data):
-        """Send data to Graphite."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(10)
-        sock.connect((self._host, self._port))
-        sock.sendall(data.encode('ascii'))
-        sock.send('\n'.encode('ascii'))
-        sock.close()
-
-    def _report_attributes(self, entity_id, new_state):
-        """Report the attributes."""
+    def convert(self, event):
+        """Return the lines for the attributes of a state change."""
+        new_state = event.data['new_state']
         now = time.time()
         things = dict(new_state.attributes)
         try:
@@ -116,42 +83,43 @@ class GraphiteFeeder(threading.Thread):
         except ValueError:
             pass
         lines = ['%s.%s.%s %f %i' % (self._prefix,
-                                     entity_id, key.replace(' ', '_'),
-                                     value, now)
+                                     event.data['entity_id'],
+                                     key.replace(' ', '_'), value, now)
                  for key, value in things.items()
                  if isinstance(value, (float, int))]
         if not lines:
-            return
-        _LOGGER.debug("Sending to graphite: %s", lines)
+            return None
+        return '\n'.join(lines)
+
+    def send(self, batch):
+        """Send a batch of lines to Graphite."""
+        data = '\n'.join(batch) + '\n'
+
+        # Graphite never sends data, so a readable connection was closed
+        if self._sock is not None and \
+                select.select([self._sock], [], [], 0)[0]:
+            _LOGGER.debug("Graphite closed the connection")
+            self._close_socket()
+
         try:
-            self._send_to_graphite('\n'.join(lines))
-        except socket.gaierror:
-            _LOGGER.error("Unable to connect to host %s", self._host)
-        except socket.error:
-            _LOGGER.exception("Failed to send data to graphite")
-
-    def run(self):
-        """Run the process to export the data."""
-        while True:
-            event = self._queue.get()
-            if event == self._quit_object:
-                _LOGGER.debug("Event processing thread stopped")
-                self._queue.task_done()
-                return
-            elif (event.event_type == EVENT_STATE_CHANGED and
-                  event.data.get('new_state')):
-                _LOGGER.debug("Processing STATE_CHANGED event for %s",
-                              event.data['entity_id'])
-                try:
-                    self._report_attributes(event.data['entity_id'],
-                                            event.data['new_state'])
-                # pylint: disable=broad-except
-                except Exception:
-                    # Catch this so we can avoid the thread dying and
-                    # make it visible.
-                    _LOGGER.exception("Failed to process STATE_CHANGED event")
-            else:
-                _LOGGER.warning("Processing unexpected event type %s",
-                                event.event_type)
-
-            self._queue.task_done()
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self._sock.settimeout(10)
+                self._sock.connect((self._host, self._port))
+
+            self._sock.sendall(data.encode('ascii'))
+        except socket.error as err:
+            self._close_socket()
+            raise ExportError("Unable to send data to {}: {}".format(
+                self._host, err))
+
+    @asyncio.coroutine
+    def async_close(self):
+        """Close the connection to Graphite."""
+        self._close_socket()
+
+    def _close_socket(self):
+        """Close the connection to Graphite if it is open."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
@@ -5,35 +5,66 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/history/
 """
 import asyncio
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import timedelta
 from itertools import groupby
+import json
 import logging
+from operator import itemgetter
+import threading
 import time
 
+from aiohttp import web
 import voluptuous as vol
 
 from homeassistant.const import (
-    HTTP_BAD_REQUEST, CONF_DOMAINS, CONF_ENTITIES, CONF_EXCLUDE, CONF_INCLUDE)
+    HTTP_BAD_REQUEST, CONF_DOMAINS, CONF_ENTITIES, CONF_EXCLUDE, CONF_INCLUDE,
+    CONTENT_TYPE_JSON, EVENT_STATE_CHANGED)
 import homeassistant.util.dt as dt_util
+from homeassistant.core import State, callback, split_entity_id
 from homeassistant.components import recorder, script
 from homeassistant.components.frontend import register_built_in_panel
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.const import ATTR_HIDDEN
 from homeassistant.components.recorder.util import session_scope, execute
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util.async import (
+    run_callback_threadsafe, run_coroutine_threadsafe)
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'history'
 DEPENDENCIES = ['recorder', 'http']
 
+CONF_CACHE_WINDOW = 'cache_window'
+CONF_CACHE_MAX_STATES = 'cache_max_states'
+
+DATA_RECENT_HISTORY = 'history_recent'
+
+DEFAULT_CACHE_WINDOW = timedelta(days=1)
+DEFAULT_CACHE_MAX_STATES = 1000
+# States are kept a little longer than the cache window, so a period that
+# starts one window ago is still covered once the request is handled
+CACHE_WINDOW_MARGIN = timedelta(minutes=10)
+
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: recorder.FILTER_SCHEMA,
+    DOMAIN: recorder.FILTER_SCHEMA.extend({
+        vol.Optional(CONF_CACHE_WINDOW, default=DEFAULT_CACHE_WINDOW):
+            cv.time_period,
+        vol.Optional(CONF_CACHE_MAX_STATES, default=DEFAULT_CACHE_MAX_STATES):
+            cv.positive_int,
+    }),
 }, extra=vol.ALLOW_EXTRA)
 
 SIGNIFICANT_DOMAINS = ('thermostat', 'climate')
 IGNORE_DOMAINS = ('zone', 'scene',)
 
+# Number of rows fetched at once while streaming states
+STREAM_BATCH_SIZE = 1000
+# Number of entities that can be read ahead of the response
+STREAM_QUEUE_SIZE = 8
+
 
 def last_recorder_run(hass):
     """Retrieve the last closed recorder run from the database."""
@@ -62,16 +93,8 @@ def get_significant_states(hass, start_time, end_time=None, entity_id=None,
     entity_ids = (entity_id.lower(), ) if entity_id is not None else None
 
     with session_scope(hass=hass) as session:
-        query = session.query(States).filter(
-            (States.domain.in_(SIGNIFICANT_DOMAINS) |
-             (States.last_changed == States.last_updated)) &
-            (States.last_updated > start_time))
-
-        if filters:
-            query = filters.apply(query, entity_ids)
-
-        if end_time is not None:
-            query = query.filter(States.last_updated < end_time)
+        query = _filter_significant_states(
+            session.query(States), start_time, end_time, entity_ids, filters)
 
         states = (
             state for state in execute(
@@ -82,6 +105,115 @@ def get_significant_states(hass, start_time, end_time=None, entity_id=None,
     return states_to_json(hass, states, start_time, entity_id, filters)
 
 
+def stream_significant_states(hass, start_time, end_time=None,
+                              entity_id=None, filters=None):
+    """Yield the JSON of the significant states during a UTC period.
+
+    Generates the JSON array of get_significant_states in chunks, one per
+    entity. Rows are read in batches and encoded without creating State
+    objects, attributes are decoded once per distinct attributes.
+    """
+    from homeassistant.components.recorder.models import (
+        States, StateAttributes)
+
+    entity_ids = (entity_id.lower(), ) if entity_id is not None else None
+
+    # The states at the start time, so the graphs start on the Y axis
+    start_states = {
+        state.entity_id: State(state.entity_id, state.state,
+                               state.attributes, start_time, start_time)
+        for state in get_states(hass, start_time,
+                                [entity_id] if entity_id else None,
+                                filters=filters)}
+    separator = '['
+
+    def entity_json(json_entity_id, states_json=()):
+        """Return the JSON of the states of an entity."""
+        nonlocal separator
+        start_state = start_states.pop(json_entity_id, None)
+        states_json = list(states_json)
+
+        if start_state is not None:
+            states_json.insert(0, start_state.as_json())
+
+        if not states_json:
+            return ''
+
+        chunk = '{}[{}]'.format(separator, ', '.join(states_json))
+        separator = ', '
+        return chunk
+
+    with session_scope(hass=hass) as session:
+        query = session.query(
+            States.entity_id, States.domain, States.state, States.attributes,
+            StateAttributes.shared_attrs, States.last_changed,
+            States.last_updated).outerjoin(
+                StateAttributes,
+                States.attributes_id == StateAttributes.attributes_id)
+        query = _filter_significant_states(
+            query, start_time, end_time, entity_ids, filters).order_by(
+                States.entity_id, States.last_updated).yield_per(
+                    STREAM_BATCH_SIZE)
+
+        # The database collation may sort entity ids differently than
+        # Python, so the start states are not merged by comparing ids
+        for row_entity_id, rows in groupby(query, itemgetter(0)):
+            yield entity_json(row_entity_id, filter(None, (
+                _significant_state_row_json(row) for row in rows)))
+
+    # Entities without states during the period
+    for start_entity_id in sorted(start_states):
+        yield entity_json(start_entity_id)
+
+    yield ']' if separator == ', ' else '[]'
+
+
+def _filter_significant_states(query, start_time, end_time, entity_ids,
+                               filters):
+    """Filter a states query on significant states during a period."""
+    from homeassistant.components.recorder.models import States
+
+    query = query.filter(
+        (States.domain.in_(SIGNIFICANT_DOMAINS) |
+         (States.last_changed == States.last_updated)) &
+        (States.last_updated > start_time))
+
+    if filters:
+        query = filters.apply(query, entity_ids)
+
+    if end_time is not None:
+        query = query.filter(States.last_updated < end_time)
+
+    return query
+
+
+def _significant_state_row_json(row):
+    """Return the JSON of a significant states row, None if filtered."""
+    from homeassistant.components.recorder.models import (
+        decode_attributes, process_timestamp)
+
+    entity_id, domain, state, legacy_attrs, shared_attrs, last_changed, \
+        last_updated = row
+    attributes_json = shared_attrs or legacy_attrs or '{}'
+
+    try:
+        attributes = decode_attributes(attributes_json)
+    except ValueError:
+        _LOGGER.exception("Error converting row to state: %s", row)
+        return None
+
+    if attributes.get(ATTR_HIDDEN, False) or (
+            domain == 'script' and
+            not attributes.get(script.ATTR_CAN_CANCEL)):
+        return None
+
+    return ('{{"entity_id": {}, "state": {}, "attributes": {}, '
+            '"last_changed": "{}", "last_updated": "{}"}}').format(
+                json.dumps(entity_id), json.dumps(state), attributes_json,
+                process_timestamp(last_changed).isoformat(),
+                process_timestamp(last_updated).isoformat())
+
+
 def state_changes_during_period(hass, start_time, end_time=None,
                                 entity_id=None):
     """Return states changes during UTC period start_time - end_time."""
@@ -156,9 +288,9 @@ def states_to_json(hass, states, start_time, entity_id, filters=None):
 
     # Get the states at the start time
     for state in get_states(hass, start_time, entity_ids, filters=filters):
-        state.last_changed = start_time
-        state.last_updated = start_time
-        result[state.entity_id].append(state)
+        result[state.entity_id].append(State(
+            state.entity_id, state.state, state.attributes, start_time,
+            start_time))
 
     # Append all changes to it
     for entity_id, group in groupby(states, lambda state: state.entity_id):
@@ -185,7 +317,20 @@ def setup(hass, config):
         filters.included_entities = include[CONF_ENTITIES]
         filters.included_domains = include[CONF_DOMAINS]
 
-    hass.http.register_view(HistoryPeriodView(filters))
+    recent_history = None
+    cache_window = config[DOMAIN].get(CONF_CACHE_WINDOW, DEFAULT_CACHE_WINDOW)
+    recorder_filter = hass.data[recorder.DATA_INSTANCE].filter
+
+    if cache_window and recorder_filter.accept_event_type(EVENT_STATE_CHANGED):
+        recent_history = hass.data[DATA_RECENT_HISTORY] = RecentHistory(
+            hass, cache_window,
+            config[DOMAIN].get(CONF_CACHE_MAX_STATES,
+                               DEFAULT_CACHE_MAX_STATES),
+            recorder_filter)
+        run_callback_threadsafe(hass.loop, recent_history.async_start) \
+            .result()
+
+    hass.http.register_view(HistoryPeriodView(filters, recent_history))
     register_built_in_panel(hass, 'history', 'History', 'mdi:poll-box')
 
     return True
@@ -198,9 +343,10 @@ class HistoryPeriodView(HomeAssistantView):
     name = 'api:history:view-period'
     extra_urls = ['/api/history/period/{datetime}']
 
-    def __init__(self, filters):
+    def __init__(self, filters, recent_history=None):
         """Initilalize the history period view."""
         self.filters = filters
+        self.recent_history = recent_history
 
     @asyncio.coroutine
     def get(self, request, datetime=None):
@@ -233,15 +379,215 @@ class HistoryPeriodView(HomeAssistantView):
             end_time = start_time + one_day
         entity_id = request.query.get('filter_entity_id')
 
-        result = yield from request.app['hass'].async_add_job(
-            get_significant_states, request.app['hass'], start_time, end_time,
-            entity_id, self.filters)
-        result = result.values()
+        if self.recent_history is not None:
+            result = self.recent_history.async_significant_states(
+                start_time, end_time, entity_id, self.filters)
+
+            if result is not None:
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    elapsed = time.perf_counter() - timer_start
+                    _LOGGER.debug('Extracted %d recent states in %fs',
+                                  sum(map(len, result)), elapsed)
+
+                return web.Response(
+                    body=_states_list_json(result).encode('UTF-8'),
+                    content_type=CONTENT_TYPE_JSON)
+
+        hass = request.app['hass']
+        chunks = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE, loop=hass.loop)
+        stop = threading.Event()
+
+        def produce_chunks():
+            """Read the states from the database in the executor."""
+            try:
+                for chunk in stream_significant_states(
+                        hass, start_time, end_time, entity_id, self.filters):
+                    if stop.is_set():
+                        break
+                    if chunk:
+                        run_coroutine_threadsafe(
+                            chunks.put(chunk), hass.loop).result()
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error reading history")
+            finally:
+                run_coroutine_threadsafe(chunks.put(None), hass.loop).result()
+
+        response = web.StreamResponse()
+        response.content_type = CONTENT_TYPE_JSON
+        yield from response.prepare(request)
+        hass.async_add_job(produce_chunks)
+        chunk = ''
+        size = 0
+
+        try:
+            chunk = yield from chunks.get()
+
+            while chunk is not None:
+                data = chunk.encode('UTF-8')
+                size += len(data)
+                response.write(data)
+                yield from response.drain()
+                chunk = yield from chunks.get()
+
+            yield from response.write_eof()
+
+        except asyncio.CancelledError:
+            _LOGGER.debug("History stream closed by client")
+            raise
+
+        finally:
+            # Let the reader finish if the response was not completed
+            stop.set()
+
+            while chunk is not None:
+                chunk = yield from chunks.get()
+
         if _LOGGER.isEnabledFor(logging.DEBUG):
             elapsed = time.perf_counter() - timer_start
-            _LOGGER.debug(
-                'Extracted %d states in %fs', sum(map(len, result)), elapsed)
-        return self.json(result)
+            _LOGGER.debug('Streamed %d bytes of states in %fs', size, elapsed)
+
+        return response
+
+
+def _states_list_json(states_lists):
+    """Return the JSON of lists of states."""
+    return '[{}]'.format(', '.join(
+        '[{}]'.format(', '.join(state.as_json() for state in states))
+        for states in states_lists))
+
+
+class RecentHistory(object):
+    """Keep the recent states of all recorded entities in memory.
+
+    States are kept per entity for the cache window plus a margin, at most
+    max_states of them, so requests for recent periods are served without
+    querying the database. The latest state before the window is kept as
+    the state at the start of a period.
+    """
+
+    def __init__(self, hass, window, max_states, recorder_filter):
+        """Initialize the recent history."""
+        self.hass = hass
+        self.window = window
+        self.retention = window + CACHE_WINDOW_MARGIN
+        self.max_states = max_states
+        self.since = None
+        self.hits = 0
+        self.misses = 0
+        self._recorder_filter = recorder_filter
+        self._states = {}
+        self._covered_from = {}
+
+    @callback
+    def async_start(self):
+        """Start keeping the states, from the current states onwards."""
+        self.since = dt_util.utcnow()
+
+        for state in self.hass.states.async_all():
+            if self._recorder_filter.accept_entity_id(state.entity_id):
+                self._states[state.entity_id] = deque([state])
+
+        self.hass.bus.async_listen(
+            EVENT_STATE_CHANGED, self._async_state_changed)
+        async_track_time_interval(
+            self.hass, self._async_evict_old_states, self.window / 24)
+
+    @callback
+    def _async_state_changed(self, event):
+        """Add a new state."""
+        entity_id = event.data.get('entity_id')
+
+        if not self._recorder_filter.accept_entity_id(entity_id):
+            return
+
+        new_state = event.data.get('new_state')
+
+        # The recorder stores the removal of an entity as an empty state
+        if new_state is None:
+            new_state = State(entity_id, '', None, event.time_fired,
+                              event.time_fired)
+
+        states = self._states.get(entity_id)
+
+        if states is None:
+            states = self._states[entity_id] = deque()
+
+        states.append(new_state)
+
+        if len(states) > self.max_states:
+            states.popleft()
+            # The state at the start of earlier periods is no longer known
+            self._covered_from[entity_id] = states[0].last_updated
+
+        self._evict_old_states(states, event.time_fired - self.retention)
+
+    @callback
+    def _async_evict_old_states(self, now):
+        """Remove the states that are older than the retention."""
+        window_start = now - self.retention
+
+        for states in self._states.values():
+            self._evict_old_states(states, window_start)
+
+    @staticmethod
+    def _evict_old_states(states, window_start):
+        """Remove old states, keeping the state at the start of the window."""
+        while len(states) > 1 and states[1].last_updated <= window_start:
+            states.popleft()
+
+    @callback
+    def async_significant_states(self, start_time, end_time, entity_id,
+                                 filters):
+        """Return lists of significant states per entity, sorted by entity.
+
+        Returns the same states as get_significant_states, or None if the
+        period is not covered by the recent history.
+        """
+        if self.since is None or start_time < self.since or \
+                start_time < dt_util.utcnow() - self.retention:
+            self.misses += 1
+            return None
+
+        entity_ids = [entity_id.lower()] if entity_id is not None else None
+        result = []
+
+        for state_entity_id in sorted(self._states):
+            if not filters.matches(state_entity_id, entity_ids):
+                continue
+
+            if self._covered_from.get(state_entity_id, start_time) > \
+                    start_time:
+                self.misses += 1
+                return None
+
+            start_state = None
+            states = []
+
+            for state in self._states[state_entity_id]:
+                if state.last_updated < start_time:
+                    start_state = state
+                elif state.last_updated == start_time or (
+                        end_time is not None and
+                        state.last_updated >= end_time):
+                    continue
+                elif (state.domain in SIGNIFICANT_DOMAINS or
+                      state.last_changed == state.last_updated) and \
+                        _is_significant(state) and \
+                        not state.attributes.get(ATTR_HIDDEN, False):
+                    states.append(state)
+
+            if start_state is not None and \
+                    start_state.domain not in IGNORE_DOMAINS and \
+                    not start_state.attributes.get(ATTR_HIDDEN, False):
+                states.insert(0, State(
+                    start_state.entity_id, start_state.state,
+                    start_state.attributes, start_time, start_time))
+
+            if states:
+                result.append(states)
+
+        self.hits += 1
+        return result
 
 
 class Filters(object):
@@ -303,6 +649,34 @@ class Filters(object):
             query = query.filter(~States.entity_id.in_(self.excluded_entities))
         return query
 
+    def matches(self, entity_id, entity_ids=None):
+        """Return if an entity passes the filter, like apply in SQL."""
+        if entity_ids is not None:
+            return entity_id in entity_ids
+
+        domain = split_entity_id(entity_id)[0]
+
+        if domain in IGNORE_DOMAINS:
+            return False
+
+        matches = True
+
+        if self.excluded_domains and not self.included_domains:
+            matches = domain not in self.excluded_domains
+            if self.included_entities:
+                matches = matches and entity_id in self.included_entities
+        elif not self.excluded_domains and self.included_domains:
+            matches = domain in self.included_domains or \
+                entity_id in self.included_entities
+        elif self.excluded_domains and self.included_domains:
+            matches = domain not in self.excluded_domains and (
+                domain in self.included_domains or
+                entity_id in self.included_entities)
+        elif self.included_entities:
+            matches = entity_id in self.included_entities
+
+        return matches and entity_id not in self.excluded_entities
+
 
 def _is_significant(state):
     """Test if state is significant for history charts.
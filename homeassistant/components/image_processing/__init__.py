@@ -6,15 +6,19 @@ https://home-assistant.io/components/image_processing/
 """
 import asyncio
 from datetime import timedelta
+import io
 import logging
+import multiprocessing
 import os
+import time
 
 import voluptuous as vol
 
 import homeassistant.helpers.config_validation as cv
 from homeassistant.config import load_yaml_config_file
 from homeassistant.const import (
-    ATTR_ENTITY_ID, CONF_NAME, CONF_ENTITY_ID)
+    ATTR_ENTITY_ID, CONF_NAME, CONF_ENTITY_ID, EVENT_HOMEASSISTANT_STOP)
+from homeassistant.core import callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.entity_component import EntityComponent
@@ -36,13 +40,26 @@ DEVICE_CLASSES = [
 SERVICE_SCAN = 'scan'
 
 ATTR_CONFIDENCE = 'confidence'
+ATTR_PROCESSED = 'processed'
+ATTR_SKIPPED = 'skipped'
+ATTR_PROCESS_TIME = 'process_time'
+ATTR_TOTAL_PROCESS_TIME = 'total_process_time'
 
 CONF_SOURCE = 'source'
 CONF_CONFIDENCE = 'confidence'
+CONF_CHANGE_THRESHOLD = 'change_threshold'
 
 DEFAULT_TIMEOUT = 10
 DEFAULT_CONFIDENCE = 80
 
+DATA_PROCESS_POOL = 'image_processing_process_pool'
+
+# Keep a core free for the event loop
+PROCESS_POOL_SIZE = max(1, (os.cpu_count() or 1) - 1)
+
+# Width and height of the difference hash, which has HASH_SIZE**2 bits
+HASH_SIZE = 8
+
 SOURCE_SCHEMA = vol.Schema({
     vol.Required(CONF_ENTITY_ID): cv.entity_id,
     vol.Optional(CONF_NAME): cv.string,
@@ -51,7 +68,9 @@ SOURCE_SCHEMA = vol.Schema({
 PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend({
     vol.Optional(CONF_SOURCE): vol.All(cv.ensure_list, [SOURCE_SCHEMA]),
     vol.Optional(CONF_CONFIDENCE, default=DEFAULT_CONFIDENCE):
-        vol.All(vol.Coerce(float), vol.Range(min=0, max=100))
+        vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+    vol.Optional(CONF_CHANGE_THRESHOLD):
+        vol.All(vol.Coerce(int), vol.Range(min=1, max=HASH_SIZE**2)),
 })
 
 SERVICE_SCAN_SCHEMA = vol.Schema({
@@ -65,6 +84,91 @@ def scan(hass, entity_id=None):
     hass.services.call(DOMAIN, SERVICE_SCAN, data)
 
 
+def difference_hash(image):
+    """Return the difference hash of an image.
+
+    The image is scaled down to HASH_SIZE + 1 by HASH_SIZE gray pixels, every
+    bit tells if a pixel is brighter than its right neighbour. Images that
+    look alike have hashes that differ in few bits. Return None if Pillow is
+    not installed or the image can't be decoded, so the image is processed.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        _LOGGER.debug("Pillow is not installed, unable to hash image")
+        return None
+
+    # Pillow 5 raises DecompressionBombError for images that are too large
+    errors = (OSError, ValueError,
+              getattr(Image, 'DecompressionBombError', ValueError))
+
+    try:
+        img = Image.open(io.BytesIO(image))
+        # Decodes JPEGs at a reduced size
+        img.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+        pixels = list(img.convert('L').resize(
+            (HASH_SIZE + 1, HASH_SIZE), Image.ANTIALIAS).getdata())
+    except errors as err:
+        _LOGGER.debug("Unable to hash image: %s", err)
+        return None
+
+    bits = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            index = row * (HASH_SIZE + 1) + col
+            bits = bits << 1 | (pixels[index] > pixels[index + 1])
+
+    return bits
+
+
+def async_run_in_process_pool(hass, target, *args):
+    """Run a CPU bound function in the image processing process pool.
+
+    The function and its arguments are pickled, so the function must be
+    defined at module level. The pool is started on first use, its
+    processes are spawned since forking a process that runs threads can
+    deadlock the child on locks held by the other threads.
+
+    This method must be run in the event loop and returns a future.
+    """
+    pool = hass.data.get(DATA_PROCESS_POOL)
+
+    if pool is None:
+        pool = hass.data[DATA_PROCESS_POOL] = \
+            multiprocessing.get_context('spawn').Pool(PROCESS_POOL_SIZE)
+
+        def shutdown_pool(event):
+            """Stop the processes of the pool."""
+            pool = hass.data.pop(DATA_PROCESS_POOL)
+            pool.close()
+            pool.join()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, shutdown_pool)
+
+    future = asyncio.Future(loop=hass.loop)
+
+    @callback
+    def async_set_result(result):
+        """Set the result of the future unless it was cancelled."""
+        if not future.done():
+            future.set_result(result)
+
+    @callback
+    def async_set_exception(err):
+        """Set the exception of the future unless it was cancelled."""
+        if not future.done():
+            future.set_exception(err)
+
+    pool.apply_async(
+        target, args,
+        callback=lambda result: hass.loop.call_soon_threadsafe(
+            async_set_result, result),
+        error_callback=lambda err: hass.loop.call_soon_threadsafe(
+            async_set_exception, err))
+
+    return future
+
+
 @asyncio.coroutine
 def async_setup(hass, config):
     """Set up image processing."""
@@ -81,6 +185,10 @@ def async_setup(hass, config):
         """Service handler for scan."""
         image_entities = component.async_extract_from_service(service)
 
+        for entity in image_entities:
+            # Process the image even if it did not change
+            entity.image_hash = None
+
         update_task = [entity.async_update_ha_state(True) for
                        entity in image_entities]
         if update_task:
@@ -94,9 +202,18 @@ def async_setup(hass, config):
 
 
 class ImageProcessingEntity(Entity):
-    """Base entity class for image processing."""
+    """Base entity class for image processing.
+
+    Counts the processed and skipped images and the time spent processing
+    them.
+    """
 
     timeout = DEFAULT_TIMEOUT
+    image_hash = None
+    processed = 0
+    skipped = 0
+    process_time = 0
+    total_process_time = 0
 
     @property
     def camera_entity(self):
@@ -108,6 +225,25 @@ class ImageProcessingEntity(Entity):
         """Return minimum confidence for do some things."""
         return None
 
+    @property
+    def change_threshold(self):
+        """Return how many bits of the hash must change to process images.
+
+        Images are skipped if their difference hash differs from the hash of
+        the last processed image in fewer bits. None processes all images.
+        """
+        return None
+
+    @property
+    def state_attributes(self):
+        """Return the processing counters as state attributes."""
+        return {
+            ATTR_PROCESSED: self.processed,
+            ATTR_SKIPPED: self.skipped,
+            ATTR_PROCESS_TIME: round(self.process_time, 3),
+            ATTR_TOTAL_PROCESS_TIME: round(self.total_process_time, 3),
+        }
+
     def process_image(self, image):
         """Process image."""
         raise NotImplementedError()
@@ -136,5 +272,24 @@ class ImageProcessingEntity(Entity):
             _LOGGER.error("Error on receive image from entity: %s", err)
             return
 
+        if self.change_threshold is not None:
+            image_hash = yield from self.hass.async_add_job(
+                difference_hash, image)
+
+            if image_hash is not None and self.image_hash is not None and \
+                    bin(image_hash ^ self.image_hash).count('1') < \
+                    self.change_threshold:
+                self.skipped += 1
+                return
+
+            self.image_hash = image_hash
+
         # process image data
+        start = time.monotonic()
         yield from self.async_process_image(image)
+
+        self.process_time = time.monotonic() - start
+        self.total_process_time += self.process_time
+        self.processed += 1
+        _LOGGER.debug("%s processed an image in %.3f seconds",
+                      self.entity_id, self.process_time)
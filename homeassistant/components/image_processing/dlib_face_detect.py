@@ -4,6 +4,7 @@ Component that will help set the Dlib face detect processing.
 For more details about this platform, please refer to the documentation at
 https://home-assistant.io/components/image_processing.dlib_face_detect/
 """
+import asyncio
 import logging
 import io
 
@@ -11,7 +12,8 @@ from homeassistant.core import split_entity_id
 # pylint: disable=unused-import
 from homeassistant.components.image_processing import PLATFORM_SCHEMA  # noqa
 from homeassistant.components.image_processing import (
-    CONF_SOURCE, CONF_ENTITY_ID, CONF_NAME)
+    CONF_CHANGE_THRESHOLD, CONF_SOURCE, CONF_ENTITY_ID, CONF_NAME,
+    async_run_in_process_pool)
 from homeassistant.components.image_processing.microsoft_face_identify import (
     ImageProcessingFaceEntity)
 
@@ -20,12 +22,29 @@ REQUIREMENTS = ['face_recognition==0.1.14']
 _LOGGER = logging.getLogger(__name__)
 
 
+def _face_locations(image):
+    """Return the locations of the faces in an image.
+
+    Runs in the process pool.
+    """
+    # pylint: disable=import-error
+    import face_recognition
+
+    fak_file = io.BytesIO(image)
+    fak_file.name = 'snapshot.jpg'
+    fak_file.seek(0)
+
+    image = face_recognition.load_image_file(fak_file)
+    return face_recognition.face_locations(image)
+
+
 def setup_platform(hass, config, add_devices, discovery_info=None):
     """Set up the Dlib Face detection platform."""
     entities = []
     for camera in config[CONF_SOURCE]:
         entities.append(DlibFaceDetectEntity(
-            camera[CONF_ENTITY_ID], camera.get(CONF_NAME)
+            camera[CONF_ENTITY_ID], camera.get(CONF_NAME),
+            config.get(CONF_CHANGE_THRESHOLD)
         ))
 
     add_devices(entities)
@@ -34,11 +53,12 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
 class DlibFaceDetectEntity(ImageProcessingFaceEntity):
     """Dlib Face API entity for identify."""
 
-    def __init__(self, camera_entity, name=None):
+    def __init__(self, camera_entity, name=None, change_threshold=None):
         """Initialize Dlib face entity."""
         super().__init__()
 
         self._camera = camera_entity
+        self._change_threshold = change_threshold
 
         if name:
             self._name = name
@@ -51,6 +71,11 @@ class DlibFaceDetectEntity(ImageProcessingFaceEntity):
         """Return camera entity id from process pictures."""
         return self._camera
 
+    @property
+    def change_threshold(self):
+        """Return how many bits of the hash must change to process images."""
+        return self._change_threshold
+
     @property
     def name(self):
         """Return the name of the entity."""
@@ -58,14 +83,17 @@ class DlibFaceDetectEntity(ImageProcessingFaceEntity):
 
     def process_image(self, image):
         """Process image."""
-        # pylint: disable=import-error
-        import face_recognition
+        face_locations = _face_locations(image)
 
-        fak_file = io.BytesIO(image)
-        fak_file.name = 'snapshot.jpg'
-        fak_file.seek(0)
+        self.process_faces(face_locations, len(face_locations))
 
-        image = face_recognition.load_image_file(fak_file)
-        face_locations = face_recognition.face_locations(image)
+    @asyncio.coroutine
+    def async_process_image(self, image):
+        """Process image in the process pool.
 
-        self.process_faces(face_locations, len(face_locations))
+        This method is a coroutine.
+        """
+        face_locations = yield from async_run_in_process_pool(
+            self.hass, _face_locations, image)
+
+        self.async_process_faces(face_locations, len(face_locations))
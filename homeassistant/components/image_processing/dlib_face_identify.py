@@ -4,6 +4,7 @@ Component that will help set the Dlib face detect processing.
 For more details about this platform, please refer to the documentation at
 https://home-assistant.io/components/image_processing.dlib_face_identify/
 """
+import asyncio
 import logging
 import io
 
@@ -11,7 +12,8 @@ import voluptuous as vol
 
 from homeassistant.core import split_entity_id
 from homeassistant.components.image_processing import (
-    PLATFORM_SCHEMA, CONF_SOURCE, CONF_ENTITY_ID, CONF_NAME)
+    PLATFORM_SCHEMA, CONF_CHANGE_THRESHOLD, CONF_SOURCE, CONF_ENTITY_ID,
+    CONF_NAME, async_run_in_process_pool)
 from homeassistant.components.image_processing.microsoft_face_identify import (
     ImageProcessingFaceEntity)
 import homeassistant.helpers.config_validation as cv
@@ -28,12 +30,40 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
 })
 
 
+def _identify_faces(image, known_faces):
+    """Return the known faces found in an image and the number of faces.
+
+    Runs in the process pool.
+    """
+    # pylint: disable=import-error
+    import face_recognition
+
+    fak_file = io.BytesIO(image)
+    fak_file.name = 'snapshot.jpg'
+    fak_file.seek(0)
+
+    image = face_recognition.load_image_file(fak_file)
+    unknowns = face_recognition.face_encodings(image)
+
+    found = []
+    for unknown_face in unknowns:
+        for name, face in known_faces.items():
+            result = face_recognition.compare_faces([face], unknown_face)
+            if result[0]:
+                found.append({
+                    ATTR_NAME: name
+                })
+
+    return found, len(unknowns)
+
+
 def setup_platform(hass, config, add_devices, discovery_info=None):
     """Set up the Dlib Face detection platform."""
     entities = []
     for camera in config[CONF_SOURCE]:
         entities.append(DlibFaceIdentifyEntity(
-            camera[CONF_ENTITY_ID], config[CONF_FACES], camera.get(CONF_NAME)
+            camera[CONF_ENTITY_ID], config[CONF_FACES], camera.get(CONF_NAME),
+            config.get(CONF_CHANGE_THRESHOLD)
         ))
 
     add_devices(entities)
@@ -42,13 +72,15 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
 class DlibFaceIdentifyEntity(ImageProcessingFaceEntity):
     """Dlib Face API entity for identify."""
 
-    def __init__(self, camera_entity, faces, name=None):
+    def __init__(self, camera_entity, faces, name=None,
+                 change_threshold=None):
         """Initialize Dlib face identify entry."""
         # pylint: disable=import-error
         import face_recognition
         super().__init__()
 
         self._camera = camera_entity
+        self._change_threshold = change_threshold
 
         if name:
             self._name = name
@@ -66,6 +98,11 @@ class DlibFaceIdentifyEntity(ImageProcessingFaceEntity):
         """Return camera entity id from process pictures."""
         return self._camera
 
+    @property
+    def change_threshold(self):
+        """Return how many bits of the hash must change to process images."""
+        return self._change_threshold
+
     @property
     def name(self):
         """Return the name of the entity."""
@@ -73,23 +110,17 @@ class DlibFaceIdentifyEntity(ImageProcessingFaceEntity):
 
     def process_image(self, image):
         """Process image."""
-        # pylint: disable=import-error
-        import face_recognition
+        found, total = _identify_faces(image, self._faces)
 
-        fak_file = io.BytesIO(image)
-        fak_file.name = 'snapshot.jpg'
-        fak_file.seek(0)
+        self.process_faces(found, total)
 
-        image = face_recognition.load_image_file(fak_file)
-        unknowns = face_recognition.face_encodings(image)
+    @asyncio.coroutine
+    def async_process_image(self, image):
+        """Process image in the process pool.
 
-        found = []
-        for unknown_face in unknowns:
-            for name, face in self._faces.items():
-                result = face_recognition.compare_faces([face], unknown_face)
-                if result[0]:
-                    found.append({
-                        ATTR_NAME: name
-                    })
+        This method is a coroutine.
+        """
+        found, total = yield from async_run_in_process_pool(
+            self.hass, _identify_faces, image, self._faces)
 
-        self.process_faces(found, len(unknowns))
+        self.async_process_faces(found, total)
@@ -102,6 +102,7 @@ class ImageProcessingFaceEntity(ImageProcessingEntity):
             ATTR_FACES: self.faces,
             ATTR_TOTAL_FACES: self.total_faces,
         }
+        attr.update(super().state_attributes)
 
         return attr
 
@@ -104,6 +104,7 @@ class ImageProcessingAlprEntity(ImageProcessingEntity):
             ATTR_PLATES: self.plates,
             ATTR_VEHICLES: self.vehicles
         }
+        attr.update(super().state_attributes)
 
         return attr
 
@@ -4,6 +4,7 @@ Component that performs OpenCV classification on images.
 For more details about this platform, please refer to the documentation at
 https://home-assistant.io/components/image_processing.opencv/
 """
+import asyncio
 from datetime import timedelta
 import logging
 
@@ -13,8 +14,8 @@ import voluptuous as vol
 
 from homeassistant.core import split_entity_id
 from homeassistant.components.image_processing import (
-    CONF_SOURCE, CONF_ENTITY_ID, CONF_NAME, PLATFORM_SCHEMA,
-    ImageProcessingEntity)
+    CONF_CHANGE_THRESHOLD, CONF_SOURCE, CONF_ENTITY_ID, CONF_NAME,
+    PLATFORM_SCHEMA, ImageProcessingEntity, async_run_in_process_pool)
 import homeassistant.helpers.config_validation as cv
 
 REQUIREMENTS = ['numpy==1.13.0']
@@ -66,7 +67,8 @@ def _create_processor_from_config(hass, camera_entity, config):
         config[CONF_NAME], split_entity_id(camera_entity)[1].replace('_', ' '))
 
     processor = OpenCVImageProcessor(
-        hass, camera_entity, name, classifier_config)
+        hass, camera_entity, name, classifier_config,
+        config.get(CONF_CHANGE_THRESHOLD))
 
     return processor
 
@@ -81,6 +83,51 @@ def _get_default_classifier(dest_path):
                 fil.write(chunk)
 
 
+def _detect_matches(image, classifiers):
+    """Return the regions matched by the classifiers and their number.
+
+    Runs in the process pool.
+    """
+    import cv2  # pylint: disable=import-error
+    import numpy
+
+    # pylint: disable=no-member
+    cv_image = cv2.imdecode(numpy.asarray(bytearray(image)),
+                            cv2.IMREAD_UNCHANGED)
+
+    for name, classifier in classifiers.items():
+        scale = DEFAULT_SCALE
+        neighbors = DEFAULT_NEIGHBORS
+        min_size = DEFAULT_MIN_SIZE
+        if isinstance(classifier, dict):
+            path = classifier[CONF_FILE]
+            scale = classifier.get(CONF_SCALE, scale)
+            neighbors = classifier.get(CONF_NEIGHBORS, neighbors)
+            min_size = classifier.get(CONF_MIN_SIZE, min_size)
+        else:
+            path = classifier
+
+        # pylint: disable=no-member
+        cascade = cv2.CascadeClassifier(path)
+
+        detections = cascade.detectMultiScale(
+            cv_image,
+            scaleFactor=scale,
+            minNeighbors=neighbors,
+            minSize=min_size)
+        matches = {}
+        total_matches = 0
+        regions = []
+        # pylint: disable=invalid-name
+        for (x, y, w, h) in detections:
+            regions.append((int(x), int(y), int(w), int(h)))
+            total_matches += 1
+
+        matches[name] = regions
+
+    return matches, total_matches
+
+
 def setup_platform(hass, config, add_devices, discovery_info=None):
     """Set up the OpenCV image processing platform."""
     try:
@@ -105,7 +152,7 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
     for camera in config[CONF_SOURCE]:
         entities.append(OpenCVImageProcessor(
             hass, camera[CONF_ENTITY_ID], camera.get(CONF_NAME),
-            config[CONF_CLASSIFIER]
+            config[CONF_CLASSIFIER], config.get(CONF_CHANGE_THRESHOLD)
         ))
 
     add_devices(entities)
@@ -114,7 +161,8 @@ def setup_platform(hass, config, add_devices, discovery_info=None):
 class OpenCVImageProcessor(ImageProcessingEntity):
     """Representation of an OpenCV image processor."""
 
-    def __init__(self, hass, camera_entity, name, classifiers):
+    def __init__(self, hass, camera_entity, name, classifiers,
+                 change_threshold=None):
         """Initialize the OpenCV entity."""
         self.hass = hass
         self._camera_entity = camera_entity
@@ -124,6 +172,7 @@ class OpenCVImageProcessor(ImageProcessingEntity):
             self._name = "OpenCV {0}".format(
                 split_entity_id(camera_entity)[1])
         self._classifiers = classifiers
+        self._change_threshold = change_threshold
         self._matches = {}
         self._total_matches = 0
         self._last_image = None
@@ -133,6 +182,11 @@ class OpenCVImageProcessor(ImageProcessingEntity):
         """Return camera entity id from process pictures."""
         return self._camera_entity
 
+    @property
+    def change_threshold(self):
+        """Return how many bits of the hash must change to process images."""
+        return self._change_threshold
+
     @property
     def name(self):
         """Return the name of the image processor."""
@@ -146,49 +200,25 @@ class OpenCVImageProcessor(ImageProcessingEntity):
     @property
     def state_attributes(self):
         """Return device specific state attributes."""
-        return {
+        attr = {
             ATTR_MATCHES: self._matches,
             ATTR_TOTAL_MATCHES: self._total_matches
         }
+        attr.update(super().state_attributes)
+
+        return attr
 
     def process_image(self, image):
         """Process the image."""
-        import cv2  # pylint: disable=import-error
-        import numpy
-
-        # pylint: disable=no-member
-        cv_image = cv2.imdecode(numpy.asarray(bytearray(image)),
-                                cv2.IMREAD_UNCHANGED)
-
-        for name, classifier in self._classifiers.items():
-            scale = DEFAULT_SCALE
-            neighbors = DEFAULT_NEIGHBORS
-            min_size = DEFAULT_MIN_SIZE
-            if isinstance(classifier, dict):
-                path = classifier[CONF_FILE]
-                scale = classifier.get(CONF_SCALE, scale)
-                neighbors = classifier.get(CONF_NEIGHBORS, neighbors)
-                min_size = classifier.get(CONF_MIN_SIZE, min_size)
-            else:
-                path = classifier
-
-            # pylint: disable=no-member
-            cascade = cv2.CascadeClassifier(path)
-
-            detections = cascade.detectMultiScale(
-                cv_image,
-                scaleFactor=scale,
-                minNeighbors=neighbors,
-                minSize=min_size)
-            matches = {}
-            total_matches = 0
-            regions = []
-            # pylint: disable=invalid-name
-            for (x, y, w, h) in detections:
-                regions.append((int(x), int(y), int(w), int(h)))
-                total_matches += 1
-
-            matches[name] = regions
-
-        self._matches = matches
-        self._total_matches = total_matches
+        self._matches, self._total_matches = _detect_matches(
+            image, self._classifiers)
+
+    @asyncio.coroutine
+    def async_process_image(self, image):
+        """Process the image in the process pool.
+
+        This method is a coroutine.
+        """
+        self._matches, self._total_matches = \
+            yield from async_run_in_process_pool(
+                self.hass, _detect_matches, image, self._classifiers)
@@ -14,8 +14,8 @@ import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 from homeassistant.core import split_entity_id
 from homeassistant.components.image_processing import (
-    PLATFORM_SCHEMA, ImageProcessingEntity, CONF_SOURCE, CONF_ENTITY_ID,
-    CONF_NAME)
+    PLATFORM_SCHEMA, ImageProcessingEntity, CONF_CHANGE_THRESHOLD,
+    CONF_SOURCE, CONF_ENTITY_ID, CONF_NAME)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -69,6 +69,7 @@ class ImageProcessingSsocr(ImageProcessingEntity):
             self._name = "SevenSegement OCR {0}".format(
                 split_entity_id(camera_entity)[1])
         self._state = None
+        self._change_threshold = config.get(CONF_CHANGE_THRESHOLD)
 
         self.filepath = os.path.join(self.hass.config.config_dir, 'ocr.png')
         crop = ['crop', str(config[CONF_X_POS]), str(config[CONF_Y_POS]),
@@ -92,6 +93,11 @@ class ImageProcessingSsocr(ImageProcessingEntity):
         """Return camera entity id from process pictures."""
         return self._camera_entity
 
+    @property
+    def change_threshold(self):
+        """Return how many bits of the hash must change to process images."""
+        return self._change_threshold
+
     @property
     def name(self):
         """Return the name of the image processor."""
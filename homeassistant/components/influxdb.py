@@ -5,16 +5,19 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/influxdb/
 """
 import logging
-
 import re
 
+import requests
 import voluptuous as vol
 
 from homeassistant.const import (
-    EVENT_STATE_CHANGED, STATE_UNAVAILABLE, STATE_UNKNOWN, CONF_HOST,
-    CONF_PORT, CONF_SSL, CONF_VERIFY_SSL, CONF_USERNAME, CONF_PASSWORD,
-    CONF_EXCLUDE, CONF_INCLUDE, CONF_DOMAINS, CONF_ENTITIES)
+    STATE_UNAVAILABLE, STATE_UNKNOWN, CONF_HOST, CONF_PORT, CONF_SSL,
+    CONF_VERIFY_SSL, CONF_USERNAME, CONF_PASSWORD, CONF_EXCLUDE, CONF_INCLUDE,
+    CONF_DOMAINS, CONF_ENTITIES)
+from homeassistant.core import split_entity_id
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.exporter import (
+    BatchExporter, ExportError, EXPORTER_SCHEMA)
 import homeassistant.helpers.config_validation as cv
 
 REQUIREMENTS = ['influxdb==3.0.0']
@@ -33,7 +36,7 @@ DOMAIN = 'influxdb'
 TIMEOUT = 5
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Optional(CONF_HOST): cv.string,
         vol.Inclusive(CONF_USERNAME, 'authentication'): cv.string,
         vol.Inclusive(CONF_PASSWORD, 'authentication'): cv.string,
@@ -91,13 +94,6 @@ def setup(hass, config):
 
     include = conf.get(CONF_INCLUDE, {})
     exclude = conf.get(CONF_EXCLUDE, {})
-    whitelist_e = set(include.get(CONF_ENTITIES, []))
-    whitelist_d = set(include.get(CONF_DOMAINS, []))
-    blacklist_e = set(exclude.get(CONF_ENTITIES, []))
-    blacklist_d = set(exclude.get(CONF_DOMAINS, []))
-    tags = conf.get(CONF_TAGS)
-    default_measurement = conf.get(CONF_DEFAULT_MEASUREMENT)
-    override_measurement = conf.get(CONF_OVERRIDE_MEASUREMENT)
 
     try:
         influx = InfluxDBClient(**kwargs)
@@ -108,77 +104,115 @@ def setup(hass, config):
                       "the database exists and is READ/WRITE.", exc)
         return False
 
-    def influx_event_listener(event):
-        """Listen for new messages on the bus and sends them to Influx."""
-        state = event.data.get('new_state')
-        if state is None or state.state in (
-                STATE_UNKNOWN, '', STATE_UNAVAILABLE) or \
-                state.entity_id in blacklist_e or \
-                state.domain in blacklist_d:
-            return
+    exporter = hass.data[DOMAIN] = InfluxExporter(hass, influx, conf)
+    exporter.start(_entity_filter(include, exclude))
 
-        try:
-            if (whitelist_e and state.entity_id not in whitelist_e) or \
-                    (whitelist_d and state.domain not in whitelist_d):
-                return
+    return True
+
+
+def _entity_filter(include, exclude):
+    """Return a function that tells if the states of an entity are written.
+
+    Excluded entities and domains are never written. Included entities and
+    included domains must both match when both are configured.
+    """
+    whitelist_e = set(include.get(CONF_ENTITIES, []))
+    whitelist_d = set(include.get(CONF_DOMAINS, []))
+    blacklist_e = set(exclude.get(CONF_ENTITIES, []))
+    blacklist_d = set(exclude.get(CONF_DOMAINS, []))
 
+    def entity_filter(entity_id):
+        """Return if the states of an entity are written."""
+        domain = split_entity_id(entity_id)[0]
+
+        return entity_id not in blacklist_e and \
+            domain not in blacklist_d and \
+            (not whitelist_e or entity_id in whitelist_e) and \
+            (not whitelist_d or domain in whitelist_d)
+
+    return entity_filter
+
+
+class InfluxExporter(BatchExporter):
+    """Write the states to InfluxDB in batches of points."""
+
+    def __init__(self, hass, influx, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'InfluxDB', conf)
+        self.influx = influx
+        self.tags = conf.get(CONF_TAGS)
+        self.default_measurement = conf.get(CONF_DEFAULT_MEASUREMENT)
+        self.override_measurement = conf.get(CONF_OVERRIDE_MEASUREMENT)
+
+    def convert(self, event):
+        """Return the point for a state change."""
+        state = event.data['new_state']
+
+        if state.state in (STATE_UNKNOWN, '', STATE_UNAVAILABLE):
+            return None
+
+        try:
             _state = float(state_helper.state_as_number(state))
             _state_key = "value"
         except ValueError:
             _state = state.state
             _state_key = "state"
 
-        if override_measurement:
-            measurement = override_measurement
+        if self.override_measurement:
+            measurement = self.override_measurement
         else:
             measurement = state.attributes.get('unit_of_measurement')
             if measurement in (None, ''):
-                if default_measurement:
-                    measurement = default_measurement
+                if self.default_measurement:
+                    measurement = self.default_measurement
                 else:
                     measurement = state.entity_id
 
-        json_body = [
-            {
-                'measurement': measurement,
-                'tags': {
-                    'domain': state.domain,
-                    'entity_id': state.object_id,
-                },
-                'time': event.time_fired,
-                'fields': {
-                    _state_key: _state,
-                }
+        point = {
+            'measurement': measurement,
+            'tags': {
+                'domain': state.domain,
+                'entity_id': state.object_id,
+            },
+            'time': event.time_fired,
+            'fields': {
+                _state_key: _state,
             }
-        ]
+        }
 
         for key, value in state.attributes.items():
             if key != 'unit_of_measurement':
                 # If the key is already in fields
-                if key in json_body[0]['fields']:
+                if key in point['fields']:
                     key = key + "_"
                 # Prevent column data errors in influxDB.
                 # For each value we try to cast it as float
                 # But if we can not do it we store the value
                 # as string add "_str" postfix to the field key
                 try:
-                    json_body[0]['fields'][key] = float(value)
+                    point['fields'][key] = float(value)
                 except (ValueError, TypeError):
                     new_key = "{}_str".format(key)
                     new_value = str(value)
-                    json_body[0]['fields'][new_key] = new_value
+                    point['fields'][new_key] = new_value
 
                     if RE_DIGIT_TAIL.match(new_value):
-                        json_body[0]['fields'][key] = float(
+                        point['fields'][key] = float(
                             RE_DECIMAL.sub('', new_value))
 
-        json_body[0]['tags'].update(tags)
+        point['tags'].update(self.tags)
 
-        try:
-            influx.write_points(json_body)
-        except exceptions.InfluxDBClientError:
-            _LOGGER.exception("Error saving event %s to InfluxDB", json_body)
+        return point
 
-    hass.bus.listen(EVENT_STATE_CHANGED, influx_event_listener)
+    def send(self, batch):
+        """Write a batch of points.
 
-    return True
+        Points rejected by the database are not written again.
+        """
+        from influxdb import exceptions
+
+        try:
+            self.influx.write_points(batch)
+        except (exceptions.InfluxDBServerError,
+                requests.exceptions.RequestException) as err:
+            raise ExportError(err)
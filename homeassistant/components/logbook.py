@@ -5,10 +5,12 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/logbook/
 """
 import asyncio
+import json
 import logging
 from datetime import timedelta
 from itertools import groupby
 
+from aiohttp import web
 import voluptuous as vol
 
 from homeassistant.core import callback
@@ -20,8 +22,9 @@ from homeassistant.components.http import HomeAssistantView
 from homeassistant.const import (
     EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED,
     STATE_NOT_HOME, STATE_OFF, STATE_ON, ATTR_HIDDEN, HTTP_BAD_REQUEST,
-    EVENT_LOGBOOK_ENTRY)
+    EVENT_LOGBOOK_ENTRY, CONTENT_TYPE_JSON)
 from homeassistant.core import State, split_entity_id, DOMAIN as HA_DOMAIN
+from homeassistant.remote import JSONEncoder
 
 DOMAIN = 'logbook'
 DEPENDENCIES = ['recorder', 'frontend']
@@ -52,6 +55,12 @@ GROUP_BY_MINUTES = 15
 
 CONTINUOUS_DOMAINS = ['proximity', 'sensor']
 
+# Number of events read from the database at once when streaming a period
+PAGE_SIZE = 1000
+
+# Matches the encoded attributes of states with a unit of measurement
+UNIT_OF_MEASUREMENT_LIKE = '%"unit_of_measurement":%'
+
 ATTR_NAME = 'name'
 ATTR_MESSAGE = 'message'
 ATTR_DOMAIN = 'domain'
@@ -132,12 +141,66 @@ class LogbookView(HomeAssistantView):
 
         start_day = dt_util.as_utc(datetime)
         end_day = start_day + timedelta(days=1)
+        entity_id = request.query.get('entity_id')
+        hass = request.app['hass']
+
+        if 'limit' not in request.query:
+            return (yield from self._stream_entries(
+                request, start_day, end_day, entity_id))
+
+        try:
+            limit = int(request.query['limit'])
+        except ValueError:
+            limit = 0
+
+        if limit < 1:
+            return self.json_message('Invalid limit', HTTP_BAD_REQUEST)
+
+        cursor = request.query.get('cursor')
+
+        if cursor:
+            cursor = dt_util.parse_datetime(cursor)
+
+            if cursor is None:
+                return self.json_message('Invalid cursor', HTTP_BAD_REQUEST)
+
+            start_day = dt_util.as_utc(cursor)
+
+        events, next_start = yield from hass.async_add_job(
+            _get_events_page, hass, self.config, start_day, end_day,
+            entity_id, limit)
+
+        return self.json({
+            'entries': list(humanify(
+                _exclude_events(events, self.config, entity_id))),
+            'cursor': next_start,
+        })
+
+    @asyncio.coroutine
+    def _stream_entries(self, request, start_day, end_day, entity_id):
+        """Stream the entries of a period, reading a page at a time."""
         hass = request.app['hass']
+        response = web.StreamResponse()
+        response.content_type = CONTENT_TYPE_JSON
+        yield from response.prepare(request)
+        separator = '['
 
-        events = yield from hass.async_add_job(
-            _get_events, hass, start_day, end_day)
-        events = _exclude_events(events, self.config)
-        return self.json(humanify(events))
+        while start_day is not None:
+            events, start_day = yield from hass.async_add_job(
+                _get_events_page, hass, self.config, start_day, end_day,
+                entity_id, PAGE_SIZE)
+
+            for entry in humanify(
+                    _exclude_events(events, self.config, entity_id)):
+                response.write('{}{}'.format(separator, json.dumps(
+                    entry, sort_keys=True, cls=JSONEncoder)).encode('UTF-8'))
+                separator = ', '
+
+            yield from response.drain()
+
+        response.write(b']' if separator == ', ' else b'[]')
+        yield from response.write_eof()
+        return response
 
 
 class Entry(object):
@@ -274,22 +337,186 @@ def humanify(events):
                     entity_id)
 
 
-def _get_events(hass, start_day, end_day):
+def _get_events(hass, config, start_day, end_day, entity_id=None):
     """Get events for a period of time."""
-    from homeassistant.components.recorder.models import Events
     from homeassistant.components.recorder.util import (
         execute, session_scope)
 
     with session_scope(hass=hass) as session:
-        query = session.query(Events).order_by(
-            Events.time_fired).filter(
-                (Events.time_fired > start_day) &
-                (Events.time_fired < end_day))
-        return execute(query)
+        query = _events_query(session, config, start_day, end_day, entity_id)
+        return execute([_LogbookRow(*row) for row in query])
 
 
-def _exclude_events(events, config):
-    """Get lists of excluded entities and platforms."""
+def _get_events_page(hass, config, start, end_day, entity_id, limit):
+    """Get the events of a page, and the start of the next page.
+
+    Pages end where a group of GROUP_BY_MINUTES ends, so humanify groups
+    the events of a page as it would for the whole period. A page only
+    has more than limit events when a single group does. The start of the
+    next page is None for the last page.
+    """
+    from homeassistant.components.recorder.models import process_timestamp
+    from homeassistant.components.recorder.util import (
+        execute, session_scope)
+
+    with session_scope(hass=hass) as session:
+        rows = _events_query(
+            session, config, start, end_day, entity_id).limit(
+                limit + 1).all()
+        next_start = None
+
+        if len(rows) > limit:
+            next_start = _group_start(process_timestamp(
+                rows[limit][0].time_fired))
+
+            if next_start <= process_timestamp(rows[0][0].time_fired):
+                next_start += timedelta(minutes=GROUP_BY_MINUTES)
+                rows = _events_query(
+                    session, config, start, min(next_start, end_day),
+                    entity_id).all()
+            else:
+                rows = [row for row in rows[:limit]
+                        if process_timestamp(row[0].time_fired) < next_start]
+
+            if next_start >= end_day:
+                next_start = None
+
+        return execute([_LogbookRow(*row) for row in rows]), next_start
+
+
+def _group_start(time_fired):
+    """Return the start of the group of GROUP_BY_MINUTES of a time."""
+    return time_fired.replace(
+        minute=time_fired.minute - time_fired.minute % GROUP_BY_MINUTES,
+        second=0, microsecond=0)
+
+
+def _events_query(session, config, start, end, entity_id=None):
+    """Query the events of a period that can show in the logbook.
+
+    State changed events that _exclude_events or humanify always drop are
+    excluded in SQL, so they are never read: attribute changes, new and
+    removed entities, continuous sensors with a unit of measurement and
+    entities excluded by the config.
+    """
+    from sqlalchemy import and_, func
+    from sqlalchemy.orm import aliased, contains_eager
+    from homeassistant.components.recorder.models import (
+        Events, States, StateAttributes)
+
+    old_states = aliased(States)
+    attributes = func.coalesce(StateAttributes.shared_attrs, States.attributes)
+
+    # Events recorded before the states got linked to their old state still
+    # contain the old state in the event data.
+    state_filter = and_(
+        Events.event_type == EVENT_STATE_CHANGED,
+        States.last_changed == States.last_updated,
+        States.state != '',
+        old_states.state_id.isnot(None) |
+        Events.event_data.like('%"old_state": {%'),
+        ~(States.domain.in_(CONTINUOUS_DOMAINS) &
+          attributes.like(UNIT_OF_MEASUREMENT_LIKE)),
+        *_entity_filters(States, config))
+
+    if entity_id is not None:
+        event_filter = (state_filter & (States.entity_id == entity_id)) | (
+            (Events.event_type == EVENT_LOGBOOK_ENTRY) &
+            Events.event_data.like('%"entity_id": {}%'.format(
+                json.dumps(entity_id))))
+    else:
+        event_filter = state_filter | Events.event_type.in_((
+            EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP,
+            EVENT_LOGBOOK_ENTRY))
+
+    return session.query(Events, States, old_states).outerjoin(
+        States, States.event_id == Events.event_id).outerjoin(
+            StateAttributes,
+            States.attributes_id == StateAttributes.attributes_id).outerjoin(
+                old_states, States.old_state_id == old_states.state_id
+            ).options(contains_eager(States.state_attributes)).filter(
+                (Events.time_fired >= start) & (Events.time_fired < end) &
+                event_filter).order_by(Events.time_fired, Events.event_id)
+
+
+def _entity_filters(states, config):
+    """Return the SQL filters on states of the include/exclude config.
+
+    Mirrors how _exclude_events filters state changed events.
+    """
+    exclude = config.get(CONF_EXCLUDE, {})
+    include = config.get(CONF_INCLUDE, {})
+    excluded_entities = exclude.get(CONF_ENTITIES)
+    excluded_domains = exclude.get(CONF_DOMAINS)
+    included_entities = include.get(CONF_ENTITIES)
+    included_domains = include.get(CONF_DOMAINS)
+    filters = []
+
+    def or_included_entities(domain_filter):
+        """Return a filter on domains that keeps the included entities."""
+        if not included_entities:
+            return domain_filter
+        return domain_filter | states.entity_id.in_(included_entities)
+
+    if excluded_domains and not included_domains:
+        filters.append(or_included_entities(
+            ~states.domain.in_(excluded_domains)))
+    elif included_domains and not excluded_domains:
+        filters.append(or_included_entities(
+            states.domain.in_(included_domains)))
+    elif excluded_domains and included_domains:
+        filters.append(~states.domain.in_(excluded_domains))
+        filters.append(or_included_entities(
+            states.domain.in_(included_domains)))
+    elif included_entities:
+        filters.append(states.entity_id.in_(included_entities))
+
+    if excluded_entities:
+        filters.append(~states.entity_id.in_(excluded_entities))
+
+    return filters
+
+
+class _LogbookRow(object):
+    """Event row joined with the states of state changed events."""
+
+    def __init__(self, event, new_state, old_state):
+        """Initialize the row."""
+        self.event = event
+        self.new_state = new_state
+        self.old_state = old_state
+
+    def to_native(self):
+        """Convert to an event with the states in the event data.
+
+        The recorder stores the states of state changed events in the states
+        table. Events recorded before it did still contain the states.
+        """
+        event = self.event.to_native()
+
+        if event is None or event.event_type != EVENT_STATE_CHANGED or \
+                'new_state' in event.data:
+            return event
+
+        event.data['new_state'] = _state_row_as_dict(self.new_state)
+        event.data['old_state'] = _state_row_as_dict(self.old_state)
+        return event
+
+
+def _state_row_as_dict(row):
+    """Return the dict representation of a recorded state."""
+    if row is None or row.state == '':
+        return None
+
+    state = row.to_native()
+    return None if state is None else state.as_dict()
+
+
+def _exclude_events(events, config, only_entity_id=None):
+    """Get lists of excluded entities and platforms.
+
+    With only_entity_id, only the events of that entity are kept.
+    """
     excluded_entities = []
     excluded_domains = []
     included_entities = []
@@ -329,6 +556,9 @@ def _exclude_events(events, config):
             domain = event.data.get(ATTR_DOMAIN)
             entity_id = event.data.get(ATTR_ENTITY_ID)
 
+        if only_entity_id is not None and entity_id != only_entity_id:
+            continue
+
         if domain or entity_id:
             # filter if only excluded is configured for this domain
             if excluded_domains and domain in excluded_domains and \
@@ -4,15 +4,17 @@ Support for sending data to Logentries webhook endpoint.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/logentries/
 """
+import asyncio
 import json
 import logging
-import requests
 
 import voluptuous as vol
 
 import homeassistant.helpers.config_validation as cv
-from homeassistant.const import (CONF_TOKEN, EVENT_STATE_CHANGED)
+from homeassistant.const import CONF_TOKEN
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.exporter import BatchExporter, EXPORTER_SCHEMA
+from homeassistant.remote import JSONEncoder
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,7 +23,7 @@ DOMAIN = 'logentries'
 DEFAULT_HOST = 'https://webhook.logentries.com/noformat/logs/'
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Required(CONF_TOKEN): cv.string,
     }),
 }, extra=vol.ALLOW_EXTRA)
@@ -29,19 +31,28 @@ CONFIG_SCHEMA = vol.Schema({
 
 def setup(hass, config):
     """Set up the Logentries component."""
-    conf = config[DOMAIN]
-    token = conf.get(CONF_TOKEN)
-    le_wh = '{}{}'.format(DEFAULT_HOST, token)
-
-    def logentries_event_listener(event):
-        """Listen for new messages on the bus and sends them to Logentries."""
-        state = event.data.get('new_state')
-        if state is None:
-            return
+    LogentriesExporter(hass, config[DOMAIN]).start()
+
+    return True
+
+
+class LogentriesExporter(BatchExporter):
+    """Send the states to the Logentries webhook in batches."""
+
+    def __init__(self, hass, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'Logentries', conf)
+        self.le_wh = '{}{}'.format(DEFAULT_HOST, conf.get(CONF_TOKEN))
+
+    def convert(self, event):
+        """Return the log entry for a state change."""
+        state = event.data['new_state']
+
         try:
             _state = state_helper.state_as_number(state)
         except ValueError:
             _state = state.state
+
         json_body = [
             {
                 'domain': state.domain,
@@ -51,15 +62,15 @@ def setup(hass, config):
                 'value': _state,
             }
         ]
-        try:
-            payload = {
-                "host": le_wh,
-                "event": json_body
-            }
-            requests.post(le_wh, data=json.dumps(payload), timeout=10)
-        except requests.exceptions.RequestException as error:
-            _LOGGER.exception("Error sending to Logentries: %s", error)
 
-    hass.bus.listen(EVENT_STATE_CHANGED, logentries_event_listener)
+        return {
+            "host": self.le_wh,
+            "event": json_body
+        }
 
-    return True
+    @asyncio.coroutine
+    def async_send(self, batch):
+        """Post a batch of log entries, one per line."""
+        yield from self.async_post(
+            self.le_wh, data='\n'.join(json.dumps(payload, cls=JSONEncoder)
+                                       for payload in batch))
@@ -10,7 +10,6 @@ import os
 import socket
 import time
 import ssl
-import re
 import requests.certs
 
 import voluptuous as vol
@@ -21,7 +20,7 @@ from homeassistant.config import load_yaml_config_file
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import template, config_validation as cv
 from homeassistant.helpers.dispatcher import (
-    async_dispatcher_connect, dispatcher_send)
+    async_dispatcher_connect, async_dispatcher_send, dispatcher_send)
 from homeassistant.util.async import (
     run_coroutine_threadsafe, run_callback_threadsafe)
 from homeassistant.const import (
@@ -36,6 +35,7 @@ _LOGGER = logging.getLogger(__name__)
 DOMAIN = 'mqtt'
 
 DATA_MQTT = 'mqtt'
+DATA_MQTT_SUBSCRIPTIONS = 'mqtt_subscriptions'
 
 SERVICE_PUBLISH = 'publish'
 SIGNAL_MQTT_MESSAGE_RECEIVED = 'mqtt_message_received'
@@ -51,6 +51,7 @@ CONF_CLIENT_KEY = 'client_key'
 CONF_CLIENT_CERT = 'client_cert'
 CONF_TLS_INSECURE = 'tls_insecure'
 CONF_TLS_VERSION = 'tls_version'
+CONF_EVENT_LOOP = 'event_loop'
 
 CONF_BIRTH_MESSAGE = 'birth_message'
 CONF_WILL_MESSAGE = 'will_message'
@@ -71,6 +72,7 @@ DEFAULT_PROTOCOL = PROTOCOL_311
 DEFAULT_DISCOVERY = False
 DEFAULT_DISCOVERY_PREFIX = 'homeassistant'
 DEFAULT_TLS_PROTOCOL = 'auto'
+DEFAULT_EVENT_LOOP = False
 
 ATTR_TOPIC = 'topic'
 ATTR_PAYLOAD = 'payload'
@@ -80,6 +82,9 @@ ATTR_RETAIN = CONF_RETAIN
 
 MAX_RECONNECT_WAIT = 300  # seconds
 
+# Interval of the keepalive and retry checks when the event loop drives paho
+LOOP_MISC_INTERVAL = 1  # seconds
+
 
 def valid_subscribe_topic(value, invalid_chars='\0'):
     """Validate that we can subscribe using this MQTT topic."""
@@ -130,6 +135,7 @@ CONFIG_SCHEMA = vol.Schema({
             vol.Any('auto', '1.0', '1.1', '1.2'),
         vol.Optional(CONF_PROTOCOL, default=DEFAULT_PROTOCOL):
             vol.All(cv.string, vol.In([PROTOCOL_31, PROTOCOL_311])),
+        vol.Optional(CONF_EVENT_LOOP, default=DEFAULT_EVENT_LOOP): cv.boolean,
         vol.Optional(CONF_EMBEDDED): HBMQTT_CONFIG_SCHEMA,
         vol.Optional(CONF_WILL_MESSAGE): MQTT_WILL_BIRTH_SCHEMA,
         vol.Optional(CONF_BIRTH_MESSAGE): MQTT_WILL_BIRTH_SCHEMA,
@@ -206,10 +212,7 @@ def async_subscribe(hass, topic, msg_callback, qos=DEFAULT_QOS,
     """Subscribe to an MQTT topic."""
     @callback
     def async_mqtt_topic_subscriber(dp_topic, dp_payload, dp_qos):
-        """Match subscribed MQTT topic."""
-        if not _match_topic(topic, dp_topic):
-            return
-
+        """Handle a message on the subscribed MQTT topic."""
         if encoding is not None:
             try:
                 payload = dp_payload.decode(encoding)
@@ -225,13 +228,43 @@ def async_subscribe(hass, topic, msg_callback, qos=DEFAULT_QOS,
 
         hass.async_run_job(msg_callback, dp_topic, payload, dp_qos)
 
-    async_remove = async_dispatcher_connect(
-        hass, SIGNAL_MQTT_MESSAGE_RECEIVED, async_mqtt_topic_subscriber)
+    subscriptions = _async_get_subscriptions(hass)
+    subscriptions.add(topic, async_mqtt_topic_subscriber)
+
+    @callback
+    def async_remove():
+        """Remove the subscription."""
+        subscriptions.remove(topic, async_mqtt_topic_subscriber)
 
     yield from hass.data[DATA_MQTT].async_subscribe(topic, qos)
     return async_remove
 
 
+@callback
+def _async_get_subscriptions(hass):
+    """Return the subscriptions, routing the received messages to them."""
+    subscriptions = hass.data.get(DATA_MQTT_SUBSCRIPTIONS)
+
+    if subscriptions is not None:
+        return subscriptions
+
+    subscriptions = hass.data[DATA_MQTT_SUBSCRIPTIONS] = SubscriptionTrie()
+
+    @callback
+    def async_route_message(dp_topic, dp_payload, dp_qos):
+        """Run the subscribers of which the topic matches the message."""
+        for subscriber in subscriptions.matches(dp_topic):
+            try:
+                subscriber(dp_topic, dp_payload, dp_qos)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error handling MQTT message on %s",
+                                  dp_topic)
+
+    async_dispatcher_connect(
+        hass, SIGNAL_MQTT_MESSAGE_RECEIVED, async_route_message)
+    return subscriptions
+
+
 def subscribe(hass, topic, msg_callback, qos=DEFAULT_QOS,
               encoding='utf-8'):
     """Subscribe to an MQTT topic."""
@@ -344,6 +377,7 @@ def async_setup(hass, config):
 
     will_message = conf.get(CONF_WILL_MESSAGE)
     birth_message = conf.get(CONF_BIRTH_MESSAGE)
+    event_loop = conf[CONF_EVENT_LOOP]
 
     # Be able to override versions other than TLSv1.0 under Python3.6
     conf_tls_version = conf.get(CONF_TLS_VERSION)
@@ -365,7 +399,7 @@ def async_setup(hass, config):
         hass.data[DATA_MQTT] = MQTT(
             hass, broker, port, client_id, keepalive, username, password,
             certificate, client_key, client_cert, tls_insecure, protocol,
-            will_message, birth_message, tls_version)
+            will_message, birth_message, tls_version, event_loop)
     except socket.error:
         _LOGGER.exception("Can't connect to the broker. "
                           "Please check your settings and the broker itself")
@@ -419,12 +453,17 @@ def async_setup(hass, config):
 
 
 class MQTT(object):
-    """Home Assistant MQTT client."""
+    """Home Assistant MQTT client.
+
+    By default paho runs its own network thread. With event_loop the socket
+    is driven by the event loop instead, so messages are received and
+    published without leaving the event loop thread.
+    """
 
     def __init__(self, hass, broker, port, client_id, keepalive, username,
                  password, certificate, client_key, client_cert,
                  tls_insecure, protocol, will_message, birth_message,
-                 tls_version):
+                 tls_version, event_loop=DEFAULT_EVENT_LOOP):
         """Initialize Home Assistant MQTT client."""
         import paho.mqtt.client as mqtt
 
@@ -437,6 +476,10 @@ class MQTT(object):
         self.birth_message = birth_message
         self._mqttc = None
         self._paho_lock = asyncio.Lock(loop=hass.loop)
+        self._event_loop = event_loop
+        self._socket_fd = None
+        self._writing = False
+        self._misc_timer = None
 
         if protocol == PROTOCOL_31:
             proto = mqtt.MQTTv31
@@ -478,7 +521,7 @@ class MQTT(object):
         This method must be run in the event loop and returns a coroutine.
         """
         with (yield from self._paho_lock):
-            yield from self.hass.async_add_job(
+            yield from self._async_paho_call(
                 self._mqttc.publish, topic, payload, qos, retain)
 
     @asyncio.coroutine
@@ -493,22 +536,30 @@ class MQTT(object):
         if result != 0:
             import paho.mqtt.client as mqtt
             _LOGGER.error('Failed to connect: %s', mqtt.error_string(result))
+        elif self._event_loop:
+            self._async_start_loop()
         else:
             self._mqttc.loop_start()
 
         return not result
 
+    @asyncio.coroutine
     def async_disconnect(self):
         """Stop the MQTT client.
 
-        This method must be run in the event loop and returns a coroutine.
+        This method is a coroutine.
         """
+        if self._event_loop:
+            self._mqttc.disconnect()
+            self._async_stop_loop()
+            return
+
         def stop():
             """Stop the MQTT client."""
             self._mqttc.disconnect()
             self._mqttc.loop_stop()
 
-        return self.hass.async_add_job(stop)
+        yield from self.hass.async_add_job(stop)
 
     @asyncio.coroutine
     def async_subscribe(self, topic, qos):
@@ -523,7 +574,7 @@ class MQTT(object):
             if topic in self.topics:
                 return
 
-            result, mid = yield from self.hass.async_add_job(
+            result, mid = yield from self._async_paho_call(
                 self._mqttc.subscribe, topic, qos)
 
             _raise_on_error(result)
@@ -536,12 +587,128 @@ class MQTT(object):
 
         This method is a coroutine.
         """
-        result, mid = yield from self.hass.async_add_job(
+        result, mid = yield from self._async_paho_call(
             self._mqttc.unsubscribe, topic)
 
         _raise_on_error(result)
         self.progress[mid] = topic
 
+    @asyncio.coroutine
+    def _async_paho_call(self, method, *args):
+        """Call a method of the paho client and return its result.
+
+        When the event loop drives the client, paho never blocks and is
+        called directly. Otherwise it runs in the executor.
+
+        This method is a coroutine.
+        """
+        if not self._event_loop:
+            result = yield from self.hass.async_add_job(method, *args)
+            return result
+
+        result = method(*args)
+        self._async_update_writer()
+        return result
+
+    @callback
+    def _async_start_loop(self):
+        """Start driving the socket of the paho client."""
+        # Keep the descriptor, paho closes the socket before it reports
+        # the disconnect.
+        self._socket_fd = self._mqttc.socket().fileno()
+        self.hass.loop.add_reader(self._socket_fd, self._async_loop_read)
+        self._async_update_writer()
+        self._async_loop_misc()
+
+    @callback
+    def _async_stop_loop(self):
+        """Stop driving the socket of the paho client."""
+        if self._misc_timer is not None:
+            self._misc_timer.cancel()
+            self._misc_timer = None
+
+        if self._socket_fd is None:
+            return
+
+        self.hass.loop.remove_reader(self._socket_fd)
+
+        if self._writing:
+            self.hass.loop.remove_writer(self._socket_fd)
+            self._writing = False
+
+        self._socket_fd = None
+
+    @callback
+    def _async_update_writer(self):
+        """Only wait for the socket to be writable if paho has data."""
+        if self._socket_fd is None:
+            return
+
+        want_write = self._mqttc.want_write()
+
+        if want_write and not self._writing:
+            self.hass.loop.add_writer(
+                self._socket_fd, self._async_loop_write)
+        elif not want_write and self._writing:
+            self.hass.loop.remove_writer(self._socket_fd)
+
+        self._writing = want_write
+
+    @callback
+    def _async_loop_read(self):
+        """Read from the socket."""
+        pending = getattr(self._mqttc.socket(), 'pending', None)
+        self._mqttc.loop_read()
+
+        # Data that SSL already decrypted does not wake up the reader again
+        while pending is not None and self._socket_fd is not None and \
+                pending():
+            self._mqttc.loop_read()
+
+        self._async_update_writer()
+
+    @callback
+    def _async_loop_write(self):
+        """Write to the socket."""
+        self._mqttc.loop_write()
+        self._async_update_writer()
+
+    @callback
+    def _async_loop_misc(self):
+        """Send keepalives and retry unacknowledged messages."""
+        # Reschedule first, a lost connection stops the loop
+        self._misc_timer = self.hass.loop.call_later(
+            LOOP_MISC_INTERVAL, self._async_loop_misc)
+        self._mqttc.loop_misc()
+        self._async_update_writer()
+
+    @asyncio.coroutine
+    def _async_reconnect(self, result_code):
+        """Reconnect to the broker without blocking the event loop.
+
+        This method is a coroutine.
+        """
+        tries = 0
+
+        while True:
+            try:
+                result = yield from self.hass.async_add_job(
+                    self._mqttc.reconnect)
+
+                if result == 0:
+                    _LOGGER.info("Successfully reconnected to the MQTT server")
+                    self._async_start_loop()
+                    return
+            except socket.error:
+                pass
+
+            wait_time = min(2**tries, MAX_RECONNECT_WAIT)
+            _LOGGER.warning(
+                "Disconnected from MQTT (%s). Trying to reconnect in %s s",
+                result_code, wait_time)
+            yield from asyncio.sleep(wait_time, loop=self.hass.loop)
+            tries += 1
+
     def _mqtt_on_connect(self, _mqttc, _userdata, _flags, result_code):
         """On connect callback.
 
@@ -582,6 +749,12 @@ class MQTT(object):
 
     def _mqtt_on_message(self, _mqttc, _userdata, msg):
         """Message received callback."""
+        if self._event_loop:
+            async_dispatcher_send(
+                self.hass, SIGNAL_MQTT_MESSAGE_RECEIVED, msg.topic,
+                msg.payload, msg.qos)
+            return
+
         dispatcher_send(
             self.hass, SIGNAL_MQTT_MESSAGE_RECEIVED, msg.topic, msg.payload,
             msg.qos
@@ -605,10 +778,17 @@ class MQTT(object):
             if self.topics[key] is None:
                 self.topics.pop(key)
 
+        if self._event_loop:
+            self._async_stop_loop()
+
         # When disconnected because of calling disconnect()
         if result_code == 0:
             return
 
+        if self._event_loop:
+            self.hass.async_add_job(self._async_reconnect(result_code))
+            return
+
         tries = 0
         wait_time = 0
 
@@ -638,22 +818,89 @@ def _raise_on_error(result):
             'Error talking to MQTT: {}'.format(mqtt.error_string(result)))
 
 
-def _match_topic(subscription, topic):
-    """Test if topic matches subscription."""
-    reg_ex_parts = []
-    suffix = ""
-    if subscription.endswith('#'):
-        subscription = subscription[:-2]
-        suffix = "(.*)"
-    sub_parts = subscription.split('/')
-    for sub_part in sub_parts:
-        if sub_part == "+":
-            reg_ex_parts.append(r"([^\/]+)")
-        else:
-            reg_ex_parts.append(re.escape(sub_part))
+class _TrieNode(object):
+    """A level of topic filters in the subscription trie."""
+
+    __slots__ = ('children', 'subscribers')
+
+    def __init__(self):
+        """Initialize the node."""
+        self.children = {}
+        self.subscribers = []
+
+
+class SubscriptionTrie(object):
+    """Subscribers indexed by the levels of their topic filter.
+
+    Matching a topic only visits the levels of the topic, following the
+    + and # wildcards, instead of testing every subscription.
+    """
+
+    def __init__(self):
+        """Initialize the trie."""
+        self._root = _TrieNode()
+
+    def add(self, topic_filter, subscriber):
+        """Add a subscriber for a topic filter."""
+        node = self._root
+
+        for level in topic_filter.split('/'):
+            child = node.children.get(level)
+
+            if child is None:
+                child = node.children[level] = _TrieNode()
+
+            node = child
+
+        node.subscribers.append(subscriber)
+
+    def remove(self, topic_filter, subscriber):
+        """Remove a subscriber of a topic filter, and unused levels."""
+        levels = topic_filter.split('/')
+        path = [self._root]
+
+        for level in levels:
+            node = path[-1].children.get(level)
+
+            if node is None:
+                return
+
+            path.append(node)
+
+        try:
+            path[-1].subscribers.remove(subscriber)
+        except ValueError:
+            return
+
+        for depth in range(len(levels), 0, -1):
+            if path[depth].subscribers or path[depth].children:
+                break
+            del path[depth - 1].children[levels[depth - 1]]
+
+    def matches(self, topic):
+        """Return the subscribers of the topic filters matching a topic."""
+        subscribers = []
+        self._match(self._root, topic.split('/'), 0, subscribers)
+        return subscribers
+
+    def _match(self, node, levels, index, subscribers):
+        """Add the subscribers under a node matching the levels from index."""
+        # A multi-level wildcard also matches its parent level
+        multi_level = node.children.get('#')
+
+        if multi_level is not None:
+            subscribers.extend(multi_level.subscribers)
+
+        if index == len(levels):
+            subscribers.extend(node.subscribers)
+            return
+
+        child = node.children.get(levels[index])
 
-    reg_ex = "^" + (r'\/'.join(reg_ex_parts)) + suffix + "$"
+        if child is not None:
+            self._match(child, levels, index + 1, subscribers)
 
-    reg = re.compile(reg_ex)
+        single_level = node.children.get('+')
 
-    return reg.match(topic) is not None
+        if single_level is not None:
+            self._match(single_level, levels, index + 1, subscribers)
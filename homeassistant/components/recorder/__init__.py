@@ -8,6 +8,7 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/recorder/
 """
 import asyncio
+from collections import OrderedDict
 import concurrent.futures
 import logging
 import queue
@@ -18,19 +19,20 @@ from typing import Optional, Dict
 
 import voluptuous as vol
 
-from homeassistant.core import (
-    HomeAssistant, callback, split_entity_id, CoreState)
+from homeassistant.core import HomeAssistant, callback, CoreState
 from homeassistant.const import (
-    ATTR_ENTITY_ID, CONF_ENTITIES, CONF_EXCLUDE, CONF_DOMAINS,
-    CONF_INCLUDE, EVENT_HOMEASSISTANT_STOP, EVENT_HOMEASSISTANT_START,
-    EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL)
+    CONF_ENTITIES, CONF_EXCLUDE, CONF_DOMAINS, CONF_INCLUDE,
+    EVENT_HOMEASSISTANT_STOP, EVENT_HOMEASSISTANT_START, EVENT_STATE_CHANGED,
+    MATCH_ALL)
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.typing import ConfigType
 import homeassistant.util.dt as dt_util
 
 from . import purge, migration
-from .const import DATA_INSTANCE
+from .const import (
+    CONF_ENTITY_GLOBS, CONF_EVENT_TYPES, DATA_INSTANCE, EVENT_RECORDER_PURGED)
+from .filters import RecorderFilter
 from .util import session_scope
 
 REQUIREMENTS = ['sqlalchemy==1.1.11']
@@ -44,21 +46,31 @@ DEFAULT_DB_FILE = 'home-assistant_v2.db'
 
 CONF_DB_URL = 'db_url'
 CONF_PURGE_DAYS = 'purge_days'
-CONF_EVENT_TYPES = 'event_types'
 
 CONNECT_RETRY_WAIT = 3
 
+# Events are committed in batches when either limit is reached
+COMMIT_INTERVAL = 1
+COMMIT_MAX_EVENTS = 1000
+
+# Number of shared attributes of which the id is kept in memory
+ATTRIBUTES_CACHE_SIZE = 2048
+
 FILTER_SCHEMA = vol.Schema({
     vol.Optional(CONF_EXCLUDE, default={}): vol.Schema({
         vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
         vol.Optional(CONF_DOMAINS, default=[]):
             vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(CONF_ENTITY_GLOBS, default=[]):
+            vol.All(cv.ensure_list, [cv.string]),
         vol.Optional(CONF_EVENT_TYPES, default=[]):
             vol.All(cv.ensure_list, [cv.string])
     }),
     vol.Optional(CONF_INCLUDE, default={}): vol.Schema({
         vol.Optional(CONF_ENTITIES, default=[]): cv.entity_ids,
         vol.Optional(CONF_DOMAINS, default=[]):
+            vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(CONF_ENTITY_GLOBS, default=[]):
             vol.All(cv.ensure_list, [cv.string])
     })
 })
@@ -141,13 +153,18 @@ class Recorder(threading.Thread):
         self.engine = None  # type: Any
         self.run_info = None  # type: Any
 
-        self.include_e = include.get(CONF_ENTITIES, [])
-        self.include_d = include.get(CONF_DOMAINS, [])
-        self.exclude = exclude.get(CONF_ENTITIES, []) + \
-            exclude.get(CONF_DOMAINS, [])
-        self.exclude_t = exclude.get(CONF_EVENT_TYPES, [])
+        self.filter = RecorderFilter(include, exclude)
 
         self.get_session = None
+        self.event_session = None
+        self._uncommitted = 0
+        self._commit_task = object()
+        self.purge_task = object()
+        self._attributes_ids = OrderedDict()
+        self._pending_attributes = []
+        self._old_state_ids = {}
+        self._pending_old_state_ids = {}
+        self.purge_run = None  # type: Any
 
     @callback
     def async_initialize(self):
@@ -156,7 +173,7 @@ class Recorder(threading.Thread):
 
     def run(self):
         """Start processing events to save."""
-        from .models import States, Events
+        from .models import Events
         from homeassistant.components import persistent_notification
 
         tries = 1
@@ -189,7 +206,6 @@ class Recorder(threading.Thread):
             self.hass.add_job(connection_failed)
             return
 
-        purge_task = object()
         shutdown_task = object()
         hass_started = concurrent.futures.Future()
 
@@ -223,7 +239,7 @@ class Recorder(threading.Thread):
                 @callback
                 def do_purge(now):
                     """Event listener for purging data."""
-                    self.queue.put(purge_task)
+                    self.queue.put(self.purge_task)
 
                 async_track_time_interval(self.hass, do_purge,
                                           timedelta(days=2))
@@ -235,64 +251,193 @@ class Recorder(threading.Thread):
         if result is shutdown_task:
             return
 
+        commit_deadline = None
+
         while True:
-            event = self.queue.get()
+            try:
+                if self.event_session is None:
+                    event = self.queue.get()
+                else:
+                    event = self.queue.get(timeout=max(
+                        0, commit_deadline - time.monotonic()))
+            except queue.Empty:
+                self._commit_event_session()
+                continue
 
             if event is None:
+                self._commit_event_session()
                 self._close_run()
                 self._close_connection()
+                _LOGGER.info(
+                    "Recorded %d events, %d events were filtered out",
+                    self.filter.recorded, self.filter.dropped)
                 self.queue.task_done()
                 return
-            elif event is purge_task:
-                purge.purge_old_data(self, self.purge_days)
-                continue
-            elif event.event_type == EVENT_TIME_CHANGED:
+            elif event is self.purge_task:
+                self._commit_event_session()
+                self._purge_batch()
                 self.queue.task_done()
                 continue
-            elif event.event_type in self.exclude_t:
+            elif event is self._commit_task:
+                self._commit_event_session()
                 self.queue.task_done()
                 continue
 
-            entity_id = event.data.get(ATTR_ENTITY_ID)
-            if entity_id is not None:
-                domain = split_entity_id(entity_id)[0]
-
-                # Exclude entities OR
-                # Exclude domains, but include specific entities
-                if (entity_id in self.exclude) or \
-                        (domain in self.exclude and
-                         entity_id not in self.include_e):
-                    self.queue.task_done()
-                    continue
-
-                # Included domains only (excluded entities above) OR
-                # Include entities only, but only if no excludes
-                if (self.include_d and domain not in self.include_d) or \
-                        (self.include_e and entity_id not in self.include_e
-                         and not self.exclude):
-                    self.queue.task_done()
-                    continue
-
-            with session_scope(session=self.get_session()) as session:
-                dbevent = Events.from_event(event)
-                session.add(dbevent)
-
-                if event.event_type == EVENT_STATE_CHANGED:
-                    dbstate = States.from_event(event)
-                    dbstate.event_id = dbevent.event_id
-                    session.add(dbstate)
+            if self.event_session is None:
+                self.event_session = self.get_session()
+                commit_deadline = time.monotonic() + COMMIT_INTERVAL
 
-            self.queue.task_done()
+            # The event is marked done once its batch has been committed
+            self._uncommitted += 1
+
+            # Each event is added in a savepoint, so an event that fails is
+            # rolled back without losing the rest of the batch
+            pending_attributes = len(self._pending_attributes)
+
+            try:
+                with self.event_session.begin_nested():
+                    dbevent = Events.from_event(event)
+                    self.event_session.add(dbevent)
+
+                    if event.event_type == EVENT_STATE_CHANGED:
+                        self._add_state(event, dbevent)
+
+                    self.event_session.flush()
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error adding event: %s", event)
+
+                # Forget the attributes that have been rolled back
+                for shared_attrs in \
+                        self._pending_attributes[pending_attributes:]:
+                    self._attributes_ids.pop(shared_attrs, None)
+                del self._pending_attributes[pending_attributes:]
+
+            # The queue is not empty under load, so the deadline is checked
+            # after each event too
+            if self._uncommitted >= COMMIT_MAX_EVENTS or \
+                    time.monotonic() >= commit_deadline:
+                self._commit_event_session()
+
+    def _add_state(self, event, dbevent):
+        """Add the state of a state_changed event to the session."""
+        from .models import States
+
+        session = self.event_session
+        dbstate = States.from_event(event)
+        dbstate.attributes_id = self._get_attributes_id(event)
+        dbstate.old_state_id = self._pending_old_state_ids.get(
+            dbstate.entity_id, self._old_state_ids.get(dbstate.entity_id))
+        session.flush()
+        dbstate.event_id = dbevent.event_id
+        session.add(dbstate)
+        session.flush()
+
+        # The ids are known to be stored once the batch has been committed
+        if event.data.get('new_state') is None:
+            self._pending_old_state_ids[dbstate.entity_id] = None
+        else:
+            self._pending_old_state_ids[dbstate.entity_id] = dbstate.state_id
+
+    def _get_attributes_id(self, event):
+        """Return the id of the shared attributes of a new state.
+
+        The attributes are added to the session if they are not stored yet.
+        """
+        from .models import StateAttributes
+
+        dbattributes = StateAttributes.from_event(event)
+        shared_attrs = dbattributes.shared_attrs
+        attributes_id = self._attributes_ids.get(shared_attrs)
+
+        if attributes_id is None:
+            stored = self.event_session.query(
+                StateAttributes.attributes_id).filter(
+                    (StateAttributes.hash == dbattributes.hash) &
+                    (StateAttributes.shared_attrs == shared_attrs)).first()
+
+            if stored is None:
+                self.event_session.add(dbattributes)
+                self.event_session.flush()
+                self._pending_attributes.append(shared_attrs)
+                attributes_id = dbattributes.attributes_id
+            else:
+                attributes_id = stored[0]
+
+            self._attributes_ids[shared_attrs] = attributes_id
+
+            if len(self._attributes_ids) > ATTRIBUTES_CACHE_SIZE:
+                self._attributes_ids.popitem(last=False)
+        else:
+            self._attributes_ids.move_to_end(shared_attrs)
+
+        return attributes_id
+
+    def _purge_batch(self):
+        """Purge a batch of old data.
+
+        The purge task is queued again until the purge has finished, so new
+        events are recorded between the batches.
+        """
+        if self.purge_run is None or self.purge_run.done:
+            self.purge_run = purge.PurgeRun(self.purge_days)
+
+        try:
+            done = purge.purge_batch(self, self.purge_run)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error purging old data")
+            done = True
+        else:
+            if done:
+                self.hass.bus.fire(
+                    EVENT_RECORDER_PURGED, self.purge_run.as_dict())
+
+        # Attributes might have been deleted
+        self._attributes_ids.clear()
+
+        if not done:
+            self.queue.put(self.purge_task)
 
     @callback
     def event_listener(self, event):
         """Listen for new events and put them in the process queue."""
-        self.queue.put(event)
+        if self.filter.accept(event):
+            self.queue.put(event)
 
     def block_till_done(self):
-        """Block till all events processed."""
+        """Block till all events processed and committed."""
+        self.queue.put(self._commit_task)
         self.queue.join()
 
+    def _commit_event_session(self):
+        """Commit the events that have been added to the session."""
+        if self.event_session is None:
+            return
+
+        try:
+            self.event_session.commit()
+
+            for entity_id, state_id in self._pending_old_state_ids.items():
+                if state_id is None:
+                    self._old_state_ids.pop(entity_id, None)
+                else:
+                    self._old_state_ids[entity_id] = state_id
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error("Error saving events: %s", err)
+            self.event_session.rollback()
+
+            # Forget the ids of rows that have been rolled back
+            for shared_attrs in self._pending_attributes:
+                self._attributes_ids.pop(shared_attrs, None)
+        finally:
+            self.event_session.close()
+            self.event_session = None
+            self._pending_attributes.clear()
+            self._pending_old_state_ids.clear()
+
+        for _ in range(self._uncommitted):
+            self.queue.task_done()
+        self._uncommitted = 0
+
     def _setup_connection(self):
         """Ensure database is ready to fly."""
         from sqlalchemy import create_engine, event
@@ -307,11 +452,15 @@ class Recorder(threading.Thread):
         # pylint: disable=unused-variable
         @event.listens_for(Engine, "connect")
         def set_sqlite_pragma(dbapi_connection, connection_record):
-            """Set sqlite's WAL mode."""
+            """Set sqlite's WAL mode and incremental auto vacuum.
+
+            Auto vacuum only applies to databases created after it is set.
+            """
             if self.db_url.startswith("sqlite://"):
                 old_isolation = dbapi_connection.isolation_level
                 dbapi_connection.isolation_level = None
                 cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
                 cursor.execute("PRAGMA journal_mode=WAL")
                 cursor.close()
                 dbapi_connection.isolation_level = old_isolation
@@ -329,6 +478,21 @@ class Recorder(threading.Thread):
             self.engine.dispose()
 
         self.engine = create_engine(self.db_url, **kwargs)
+
+        if self.db_url.startswith("sqlite://"):
+            # pysqlite doesn't begin a transaction before a savepoint, so
+            # releasing the savepoint of an event would commit it at once
+            @event.listens_for(self.engine, "connect")
+            def disable_pysqlite_transactions(dbapi_connection,
+                                              connection_record):
+                """Leave beginning transactions to SQLAlchemy."""
+                dbapi_connection.isolation_level = None
+
+            @event.listens_for(self.engine, "begin")
+            def begin_sqlite_transaction(connection):
+                """Begin the transaction explicitly."""
+                connection.execute("BEGIN")
+
         models.Base.metadata.create_all(self.engine)
         self.get_session = scoped_session(sessionmaker(bind=self.engine))
 
@@ -1,3 +1,9 @@
 """Recorder constants."""
 
 DATA_INSTANCE = 'recorder_instance'
+
+# Fired with the metrics of a purge once it has finished
+EVENT_RECORDER_PURGED = 'recorder_purged'
+
+CONF_ENTITY_GLOBS = 'entity_globs'
+CONF_EVENT_TYPES = 'event_types'
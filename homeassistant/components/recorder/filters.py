@@ -0,0 +1,96 @@
+"""Filter the events that get recorded."""
+import fnmatch
+import re
+
+from homeassistant.const import (
+    ATTR_ENTITY_ID, CONF_DOMAINS, CONF_ENTITIES, EVENT_TIME_CHANGED)
+from homeassistant.core import split_entity_id
+
+from .const import CONF_ENTITY_GLOBS, CONF_EVENT_TYPES
+
+
+def _compile_globs(globs):
+    """Compile a list of entity_id globs into a single pattern."""
+    if not globs:
+        return None
+
+    return re.compile('|'.join(fnmatch.translate(glob) for glob in globs))
+
+
+class RecorderFilter(object):
+    """Decide which events get recorded.
+
+    Runs in the event loop, so the verdict for an entity_id is cached.
+    """
+
+    def __init__(self, include, exclude):
+        """Initialize the filter."""
+        self._include_e = set(include.get(CONF_ENTITIES, []))
+        self._include_d = set(include.get(CONF_DOMAINS, []))
+        self._include_g = _compile_globs(include.get(CONF_ENTITY_GLOBS))
+        self._exclude_e = set(exclude.get(CONF_ENTITIES, []))
+        self._exclude_d = set(exclude.get(CONF_DOMAINS, []))
+        self._exclude_g = _compile_globs(exclude.get(CONF_ENTITY_GLOBS))
+        self._exclude_t = set(exclude.get(CONF_EVENT_TYPES, []))
+        self._exclude_t.add(EVENT_TIME_CHANGED)
+        self._cache = {}
+        self.recorded = 0
+        self.dropped = 0
+
+    def accept(self, event):
+        """Return if an event should be recorded and count the verdict."""
+        if event.event_type in self._exclude_t:
+            self.dropped += 1
+            return False
+
+        entity_id = event.data.get(ATTR_ENTITY_ID)
+
+        if isinstance(entity_id, str) and not self.accept_entity_id(entity_id):
+            self.dropped += 1
+            return False
+
+        self.recorded += 1
+        return True
+
+    def accept_event_type(self, event_type):
+        """Return if events of a type are recorded."""
+        return event_type not in self._exclude_t
+
+    def accept_entity_id(self, entity_id):
+        """Return if the events of an entity are recorded."""
+        accepted = self._cache.get(entity_id)
+
+        if accepted is None:
+            accepted = self._cache[entity_id] = \
+                self._accept_entity_id(entity_id)
+
+        return accepted
+
+    def _accept_entity_id(self, entity_id):
+        """Return if the events of an entity should be recorded."""
+        domain = split_entity_id(entity_id)[0]
+        included = entity_id in self._include_e or (
+            self._include_g is not None and
+            self._include_g.match(entity_id) is not None)
+
+        # Exclude entities OR
+        # Exclude domains, but include specific entities
+        if entity_id in self._exclude_e or (
+                self._exclude_g is not None and
+                self._exclude_g.match(entity_id) is not None):
+            return False
+
+        if domain in self._exclude_d and not included:
+            return False
+
+        # Included domains only (excluded entities above) OR
+        # Include entities only, but only if no excludes
+        if self._include_d and domain not in self._include_d:
+            return False
+
+        if (self._include_e or self._include_g is not None) and \
+                not included and not (self._exclude_e or self._exclude_d or
+                                      self._exclude_g is not None):
+            return False
+
+        return True
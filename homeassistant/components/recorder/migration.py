@@ -5,6 +5,8 @@ from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+MIGRATE_BATCH_SIZE = 1000
+
 
 def migrate_schema(instance):
     """Check if the schema needs to be upgraded."""
@@ -40,11 +42,19 @@ def _create_index(engine, table_name, index_name):
     """Create an index for the specified table.
 
     The index name should match the name given for the index
-    within the table definition described in the models
+    within the table definition described in the models. An index that
+    already exists is skipped.
     """
     from sqlalchemy import Table
+    from sqlalchemy.engine import reflection
     from . import models
 
+    inspector = reflection.Inspector.from_engine(engine)
+    if any(index['name'] == index_name
+           for index in inspector.get_indexes(table_name)):
+        _LOGGER.debug("Index %s already exists", index_name)
+        return
+
     table = Table(table_name, models.Base.metadata)
     _LOGGER.debug("Looking up index for table %s", table_name)
     # Look up the index object by name from the table is the the models
@@ -54,6 +64,93 @@ def _create_index(engine, table_name, index_name):
     _LOGGER.debug("Finished creating %s", index_name)
 
 
+def _add_columns(engine, table_name, columns_def):
+    """Add columns to a table.
+
+    Columns that already exist are skipped, so an interrupted migration can
+    be run again.
+    """
+    from sqlalchemy.engine import reflection
+
+    inspector = reflection.Inspector.from_engine(engine)
+    existing = {column['name'] for column in inspector.get_columns(table_name)}
+    columns_def = [column_def for column_def in columns_def
+                   if column_def.split(" ")[0] not in existing]
+
+    if not columns_def:
+        return
+
+    _LOGGER.debug("Adding columns %s to table %s",
+                  ", ".join(column.split(" ")[0] for column in columns_def),
+                  table_name)
+
+    for column_def in columns_def:
+        engine.execute("ALTER TABLE {} ADD COLUMN {}".format(
+            table_name, column_def))
+
+
+def _migrate_state_attributes(engine):
+    """Move the attributes of existing states to the state_attributes table.
+
+    States are migrated in batches to limit memory usage, equal attributes
+    are stored once. Attributes stored by earlier batches are looked up by
+    their hash.
+    """
+    from sqlalchemy import bindparam, select
+    from .models import States, StateAttributes
+
+    states = States.__table__
+    state_attributes = StateAttributes.__table__
+    last_state_id = 0
+
+    update = states.update().where(
+        states.c.state_id == bindparam('b_state_id')).values(
+            attributes_id=bindparam('b_attributes_id'), attributes=None)
+
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select([states.c.state_id, states.c.attributes])
+                .where((states.c.state_id > last_state_id) &
+                       states.c.attributes.isnot(None))
+                .order_by(states.c.state_id)
+                .limit(MIGRATE_BATCH_SIZE)).fetchall()
+
+            if not rows:
+                break
+
+            attributes_ids = {}
+
+            for state_id, shared_attrs in rows:
+                if shared_attrs in attributes_ids:
+                    continue
+
+                attrs_hash = StateAttributes.hash_shared_attrs(shared_attrs)
+                stored = connection.execute(
+                    select([state_attributes.c.attributes_id])
+                    .where((state_attributes.c.hash == attrs_hash) &
+                           (state_attributes.c.shared_attrs == shared_attrs))
+                ).first()
+
+                if stored is None:
+                    stored = connection.execute(
+                        state_attributes.insert().values(
+                            hash=attrs_hash, shared_attrs=shared_attrs)
+                    ).inserted_primary_key
+
+                attributes_ids[shared_attrs] = stored[0]
+
+            connection.execute(update, [
+                {'b_state_id': state_id,
+                 'b_attributes_id': attributes_ids[shared_attrs]}
+                for state_id, shared_attrs in rows])
+
+            last_state_id = rows[-1][0]
+
+        _LOGGER.debug("Migrated attributes of states up to id %s",
+                      last_state_id)
+
+
 def _apply_update(engine, new_version):
     """Perform operations to bring schema up to date."""
     if new_version == 1:
@@ -66,6 +163,14 @@ def _apply_update(engine, new_version):
         _create_index(engine, "states", "ix_states_entity_id_created")
     elif new_version == 3:
         _create_index(engine, "states", "ix_states_created_domain")
+    elif new_version == 4:
+        # Share the attributes of states in the state_attributes table
+        _add_columns(engine, "states", [
+            "attributes_id INTEGER REFERENCES state_attributes(attributes_id)",
+            "old_state_id INTEGER",
+        ])
+        _create_index(engine, "states", "ix_states_attributes_id")
+        _migrate_state_attributes(engine)
     else:
         raise ValueError("No schema migration defined for version {}"
                          .format(new_version))
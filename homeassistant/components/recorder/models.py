@@ -1,22 +1,26 @@
 """Models for SQLAlchemy."""
 import json
 from datetime import datetime
+from functools import lru_cache
 import logging
+from types import MappingProxyType
+import zlib
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text,
-    distinct)
+    BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String,
+    Text, distinct)
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 
 import homeassistant.util.dt as dt_util
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_STATE_CHANGED
 from homeassistant.core import Event, EventOrigin, State, split_entity_id
-from homeassistant.remote import JSONEncoder
 
 # SQLAlchemy Schema
 # pylint: disable=invalid-name
 Base = declarative_base()
 
-SCHEMA_VERSION = 3
+SCHEMA_VERSION = 4
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,9 +38,19 @@ class Events(Base):  # type: ignore
 
     @staticmethod
     def from_event(event):
-        """Create an event database object from a native event."""
+        """Create an event database object from a native event.
+
+        The old and new state of state changed events are not stored with
+        the event, they are stored in the states table.
+        """
+        if event.event_type == EVENT_STATE_CHANGED:
+            event_data = json.dumps(
+                {ATTR_ENTITY_ID: event.data.get(ATTR_ENTITY_ID)})
+        else:
+            event_data = event.data_as_json()
+
         return Events(event_type=event.event_type,
-                      event_data=json.dumps(event.data, cls=JSONEncoder),
+                      event_data=event_data,
                       origin=str(event.origin),
                       time_fired=event.time_fired)
 
@@ -47,7 +61,7 @@ class Events(Base):  # type: ignore
                 self.event_type,
                 json.loads(self.event_data),
                 EventOrigin(self.origin),
-                _process_timestamp(self.time_fired)
+                process_timestamp(self.time_fired)
             )
         except ValueError:
             # When json.loads fails
@@ -55,6 +69,33 @@ class Events(Base):  # type: ignore
             return None
 
 
+class StateAttributes(Base):  # type: ignore
+    """State attributes shared by all states that have the same attributes."""
+
+    __tablename__ = 'state_attributes'
+    attributes_id = Column(Integer, primary_key=True)
+    hash = Column(BigInteger, index=True)
+    shared_attrs = Column(Text)
+
+    @staticmethod
+    def from_event(event):
+        """Create an attributes object from a state_changed event."""
+        state = event.data.get('new_state')
+
+        if state is None:
+            shared_attrs = '{}'
+        else:
+            shared_attrs = state.attributes_as_json()
+
+        return StateAttributes(hash=StateAttributes.hash_shared_attrs(
+            shared_attrs), shared_attrs=shared_attrs)
+
+    @staticmethod
+    def hash_shared_attrs(shared_attrs):
+        """Return the hash used to look up attributes."""
+        return zlib.crc32(shared_attrs.encode('utf-8'))
+
+
 class States(Base):   # type: ignore
     """State change history."""
 
@@ -63,7 +104,12 @@ class States(Base):   # type: ignore
     domain = Column(String(64))
     entity_id = Column(String(255))
     state = Column(String(255))
+    # Only set for states recorded before schema version 4
     attributes = Column(Text)
+    attributes_id = Column(Integer,
+                           ForeignKey('state_attributes.attributes_id'),
+                           index=True)
+    old_state_id = Column(Integer)
     event_id = Column(Integer, ForeignKey('events.event_id'))
     last_changed = Column(DateTime(timezone=True), default=datetime.utcnow)
     last_updated = Column(DateTime(timezone=True), default=datetime.utcnow,
@@ -79,6 +125,8 @@ class States(Base):   # type: ignore
                       Index('ix_states_created_domain',
                             'created', 'domain'),)
 
+    state_attributes = relationship(StateAttributes, lazy='joined')
+
     @staticmethod
     def from_event(event):
         """Create object from a state_changed event."""
@@ -91,14 +139,11 @@ class States(Base):   # type: ignore
         if state is None:
             dbstate.state = ''
             dbstate.domain = split_entity_id(entity_id)[0]
-            dbstate.attributes = '{}'
             dbstate.last_changed = event.time_fired
             dbstate.last_updated = event.time_fired
         else:
             dbstate.domain = state.domain
             dbstate.state = state.state
-            dbstate.attributes = json.dumps(dict(state.attributes),
-                                            cls=JSONEncoder)
             dbstate.last_changed = state.last_changed
             dbstate.last_updated = state.last_updated
 
@@ -106,12 +151,17 @@ class States(Base):   # type: ignore
 
     def to_native(self):
         """Convert to an HA state object."""
+        if self.state_attributes is not None:
+            attributes = self.state_attributes.shared_attrs
+        else:
+            attributes = self.attributes or '{}'
+
         try:
             return State(
                 self.entity_id, self.state,
-                json.loads(self.attributes),
-                _process_timestamp(self.last_changed),
-                _process_timestamp(self.last_updated)
+                decode_attributes(attributes),
+                process_timestamp(self.last_changed),
+                process_timestamp(self.last_updated)
             )
         except ValueError:
             # When json.loads fails
@@ -167,7 +217,13 @@ class SchemaChanges(Base):   # type: ignore
     changed = Column(DateTime(timezone=True), default=datetime.utcnow)
 
 
-def _process_timestamp(ts):
+@lru_cache(maxsize=2048)
+def decode_attributes(attributes):
+    """Decode state attributes into a mapping shared by equal rows."""
+    return MappingProxyType(json.loads(attributes))
+
+
+def process_timestamp(ts):
     """Process a timestamp into datetime object."""
     if ts is None:
         return None
@@ -1,6 +1,7 @@
 """Purge old data helper."""
 from datetime import timedelta
 import logging
+import time
 
 import homeassistant.util.dt as dt_util
 
@@ -8,24 +9,153 @@ from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
 
+# Maximum number of rows of a table deleted in one batch
+PURGE_BATCH_SIZE = 1000
+
+# Maximum number of free pages returned to the file system in one batch
+VACUUM_BATCH_PAGES = 2048
+
+
+class PurgeRun(object):
+    """Progress of a purge that is executed in batches."""
+
+    def __init__(self, purge_days):
+        """Initialize the purge run."""
+        self.purge_before = dt_util.utcnow() - timedelta(days=purge_days)
+        self.started = dt_util.utcnow()
+        self.finished = None
+        self.batches = 0
+        self.duration = 0
+        self.states = 0
+        self.events = 0
+        self.attributes = 0
+        self.vacuumed_pages = 0
+
+    @property
+    def done(self):
+        """Return if the purge has finished."""
+        return self.finished is not None
+
+    def as_dict(self):
+        """Return the progress as a dict."""
+        return {
+            'purge_before': self.purge_before,
+            'started': self.started,
+            'finished': self.finished,
+            'batches': self.batches,
+            'duration': self.duration,
+            'states': self.states,
+            'events': self.events,
+            'attributes': self.attributes,
+            'vacuumed_pages': self.vacuumed_pages,
+        }
+
 
 def purge_old_data(instance, purge_days):
     """Purge events and states older than purge_days ago."""
-    from .models import States, Events
-    purge_before = dt_util.utcnow() - timedelta(days=purge_days)
+    purge_run = PurgeRun(purge_days)
+
+    while not purge_batch(instance, purge_run):
+        pass
+
+    return purge_run
+
+
+def purge_batch(instance, purge_run):
+    """Purge one batch of old data, return if the purge has finished.
+
+    Each batch deletes a bounded number of rows so the recorder can store
+    new events between batches. Once all old rows are deleted, the free
+    pages of SQLite databases with incremental auto vacuum are released,
+    also in batches.
+    """
+    start = time.monotonic()
+
+    if not _delete_batch(instance, purge_run) and (
+            instance.engine.dialect.name != 'sqlite' or
+            _vacuum_batch(instance, purge_run)):
+        purge_run.finished = dt_util.utcnow()
+
+    purge_run.batches += 1
+    purge_run.duration += time.monotonic() - start
+    _LOGGER.debug("Purge progress: %s", purge_run.as_dict())
+
+    if purge_run.done:
+        _LOGGER.info(
+            "Purged %s states, %s events and %s state attributes in %s "
+            "batches taking %.2f seconds", purge_run.states, purge_run.events,
+            purge_run.attributes, purge_run.batches, purge_run.duration)
+
+    return purge_run.done
+
+
+def _delete_batch(instance, purge_run):
+    """Delete a batch of old rows, return if any rows were deleted."""
+    from .models import States, StateAttributes, Events
 
     with session_scope(session=instance.get_session()) as session:
-        deleted_rows = session.query(States) \
-                              .filter((States.created < purge_before)) \
-                              .delete(synchronize_session=False)
-        _LOGGER.debug("Deleted %s states", deleted_rows)
-
-        deleted_rows = session.query(Events) \
-                              .filter((Events.created < purge_before)) \
-                              .delete(synchronize_session=False)
-        _LOGGER.debug("Deleted %s events", deleted_rows)
-
-    # Execute sqlite vacuum command to free up space on disk
-    if instance.engine.driver == 'sqlite':
-        _LOGGER.info("Vacuuming SQLite to free space")
-        instance.engine.execute("VACUUM")
+        rows = session.query(States.state_id, States.attributes_id) \
+                      .filter(States.created < purge_run.purge_before) \
+                      .limit(PURGE_BATCH_SIZE).all()
+
+        if rows:
+            purge_run.states += session.query(States) \
+                .filter(States.state_id.in_([row[0] for row in rows])) \
+                .delete(synchronize_session=False)
+
+            # Delete the attributes that are no longer used by any state
+            attributes_ids = set(row[1] for row in rows) - {None}
+
+            if attributes_ids:
+                in_use = session.query(States.state_id).filter(
+                    States.attributes_id ==
+                    StateAttributes.attributes_id).exists()
+                purge_run.attributes += session.query(StateAttributes) \
+                    .filter(StateAttributes.attributes_id.in_(
+                        attributes_ids) & ~in_use) \
+                    .delete(synchronize_session=False)
+
+            return True
+
+        event_ids = [row[0] for row in session.query(Events.event_id)
+                     .filter(Events.created < purge_run.purge_before)
+                     .limit(PURGE_BATCH_SIZE)]
+
+        if event_ids:
+            purge_run.events += session.query(Events) \
+                .filter(Events.event_id.in_(event_ids)) \
+                .delete(synchronize_session=False)
+            return True
+
+    return False
+
+
+def _vacuum_batch(instance, purge_run):
+    """Release a batch of free SQLite pages, return if none are left."""
+    with instance.engine.connect() as connection:
+        # A full VACUUM blocks the database until the whole file has been
+        # rebuilt, so only databases with incremental auto vacuum are shrunk.
+        # Databases created before the recorder enabled it need a one-time
+        # conversion, which also rebuilds the whole file.
+        if connection.execute("PRAGMA auto_vacuum").scalar() != 2:
+            _LOGGER.info(
+                "The database file does not shrink after purging. To enable "
+                "it, stop Home Assistant and run \"PRAGMA auto_vacuum="
+                "INCREMENTAL; VACUUM;\" on the database once")
+            return True
+
+        free_pages = connection.execute("PRAGMA freelist_count").scalar()
+
+        if not free_pages:
+            return True
+
+        # SQLite releases one page per step, fetch to run all steps
+        cursor = connection.connection.cursor()
+        cursor.execute("PRAGMA incremental_vacuum({})".format(
+            VACUUM_BATCH_PAGES))
+        cursor.fetchall()
+        cursor.close()
+        left_pages = connection.execute("PRAGMA freelist_count").scalar()
+        purge_run.vacuumed_pages += free_pages - left_pages
+
+    return not left_pages
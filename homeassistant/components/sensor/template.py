@@ -18,7 +18,8 @@ from homeassistant.const import (
 from homeassistant.exceptions import TemplateError
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import Entity, async_generate_entity_id
-from homeassistant.helpers.event import async_track_state_change
+from homeassistant.helpers.event import (
+    RenderInfoTracker, async_track_state_change)
 from homeassistant.helpers.restore_state import async_get_last_state
 
 _LOGGER = logging.getLogger(__name__)
@@ -45,8 +46,7 @@ def async_setup_platform(hass, config, async_add_devices, discovery_info=None):
     for device, device_config in config[CONF_SENSORS].items():
         state_template = device_config[CONF_VALUE_TEMPLATE]
         icon_template = device_config.get(CONF_ICON_TEMPLATE)
-        entity_ids = (device_config.get(ATTR_ENTITY_ID) or
-                      state_template.extract_entities())
+        entity_ids = device_config.get(ATTR_ENTITY_ID)
         friendly_name = device_config.get(ATTR_FRIENDLY_NAME, device)
         unit_of_measurement = device_config.get(ATTR_UNIT_OF_MEASUREMENT)
 
@@ -89,6 +89,12 @@ class SensorTemplate(Entity):
         self._icon_template = icon_template
         self._icon = None
         self._entities = entity_ids
+        self._tracker = None
+
+        # Without configured entities, track the states the templates read
+        if entity_ids is None:
+            self._tracker = RenderInfoTracker(
+                hass, self._async_template_sensor_state_listener)
 
     @asyncio.coroutine
     def async_added_to_hass(self):
@@ -97,22 +103,25 @@ class SensorTemplate(Entity):
         if state:
             self._state = state.state
 
-        @callback
-        def template_sensor_state_listener(entity, old_state, new_state):
-            """Handle device state changes."""
-            self.hass.async_add_job(self.async_update_ha_state(True))
-
         @callback
         def template_sensor_startup(event):
             """Update template on startup."""
-            async_track_state_change(
-                self.hass, self._entities, template_sensor_state_listener)
+            if self._tracker is None:
+                async_track_state_change(
+                    self.hass, self._entities,
+                    self._async_template_sensor_state_listener)
 
             self.hass.async_add_job(self.async_update_ha_state(True))
 
         self.hass.bus.async_listen_once(
             EVENT_HOMEASSISTANT_START, template_sensor_startup)
 
+    @callback
+    def _async_template_sensor_state_listener(self, entity, old_state,
+                                              new_state):
+        """Handle device state changes."""
+        self.hass.async_add_job(self.async_update_ha_state(True))
+
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -141,8 +150,18 @@ class SensorTemplate(Entity):
     @asyncio.coroutine
     def async_update(self):
         """Update the state from the template."""
+        render_info = self._template.async_render_to_info()
+        icon_render_info = None
+
+        if self._icon_template is not None:
+            icon_render_info = self._icon_template.async_render_to_info()
+
+        if self._tracker is not None:
+            self._tracker.async_update(*filter(None, (
+                render_info, icon_render_info)))
+
         try:
-            self._state = self._template.async_render()
+            self._state = render_info.result()
         except TemplateError as ex:
             if ex.args and ex.args[0].startswith(
                     "UndefinedError: 'None' has no attribute"):
@@ -153,9 +172,9 @@ class SensorTemplate(Entity):
             self._state = None
             _LOGGER.error('Could not render template %s: %s', self._name, ex)
 
-        if self._icon_template is not None:
+        if icon_render_info is not None:
             try:
-                self._icon = self._icon_template.async_render()
+                self._icon = icon_render_info.result()
             except TemplateError as ex:
                 if ex.args and ex.args[0].startswith(
                         "UndefinedError: 'None' has no attribute"):
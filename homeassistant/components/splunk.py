@@ -4,15 +4,17 @@ Support to send data to an Splunk instance.
 For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/splunk/
 """
+import asyncio
 import json
 import logging
 
-import requests
 import voluptuous as vol
 
 from homeassistant.const import (
-    CONF_NAME, CONF_HOST, CONF_PORT, CONF_SSL, CONF_TOKEN, EVENT_STATE_CHANGED)
+    CONF_NAME, CONF_HOST, CONF_PORT, CONF_SSL, CONF_TOKEN)
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.exporter import BatchExporter, EXPORTER_SCHEMA
+from homeassistant.remote import JSONEncoder
 import homeassistant.helpers.config_validation as cv
 
 _LOGGER = logging.getLogger(__name__)
@@ -25,7 +27,7 @@ DEFAULT_SSL = False
 DEFAULT_NAME = 'HASS'
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Required(CONF_TOKEN): cv.string,
         vol.Optional(CONF_HOST, default=DEFAULT_HOST): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
@@ -37,28 +39,32 @@ CONFIG_SCHEMA = vol.Schema({
 
 def setup(hass, config):
     """Set up the Splunk component."""
-    conf = config[DOMAIN]
-    host = conf.get(CONF_HOST)
-    port = conf.get(CONF_PORT)
-    token = conf.get(CONF_TOKEN)
-    use_ssl = conf.get(CONF_SSL)
-    name = conf.get(CONF_NAME)
+    SplunkExporter(hass, config[DOMAIN]).start()
 
-    if use_ssl:
-        uri_scheme = 'https://'
-    else:
-        uri_scheme = 'http://'
+    return True
+
+
+class SplunkExporter(BatchExporter):
+    """Send the states to the Splunk HTTP event collector in batches."""
 
-    event_collector = '{}{}:{}/services/collector/event'.format(
-        uri_scheme, host, port)
-    headers = {'Authorization': 'Splunk {}'.format(token)}
+    def __init__(self, hass, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'Splunk', conf)
 
-    def splunk_event_listener(event):
-        """Listen for new messages on the bus and sends them to Splunk."""
-        state = event.data.get('new_state')
+        if conf.get(CONF_SSL):
+            uri_scheme = 'https://'
+        else:
+            uri_scheme = 'http://'
 
-        if state is None:
-            return
+        self.event_collector = '{}{}:{}/services/collector/event'.format(
+            uri_scheme, conf.get(CONF_HOST), conf.get(CONF_PORT))
+        self.headers = {'Authorization': 'Splunk {}'.format(
+            conf.get(CONF_TOKEN))}
+        self.host = conf.get(CONF_NAME)
+
+    def convert(self, event):
+        """Return the Splunk event for a state change."""
+        state = event.data['new_state']
 
         try:
             _state = state_helper.state_as_number(state)
@@ -72,20 +78,19 @@ def setup(hass, config):
                 'attributes': dict(state.attributes),
                 'time': str(event.time_fired),
                 'value': _state,
-                'host': name,
+                'host': self.host,
             }
         ]
 
-        try:
-            payload = {
-                "host": event_collector,
-                "event": json_body,
-            }
-            requests.post(event_collector, data=json.dumps(payload),
-                          headers=headers, timeout=10)
-        except requests.exceptions.RequestException as error:
-            _LOGGER.exception("Error saving event to Splunk: %s", error)
-
-    hass.bus.listen(EVENT_STATE_CHANGED, splunk_event_listener)
-
-    return True
+        return {
+            "host": self.event_collector,
+            "event": json_body,
+        }
+
+    @asyncio.coroutine
+    def async_send(self, batch):
+        """Post a batch of events in one request."""
+        yield from self.async_post(
+            self.event_collector, headers=self.headers,
+            data='\n'.join(json.dumps(payload, cls=JSONEncoder)
+                           for payload in batch))
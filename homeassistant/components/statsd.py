@@ -8,10 +8,10 @@ import logging
 
 import voluptuous as vol
 
-from homeassistant.const import (
-    CONF_HOST, CONF_PORT, CONF_PREFIX, EVENT_STATE_CHANGED)
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_PREFIX
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.exporter import BatchExporter, EXPORTER_SCHEMA
 
 REQUIREMENTS = ['statsd==3.2.1']
 
@@ -27,7 +27,7 @@ DEFAULT_RATE = 1
 DOMAIN = 'statsd'
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Required(CONF_HOST, default=DEFAULT_HOST): cv.string,
         vol.Optional(CONF_ATTR, default=False): cv.boolean,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
@@ -45,18 +45,34 @@ def setup(hass, config):
     conf = config[DOMAIN]
     host = conf.get(CONF_HOST)
     port = conf.get(CONF_PORT)
-    sample_rate = conf.get(CONF_RATE)
     prefix = conf.get(CONF_PREFIX)
-    show_attribute_flag = conf.get(CONF_ATTR)
 
     statsd_client = statsd.StatsClient(host=host, port=port, prefix=prefix)
 
-    def statsd_event_listener(event):
-        """Listen for new messages on the bus and sends them to StatsD."""
-        state = event.data.get('new_state')
+    StatsdExporter(hass, statsd_client, conf).start()
 
-        if state is None:
-            return
+    return True
+
+
+class StatsdExporter(BatchExporter):
+    """Send the states to StatsD in batches.
+
+    An item is a list of calls of the StatsD client, a batch of items is sent
+    through a pipeline in as few packets as possible.
+    """
+
+    def __init__(self, hass, statsd_client, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'StatsD', conf)
+        self.statsd_client = statsd_client
+        self.sample_rate = conf.get(CONF_RATE)
+        self.show_attribute_flag = conf.get(CONF_ATTR)
+
+    def convert(self, event):
+        """Return the calls to send the stats of a state change."""
+        state = event.data['new_state']
+        sample_rate = self.sample_rate
+        calls = []
 
         try:
             _state = state_helper.state_as_number(state)
@@ -64,31 +80,32 @@ def setup(hass, config):
             # Set the state to none and continue for any numeric attributes.
             _state = None
 
-        states = dict(state.attributes)
-
-        _LOGGER.debug('Sending %s', state.entity_id)
-
-        if show_attribute_flag is True:
+        if self.show_attribute_flag is True:
             if isinstance(_state, (float, int)):
-                statsd_client.gauge(
-                    "%s.state" % state.entity_id,
-                    _state,
-                    sample_rate
-                )
+                calls.append(('gauge', ("%s.state" % state.entity_id,
+                                        _state, sample_rate), {}))
 
             # Send attribute values
-            for key, value in states.items():
+            for key, value in state.attributes.items():
                 if isinstance(value, (float, int)):
                     stat = "%s.%s" % (state.entity_id, key.replace(' ', '_'))
-                    statsd_client.gauge(stat, value, sample_rate)
+                    calls.append(('gauge', (stat, value, sample_rate), {}))
 
         else:
             if isinstance(_state, (float, int)):
-                statsd_client.gauge(state.entity_id, _state, sample_rate)
+                calls.append(('gauge', (state.entity_id, _state,
+                                        sample_rate), {}))
 
         # Increment the count
-        statsd_client.incr(state.entity_id, rate=sample_rate)
+        calls.append(('incr', (state.entity_id,), {'rate': sample_rate}))
 
-    hass.bus.listen(EVENT_STATE_CHANGED, statsd_event_listener)
+        return calls
 
-    return True
+    def send(self, batch):
+        """Send a batch of calls through a pipeline."""
+        with self.statsd_client.pipeline() as pipe:
+            for calls in batch:
+                for method, args, kwargs in calls:
+                    getattr(pipe, method)(*args, **kwargs)
+
+        _LOGGER.debug('Sent %s items', len(batch))
@@ -12,8 +12,9 @@ import voluptuous as vol
 from homeassistant.const import (
     CONF_API_KEY, CONF_ID, CONF_WHITELIST, STATE_UNAVAILABLE, STATE_UNKNOWN)
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.exporter import (
+    BatchExporter, ExportError, EXPORTER_SCHEMA, generate_entity_filter)
 import homeassistant.helpers.config_validation as cv
-import homeassistant.helpers.event as event
 
 REQUIREMENTS = ['thingspeak==0.4.1']
 
@@ -24,7 +25,7 @@ DOMAIN = 'thingspeak'
 TIMEOUT = 5
 
 CONFIG_SCHEMA = vol.Schema({
-    DOMAIN: vol.Schema({
+    DOMAIN: EXPORTER_SCHEMA.extend({
         vol.Required(CONF_API_KEY): cv.string,
         vol.Required(CONF_ID): int,
         vol.Required(CONF_WHITELIST): cv.string
@@ -51,23 +52,39 @@ def setup(hass, config):
                       "API key is correct.")
         return False
 
-    def thingspeak_listener(entity_id, old_state, new_state):
-        """Listen for new events and send them to Thingspeak."""
-        if new_state is None or new_state.state in (
-                STATE_UNKNOWN, '', STATE_UNAVAILABLE):
-            return
+    ThingspeakExporter(hass, channel, conf).start(
+        generate_entity_filter(include_entities=[entity]))
+
+    return True
+
+
+class ThingspeakExporter(BatchExporter):
+    """Send the latest state of an entity to a ThingSpeak channel.
+
+    ThingSpeak limits how often a channel is updated, so only the last
+    value of a batch is sent.
+    """
+
+    def __init__(self, hass, channel, conf):
+        """Initialize the exporter."""
+        super().__init__(hass, 'ThingSpeak', conf)
+        self.channel = channel
+
+    def convert(self, event):
+        """Return the value of a state."""
+        new_state = event.data['new_state']
+
+        if new_state.state in (STATE_UNKNOWN, '', STATE_UNAVAILABLE):
+            return None
         try:
-            if new_state.entity_id != entity:
-                return
-            _state = state_helper.state_as_number(new_state)
+            return state_helper.state_as_number(new_state)
         except ValueError:
-            return
-        try:
-            channel.update({'field1': _state})
-        except RequestException:
-            _LOGGER.error(
-                "Error while sending value '%s' to Thingspeak", _state)
+            return None
 
-    event.track_state_change(hass, entity, thingspeak_listener)
-
-    return True
+    def send(self, batch):
+        """Send the last value of a batch to Thingspeak."""
+        try:
+            self.channel.update({'field1': batch[-1]})
+        except RequestException as err:
+            raise ExportError("Error while sending value '{}': {}".format(
+                batch[-1], err))
@@ -15,10 +15,10 @@ import voluptuous as vol
 from voluptuous.humanize import humanize_error
 
 from homeassistant.const import (
-    MATCH_ALL, EVENT_TIME_CHANGED, EVENT_HOMEASSISTANT_STOP,
+    ATTR_ENTITY_ID, MATCH_ALL, EVENT_TIME_CHANGED, EVENT_HOMEASSISTANT_STOP,
     __version__)
 from homeassistant.components import frontend
-from homeassistant.core import callback
+from homeassistant.core import callback, split_entity_id
 from homeassistant.remote import JSONEncoder
 from homeassistant.helpers import config_validation as cv
 from homeassistant.components.http import HomeAssistantView
@@ -28,6 +28,8 @@ from homeassistant.components.http.ban import process_wrong_login
 
 DOMAIN = 'websocket_api'
 
+DATA_HUB = 'websocket_api_hub'
+
 URL = '/api/websocket'
 DEPENDENCIES = 'http',
 
@@ -66,6 +68,8 @@ SUBSCRIBE_EVENTS_MESSAGE_SCHEMA = vol.Schema({
     vol.Required('id'): cv.positive_int,
     vol.Required('type'): TYPE_SUBSCRIBE_EVENTS,
     vol.Optional('event_type', default=MATCH_ALL): str,
+    vol.Optional('entity_id'): cv.entity_ids,
+    vol.Optional('domain'): vol.All(cv.ensure_list, [str]),
 })
 
 UNSUBSCRIBE_EVENTS_MESSAGE_SCHEMA = vol.Schema({
@@ -145,12 +149,13 @@ def auth_invalid_message(message):
 
 
 def event_message(iden, event):
-    """Return an event message."""
-    return {
-        'id': iden,
-        'type': TYPE_EVENT,
-        'event': event.as_dict(),
-    }
+    """Return an event message.
+
+    The message is returned pre-encoded so the memoized JSON of the event is
+    shared by all subscribed connections.
+    """
+    return '{{"id": {}, "type": "{}", "event": {}}}'.format(
+        JSON_DUMP(iden), TYPE_EVENT, event.as_json())
 
 
 def error_message(iden, code, message):
@@ -191,6 +196,84 @@ def async_setup(hass, config):
     return True
 
 
+@callback
+def async_get_hub(hass):
+    """Return the websocket hub, creating it when needed."""
+    hub = hass.data.get(DATA_HUB)
+
+    if hub is None:
+        hub = hass.data[DATA_HUB] = WebsocketHub(hass)
+
+    return hub
+
+
+class WebsocketHub(object):
+    """Broadcast events to the subscribed websocket connections.
+
+    Listens once per event type on the bus, no matter how many connections
+    are subscribed, and encodes each event once for all of them.
+    """
+
+    def __init__(self, hass):
+        """Initialize the hub."""
+        self.hass = hass
+        self._subscriptions = {}
+        self._unsub_listeners = {}
+
+    @callback
+    def async_subscribe(self, connection, iden, event_type,
+                        entity_ids=None, domains=None):
+        """Subscribe a connection to events.
+
+        Events can be filtered on the entity_id in their data, by entity ids
+        or domains. Returns a function to unsubscribe.
+        """
+        subscription = (connection, iden,
+                        frozenset(entity_ids or ()), frozenset(domains or ()))
+        subscriptions = self._subscriptions.get(event_type)
+
+        if subscriptions is None:
+            subscriptions = self._subscriptions[event_type] = []
+            self._unsub_listeners[event_type] = self.hass.bus.async_listen(
+                event_type,
+                callback(partial(self._async_forward_event, event_type)))
+
+        subscriptions.append(subscription)
+
+        @callback
+        def async_unsubscribe():
+            """Remove the subscription."""
+            subscriptions.remove(subscription)
+
+            if not subscriptions:
+                self._subscriptions.pop(event_type)
+                self._unsub_listeners.pop(event_type)()
+
+        return async_unsubscribe
+
+    @callback
+    def _async_forward_event(self, event_type, event):
+        """Forward an event to the subscriptions of a subscribed type."""
+        if event.event_type == EVENT_TIME_CHANGED:
+            return
+
+        entity_id = event.data.get(ATTR_ENTITY_ID)
+
+        if isinstance(entity_id, str):
+            domain = split_entity_id(entity_id)[0]
+        else:
+            entity_id = domain = None
+
+        for subscription in list(self._subscriptions.get(event_type, ())):
+            connection, iden, entity_ids, domains = subscription
+
+            if (entity_ids or domains) and not (
+                    entity_id in entity_ids or domain in domains):
+                continue
+
+            connection.send_message_outside(event_message(iden, event))
+
+
 class WebsocketAPIView(HomeAssistantView):
     """View to serve a websockets endpoint."""
 
@@ -235,7 +318,10 @@ class ActiveConnection:
                 if message is None:
                     break
                 self.debug("Sending", message)
-                yield from self.wsock.send_json(message, dumps=JSON_DUMP)
+                if isinstance(message, str):
+                    yield from self.wsock.send_str(message)
+                else:
+                    yield from self.wsock.send_json(message, dumps=JSON_DUMP)
 
     @callback
     def send_message_outside(self, message):
@@ -401,16 +487,10 @@ class ActiveConnection:
         """
         msg = SUBSCRIBE_EVENTS_MESSAGE_SCHEMA(msg)
 
-        @asyncio.coroutine
-        def forward_events(event):
-            """Forward events to websocket."""
-            if event.event_type == EVENT_TIME_CHANGED:
-                return
-
-            self.send_message_outside(event_message(msg['id'], event))
-
-        self.event_listeners[msg['id']] = self.hass.bus.async_listen(
-            msg['event_type'], forward_events)
+        self.event_listeners[msg['id']] = async_get_hub(
+            self.hass).async_subscribe(
+                self, msg['id'], msg['event_type'], msg.get('entity_id'),
+                msg.get('domain'))
 
         self.to_write.put_nowait(result_message(msg['id']))
 
@@ -120,6 +120,7 @@ CONF_NAME = 'name'
 CONF_OFFSET = 'offset'
 CONF_OPTIMISTIC = 'optimistic'
 CONF_PACKAGES = 'packages'
+CONF_PARALLEL_UPDATES = 'parallel_updates'
 CONF_PASSWORD = 'password'
 CONF_PATH = 'path'
 CONF_PAYLOAD = 'payload'
@@ -8,6 +8,7 @@ of entities and react to changes.
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import enum
+import json
 import logging
 import os
 import pathlib
@@ -53,6 +54,9 @@ TIMEOUT_EVENT_START = 15
 
 _LOGGER = logging.getLogger(__name__)
 
+# Encodes the JSON of events and states, created on first use
+_JSON_ENCODER = None
+
 
 def split_entity_id(entity_id: str) -> List[str]:
     """Split a state entity_id into domain, object_id."""
@@ -88,6 +92,45 @@ def async_loop_exception_handler(loop, context):
     _LOGGER.error("Error doing job: %s", context['message'], **kwargs)
 
 
+class HassJobType(enum.Enum):
+    """Represent the way a job is executed."""
+
+    Coroutinefunction = 1
+    Callback = 2
+    Executor = 3
+
+
+class HassJob(object):
+    """Represent a job to be run later.
+
+    The execution type of the target is determined once at creation so it
+    does not have to be checked again every time the job is run.
+    """
+
+    __slots__ = ['target', 'job_type']
+
+    def __init__(self, target: Callable[..., Any]) -> None:
+        """Create a job object."""
+        if asyncio.iscoroutine(target):
+            raise ValueError("Coroutine not allowed to be passed to HassJob")
+
+        self.target = target
+        self.job_type = _get_callable_job_type(target)
+
+    def __repr__(self) -> str:
+        """Return the job."""
+        return "<Job {} {}>".format(self.job_type, self.target)
+
+
+def _get_callable_job_type(target: Callable[..., Any]) -> HassJobType:
+    """Determine the job type from the callable."""
+    if is_callback(target):
+        return HassJobType.Callback
+    elif asyncio.iscoroutinefunction(target):
+        return HassJobType.Coroutinefunction
+    return HassJobType.Executor
+
+
 class CoreState(enum.Enum):
     """Represent the current state of Home Assistant."""
 
@@ -222,6 +265,29 @@ class HomeAssistant(object):
 
         return task
 
+    @callback
+    def async_add_hass_job(self, hassjob: HassJob, *args: Any) -> None:
+        """Add a HassJob from within the event loop.
+
+        This method must be run in the event loop.
+
+        hassjob: HassJob to call.
+        args: parameters for method to call.
+        """
+        if hassjob.job_type == HassJobType.Callback:
+            self.loop.call_soon(hassjob.target, *args)
+            return None
+        elif hassjob.job_type == HassJobType.Coroutinefunction:
+            task = self.loop.create_task(hassjob.target(*args))
+        else:
+            task = self.loop.run_in_executor(None, hassjob.target, *args)
+
+        # If a task is sheduled
+        if self._track_task:
+            self._pending_tasks.append(task)
+
+        return task
+
     @callback
     def async_track_tasks(self):
         """Track tasks so you can wait for all tasks to be done."""
@@ -246,6 +312,20 @@ class HomeAssistant(object):
         else:
             self.async_add_job(target, *args)
 
+    @callback
+    def async_run_hass_job(self, hassjob: HassJob, *args: Any) -> None:
+        """Run a HassJob from within the event loop.
+
+        This method must be run in the event loop.
+
+        hassjob: HassJob to call.
+        args: parameters for method to call.
+        """
+        if hassjob.job_type == HassJobType.Callback:
+            hassjob.target(*args)
+        else:
+            self.async_add_hass_job(hassjob, *args)
+
     def block_till_done(self) -> None:
         """Block till all pending work is done."""
         run_coroutine_threadsafe(
@@ -306,7 +386,8 @@ class EventOrigin(enum.Enum):
 class Event(object):
     """Representation of an event within the bus."""
 
-    __slots__ = ['event_type', 'data', 'origin', 'time_fired']
+    __slots__ = ['event_type', 'data', 'origin', 'time_fired',
+                 '_data_json', '_json']
 
     def __init__(self, event_type, data=None, origin=EventOrigin.local,
                  time_fired=None):
@@ -315,6 +396,41 @@ class Event(object):
         self.data = data or {}
         self.origin = origin
         self.time_fired = time_fired or dt_util.utcnow()
+        self._data_json = None
+        self._json = None
+
+    def data_as_json(self):
+        """Return the JSON representation of the event data.
+
+        The result is memoized, so the data should not be changed after the
+        event has been encoded. States in the data reuse their own JSON.
+
+        Async friendly.
+        """
+        if self._data_json is None:
+            if all(isinstance(key, str) for key in self.data):
+                self._data_json = '{' + ', '.join(
+                    '{}: {}'.format(json.dumps(key), _value_as_json(value))
+                    for key, value in self.data.items()) + '}'
+            else:
+                self._data_json = _json_dumps(self.data)
+
+        return self._data_json
+
+    def as_json(self):
+        """Return the JSON representation of this Event, memoized.
+
+        Async friendly.
+        """
+        if self._json is None:
+            self._json = (
+                '{{"event_type": {}, "data": {}, "origin": {}, '
+                '"time_fired": {}}}').format(
+                    json.dumps(self.event_type), self.data_as_json(),
+                    json.dumps(str(self.origin)),
+                    _json_dumps(self.time_fired))
+
+        return self._json
 
     def as_dict(self):
         """Create a dict representation of this Event.
@@ -354,6 +470,8 @@ class EventBus(object):
     def __init__(self, hass: HomeAssistant) -> None:
         """Initialize a new event bus."""
         self._listeners = {}
+        # Per event type tuple of the jobs to run, including MATCH_ALL ones
+        self._dispatch = {}
         self._hass = hass
 
     @callback
@@ -384,22 +502,47 @@ class EventBus(object):
 
         This method must be run in the event loop.
         """
-        listeners = self._listeners.get(event_type, [])
+        jobs = self._dispatch.get(event_type)
 
-        # EVENT_HOMEASSISTANT_CLOSE should go only to his listeners
-        if event_type != EVENT_HOMEASSISTANT_CLOSE:
-            listeners = self._listeners.get(MATCH_ALL, []) + listeners
+        if jobs is None:
+            jobs = self._async_build_dispatch(event_type)
 
         event = Event(event_type, event_data, origin)
 
         if event_type != EVENT_TIME_CHANGED:
             _LOGGER.info("Bus:Handling %s", event)
 
-        if not listeners:
+        if not jobs:
             return
 
-        for func in listeners:
-            self._hass.async_add_job(func, event)
+        for job in jobs:
+            self._hass.async_add_hass_job(job, event)
+
+    @callback
+    def _async_build_dispatch(self, event_type):
+        """Build and cache the jobs to run for an event type.
+
+        This method must be run in the event loop.
+        """
+        jobs = self._listeners.get(event_type, [])
+
+        # EVENT_HOMEASSISTANT_CLOSE should go only to his listeners
+        if event_type != EVENT_HOMEASSISTANT_CLOSE:
+            jobs = self._listeners.get(MATCH_ALL, []) + jobs
+
+        jobs = self._dispatch[event_type] = tuple(jobs)
+        return jobs
+
+    @callback
+    def _async_invalidate_dispatch(self, event_type):
+        """Drop the cached jobs affected by a change of listeners.
+
+        This method must be run in the event loop.
+        """
+        if event_type == MATCH_ALL:
+            self._dispatch.clear()
+        else:
+            self._dispatch.pop(event_type, None)
 
     def listen(self, event_type, listener):
         """Listen for all events or events of a specific type.
@@ -424,16 +567,26 @@ class EventBus(object):
         To listen to all events specify the constant ``MATCH_ALL``
         as event_type.
 
+        This method must be run in the event loop.
+        """
+        return self._async_listen_job(event_type, HassJob(listener))
+
+    @callback
+    def _async_listen_job(self, event_type, job):
+        """Listen for events of a specific type with a HassJob.
+
         This method must be run in the event loop.
         """
         if event_type in self._listeners:
-            self._listeners[event_type].append(listener)
+            self._listeners[event_type].append(job)
         else:
-            self._listeners[event_type] = [listener]
+            self._listeners[event_type] = [job]
+
+        self._async_invalidate_dispatch(event_type)
 
         def remove_listener():
             """Remove the listener."""
-            self._async_remove_listener(event_type, listener)
+            self._async_remove_listener(event_type, job)
 
         return remove_listener
 
@@ -467,6 +620,8 @@ class EventBus(object):
 
         This method must be run in the event loop.
         """
+        job = HassJob(listener)
+
         @callback
         def onetime_listener(event):
             """Remove listener from eventbus and then fire listener."""
@@ -478,19 +633,20 @@ class EventBus(object):
             # multiple times as well.
             # This will make sure the second time it does nothing.
             setattr(onetime_listener, 'run', True)
-            self._async_remove_listener(event_type, onetime_listener)
-            self._hass.async_run_job(listener, event)
+            remove_listener()
+            self._hass.async_run_hass_job(job, event)
 
-        return self.async_listen(event_type, onetime_listener)
+        remove_listener = self.async_listen(event_type, onetime_listener)
+        return remove_listener
 
     @callback
-    def _async_remove_listener(self, event_type, listener):
-        """Remove a listener of a specific event_type.
+    def _async_remove_listener(self, event_type, job):
+        """Remove a listener job of a specific event_type.
 
         This method must be run in the event loop.
         """
         try:
-            self._listeners[event_type].remove(listener)
+            self._listeners[event_type].remove(job)
 
             # delete event_type list if empty
             if not self._listeners[event_type]:
@@ -498,7 +654,11 @@ class EventBus(object):
         except (KeyError, ValueError):
             # KeyError is key event_type listener did not exist
             # ValueError if listener did not exist within event_type
-            _LOGGER.warning("Unable to remove unknown listener %s", listener)
+            _LOGGER.warning("Unable to remove unknown listener %s",
+                            job.target)
+            return
+
+        self._async_invalidate_dispatch(event_type)
 
 
 class State(object):
@@ -509,10 +669,14 @@ class State(object):
     attributes: extra information on entity and state
     last_changed: last time the state was changed, not the attributes.
     last_updated: last time this object was updated.
+
+    States are immutable. Attributes passed as a MappingProxyType, like the
+    attributes of another state, are shared instead of copied.
     """
 
     __slots__ = ['entity_id', 'state', 'attributes',
-                 'last_changed', 'last_updated']
+                 'last_changed', 'last_updated',
+                 '_attributes_json', '_json']
 
     def __init__(self, entity_id, state, attributes=None, last_changed=None,
                  last_updated=None):
@@ -522,11 +686,55 @@ class State(object):
                 "Invalid entity id encountered: {}. "
                 "Format should be <domain>.<object_id>").format(entity_id))
 
-        self.entity_id = entity_id.lower()
-        self.state = str(state)
-        self.attributes = MappingProxyType(attributes or {})
-        self.last_updated = last_updated or dt_util.utcnow()
-        self.last_changed = last_changed or self.last_updated
+        if not isinstance(attributes, MappingProxyType):
+            # Intern the keys, they repeat across the states of all entities
+            attributes = MappingProxyType({
+                sys.intern(key) if isinstance(key, str) else key: value
+                for key, value in (attributes or {}).items()})
+
+        last_updated = last_updated or dt_util.utcnow()
+
+        _set = object.__setattr__
+        _set(self, 'entity_id', entity_id.lower())
+        _set(self, 'state', str(state))
+        _set(self, 'attributes', attributes)
+        _set(self, 'last_updated', last_updated)
+        _set(self, 'last_changed', last_changed or last_updated)
+        _set(self, '_attributes_json', None)
+        _set(self, '_json', None)
+
+    def __setattr__(self, name, value):
+        """Prevent changing a state, a new State should be created."""
+        raise AttributeError("State objects are immutable")
+
+    def attributes_as_json(self):
+        """Return the JSON representation of the attributes, memoized.
+
+        Async friendly.
+        """
+        if self._attributes_json is None:
+            object.__setattr__(self, '_attributes_json',
+                               _json_dumps(dict(self.attributes)))
+
+        return self._attributes_json
+
+    def as_json(self):
+        """Return the JSON representation of the State, memoized.
+
+        Equal to the JSON encoding of as_dict.
+
+        Async friendly.
+        """
+        if self._json is None:
+            object.__setattr__(self, '_json', (
+                '{{"entity_id": {}, "state": {}, "attributes": {}, '
+                '"last_changed": {}, "last_updated": {}}}').format(
+                    json.dumps(self.entity_id), json.dumps(self.state),
+                    self.attributes_as_json(),
+                    _json_dumps(self.last_changed),
+                    _json_dumps(self.last_updated)))
+
+        return self._json
 
     @property
     def domain(self):
@@ -601,6 +809,27 @@ class State(object):
             dt_util.as_local(self.last_changed).isoformat())
 
 
+def _json_dumps(obj):
+    """Encode an object as JSON, supporting Home Assistant objects."""
+    # pylint: disable=global-statement
+    global _JSON_ENCODER
+
+    if _JSON_ENCODER is None:
+        # homeassistant.remote imports this module, so import it on first use
+        from homeassistant.remote import JSONEncoder
+        _JSON_ENCODER = JSONEncoder()
+
+    return _JSON_ENCODER.encode(obj)
+
+
+def _value_as_json(value):
+    """Encode a value as JSON, reusing the memoized JSON of states."""
+    if isinstance(value, State):
+        return value.as_json()
+
+    return _json_dumps(value)
+
+
 class StateMachine(object):
     """Helper class that tracks the state of different entities."""
 
@@ -734,6 +963,11 @@ class StateMachine(object):
             return
 
         last_changed = old_state.last_changed if same_state else None
+
+        if same_attr:
+            # Share the attributes with the previous state
+            attributes = old_state.attributes
+
         state = State(entity_id, new_state, attributes, last_changed)
         self._states[entity_id] = state
         self._bus.async_fire(EVENT_STATE_CHANGED, {
@@ -746,17 +980,14 @@ class StateMachine(object):
 class Service(object):
     """Representation of a callable service."""
 
-    __slots__ = ['func', 'description', 'fields', 'schema',
-                 'is_callback', 'is_coroutinefunction']
+    __slots__ = ['job', 'description', 'fields', 'schema']
 
     def __init__(self, func, description, fields, schema):
         """Initialize a service."""
-        self.func = func
+        self.job = HassJob(func)
         self.description = description or ''
         self.fields = fields or {}
         self.schema = schema
-        self.is_callback = is_callback(func)
-        self.is_coroutinefunction = asyncio.iscoroutinefunction(func)
 
     def as_dict(self):
         """Return dictionary representation of this service."""
@@ -999,8 +1230,7 @@ class ServiceRegistry(object):
 
             data = {ATTR_SERVICE_CALL_ID: call_id}
 
-            if (service_handler.is_coroutinefunction or
-                    service_handler.is_callback):
+            if service_handler.job.job_type != HassJobType.Executor:
                 self._hass.bus.async_fire(EVENT_SERVICE_EXECUTED, data)
             else:
                 self._hass.bus.fire(EVENT_SERVICE_EXECUTED, data)
@@ -1016,16 +1246,18 @@ class ServiceRegistry(object):
 
         service_call = ServiceCall(domain, service, service_data, call_id)
 
-        if service_handler.is_callback:
-            service_handler.func(service_call)
+        job_type = service_handler.job.job_type
+
+        if job_type == HassJobType.Callback:
+            service_handler.job.target(service_call)
             fire_service_executed()
-        elif service_handler.is_coroutinefunction:
-            yield from service_handler.func(service_call)
+        elif job_type == HassJobType.Coroutinefunction:
+            yield from service_handler.job.target(service_call)
             fire_service_executed()
         else:
             def execute_service():
                 """Execute a service and fires a SERVICE_EXECUTED event."""
-                service_handler.func(service_call)
+                service_handler.job.target(service_call)
                 fire_service_executed()
 
             self._hass.async_add_job(execute_service)
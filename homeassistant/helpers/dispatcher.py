@@ -1,7 +1,7 @@
 """Helpers for Home Assistant dispatcher & internal component/platform."""
 import logging
 
-from homeassistant.core import callback
+from homeassistant.core import HassJob, callback
 from homeassistant.util.async import run_callback_threadsafe
 
 
@@ -33,13 +33,14 @@ def async_dispatcher_connect(hass, signal, target):
     if signal not in hass.data[DATA_DISPATCHER]:
         hass.data[DATA_DISPATCHER][signal] = []
 
-    hass.data[DATA_DISPATCHER][signal].append(target)
+    job = HassJob(target)
+    hass.data[DATA_DISPATCHER][signal].append(job)
 
     @callback
     def async_remove_dispatcher():
         """Remove signal listener."""
         try:
-            hass.data[DATA_DISPATCHER][signal].remove(target)
+            hass.data[DATA_DISPATCHER][signal].remove(job)
         except (KeyError, ValueError):
             # KeyError is key target listener did not exist
             # ValueError if listener did not exist within signal
@@ -62,5 +63,5 @@ def async_dispatcher_send(hass, signal, *args):
     """
     target_list = hass.data.get(DATA_DISPATCHER, {}).get(signal, [])
 
-    for target in target_list:
-        hass.async_add_job(target, *args)
+    for job in target_list:
+        hass.async_add_hass_job(job, *args)
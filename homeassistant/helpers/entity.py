@@ -11,7 +11,7 @@ from homeassistant.const import (
     ATTR_UNIT_OF_MEASUREMENT, DEVICE_DEFAULT_NAME, STATE_OFF, STATE_ON,
     STATE_UNAVAILABLE, STATE_UNKNOWN, TEMP_CELSIUS, TEMP_FAHRENHEIT,
     ATTR_ENTITY_PICTURE, ATTR_SUPPORTED_FEATURES, ATTR_DEVICE_CLASS)
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config import DATA_CUSTOMIZE
 from homeassistant.exceptions import NoEntitySpecifiedError
 from homeassistant.util import ensure_unique_string, slugify
@@ -74,6 +74,12 @@ class Entity(object):
     # protect for multible updates
     _update_warn = None
 
+    # Pending coalesced state write
+    _pending_write = None
+
+    # Number of state writes merged into another write
+    state_writes_saved = 0
+
     @property
     def should_poll(self) -> bool:
         """Return True if entity has to be polled for state.
@@ -162,6 +168,15 @@ class Entity(object):
         """Flag supported features."""
         return None
 
+    @property
+    def coalesce_state_writes(self) -> Optional[float]:
+        """Return the seconds in which state writes are merged into one.
+
+        With 0, the writes within one iteration of the event loop are merged.
+        None writes every state update.
+        """
+        return None
+
     def update(self):
         """Retrieve latest state.
 
@@ -229,6 +244,28 @@ class Entity(object):
                 self._update_warn.cancel()
                 self._update_warn = None
 
+        delay = self.coalesce_state_writes
+
+        if delay is None:
+            self._async_write_ha_state()
+        elif self._pending_write is not None:
+            self.state_writes_saved += 1
+        elif delay:
+            self._pending_write = self.hass.loop.call_later(
+                delay, self._async_write_pending_ha_state)
+        else:
+            self._pending_write = self.hass.loop.call_soon(
+                self._async_write_pending_ha_state)
+
+    @callback
+    def _async_write_pending_ha_state(self):
+        """Write the state of a coalesced update."""
+        self._pending_write = None
+        self._async_write_ha_state()
+
+    @callback
+    def _async_write_ha_state(self):
+        """Write the current state of the entity to the state machine."""
         start = timer()
 
         if not self.available:
@@ -312,6 +349,10 @@ class Entity(object):
 
         This method must be run in the event loop.
         """
+        if self._pending_write is not None:
+            self._pending_write.cancel()
+            self._pending_write = None
+
         self.hass.states.async_remove(self.entity_id)
 
     def _attr_setter(self, name, typ, attr, attrs):
@@ -1,12 +1,13 @@
 """Helpers for components that manage entities."""
 import asyncio
+from bisect import bisect_left
 from datetime import timedelta
 
 from homeassistant import config as conf_util
 from homeassistant.setup import async_prepare_setup_platform
 from homeassistant.const import (
     ATTR_ENTITY_ID, CONF_SCAN_INTERVAL, CONF_ENTITY_NAMESPACE,
-    DEVICE_DEFAULT_NAME)
+    CONF_PARALLEL_UPDATES, DEVICE_DEFAULT_NAME)
 from homeassistant.core import callback, valid_entity_id
 from homeassistant.exceptions import HomeAssistantError, PlatformNotReady
 from homeassistant.loader import get_component
@@ -21,6 +22,7 @@ from homeassistant.util.async import (
 import homeassistant.util.dt as dt_util
 
 DEFAULT_SCAN_INTERVAL = timedelta(seconds=15)
+DEFAULT_PARALLEL_UPDATES = 1
 SLOW_SETUP_WARNING = 10
 SLOW_SETUP_MAX_WAIT = 60
 PLATFORM_NOT_READY_RETRIES = 10
@@ -44,7 +46,8 @@ class EntityComponent(object):
         self.config = None
 
         self._platforms = {
-            'core': EntityPlatform(self, domain, self.scan_interval, None),
+            'core': EntityPlatform(self, domain, self.scan_interval, None,
+                                   DEFAULT_PARALLEL_UPDATES),
         }
         self.async_add_entities = self._platforms['core'].async_add_entities
         self.add_entities = self._platforms['core'].add_entities
@@ -132,12 +135,17 @@ class EntityComponent(object):
                          getattr(platform, 'SCAN_INTERVAL', None) or
                          self.scan_interval)
         entity_namespace = platform_config.get(CONF_ENTITY_NAMESPACE)
+        parallel_updates = (platform_config.get(CONF_PARALLEL_UPDATES) or
+                            getattr(platform, 'PARALLEL_UPDATES', None) or
+                            DEFAULT_PARALLEL_UPDATES)
 
-        key = (platform_type, scan_interval, entity_namespace)
+        key = (platform_type, scan_interval, entity_namespace,
+               parallel_updates)
 
         if key not in self._platforms:
             self._platforms[key] = EntityPlatform(
-                self, platform_type, scan_interval, entity_namespace)
+                self, platform_type, scan_interval, entity_namespace,
+                parallel_updates)
         entity_platform = self._platforms[key]
 
         self.logger.info("Setting up %s.%s", self.domain, platform_type)
@@ -313,19 +321,54 @@ class EntityComponent(object):
         return conf
 
 
+class UpdateLatency(object):
+    """Histogram of the time the updates of entities took."""
+
+    # Upper bounds of the buckets in seconds, the last bucket is unbounded
+    BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self):
+        """Initialize the histogram."""
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    def add(self, seconds):
+        """Add the duration of an update."""
+        self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def as_dict(self):
+        """Return the histogram as a dict."""
+        return {
+            'buckets': list(zip(self.BUCKETS + (None,), self.counts)),
+            'count': self.count,
+            'total': self.total,
+            'maximum': self.maximum,
+        }
+
+
 class EntityPlatform(object):
     """Keep track of entities for a single platform and stay in loop."""
 
-    def __init__(self, component, platform, scan_interval, entity_namespace):
+    def __init__(self, component, platform, scan_interval, entity_namespace,
+                 parallel_updates=DEFAULT_PARALLEL_UPDATES):
         """Initialize the entity platform."""
         self.component = component
         self.platform = platform
         self.scan_interval = scan_interval
         self.entity_namespace = entity_namespace
+        self.parallel_updates = parallel_updates
         self.platform_entities = []
+        self.update_latency = UpdateLatency()
         self._tasks = []
         self._async_unsub_polling = None
         self._process_updates = asyncio.Lock(loop=component.hass.loop)
+        self._update_semaphore = asyncio.Semaphore(
+            parallel_updates, loop=component.hass.loop)
 
     @asyncio.coroutine
     def async_block_entities_done(self):
@@ -419,39 +462,54 @@ class EntityPlatform(object):
         """Update the states of all the polling entities.
 
         To protect from flooding the executor, we will update async entities
-        in parallel and other entities sequential.
+        in parallel and at most parallel_updates other entities at a time.
 
         This method must be run in the event loop.
         """
         if self._process_updates.locked():
             self.component.logger.warning(
                 "Updating %s %s took longer than the scheduled update "
-                "interval %s", self.platform, self.component.domain,
-                self.scan_interval)
+                "interval %s, the slowest update so far took %.3f seconds",
+                self.platform, self.component.domain, self.scan_interval,
+                self.update_latency.maximum)
             return
 
         with (yield from self._process_updates):
-            tasks = []
-            to_update = []
-
-            for entity in self.platform_entities:
-                if not entity.should_poll:
-                    continue
-
-                update_coro = entity.async_update_ha_state(True)
-                if hasattr(entity, 'async_update'):
-                    tasks.append(
-                        self.component.hass.async_add_job(update_coro))
-                else:
-                    to_update.append(update_coro)
-
-            for update_coro in to_update:
-                try:
-                    yield from update_coro
-                except Exception:  # pylint: disable=broad-except
-                    self.component.logger.exception(
-                        "Error while update entity from %s in %s",
-                        self.platform, self.component.domain)
+            tasks = [
+                self._async_update_entity(entity)
+                for entity in self.platform_entities if entity.should_poll]
 
             if tasks:
                 yield from asyncio.wait(tasks, loop=self.component.hass.loop)
+                self.component.logger.debug(
+                    "Update latency of %s %s: %s", self.platform,
+                    self.component.domain, self.update_latency.as_dict())
+
+    @asyncio.coroutine
+    def _async_update_entity(self, entity):
+        """Update the state of a polling entity and time the update.
+
+        This method must be run in the event loop.
+        """
+        if hasattr(entity, 'async_update'):
+            yield from self._async_timed_update(entity)
+        else:
+            with (yield from self._update_semaphore):
+                yield from self._async_timed_update(entity)
+
+    @asyncio.coroutine
+    def _async_timed_update(self, entity):
+        """Update the state of an entity and add the time it took.
+
+        This method must be run in the event loop.
+        """
+        start = self.component.hass.loop.time()
+
+        try:
+            yield from entity.async_update_ha_state(True)
+        except Exception:  # pylint: disable=broad-except
+            self.component.logger.exception(
+                "Error while update entity from %s in %s",
+                self.platform, self.component.domain)
+        finally:
+            self.update_latency.add(self.component.hass.loop.time() - start)
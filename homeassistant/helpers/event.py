@@ -1,13 +1,21 @@
 """Helpers for listening to events."""
+from datetime import timedelta
 import functools as ft
+import heapq
+import logging
 
 from homeassistant.helpers.sun import get_astral_event_next
-from ..core import HomeAssistant, callback
+from ..core import HassJob, HomeAssistant, callback, split_entity_id
 from ..const import (
     ATTR_NOW, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL)
 from ..util import dt as dt_util
 from ..util.async import run_callback_threadsafe
 
+_LOGGER = logging.getLogger(__name__)
+
+DATA_STATE_CHANGE_LISTENERS = 'event_state_change_listeners'
+DATA_POINT_IN_TIME_LISTENERS = 'event_point_in_time_listeners'
+
 # PyLint does not like the use of threaded_listener_factory
 # pylint: disable=invalid-name
 
@@ -34,6 +42,113 @@ def threaded_listener_factory(async_factory):
     return factory
 
 
+class StateChangeListeners(object):
+    """Index of state change listeners by the entity_id they track.
+
+    A single state_changed bus listener is shared by all trackers so a state
+    write only runs the listeners of the entity that changed and of its
+    domain, together with the ones that track all entities.
+    """
+
+    def __init__(self, hass):
+        """Initialize the listener index."""
+        self._hass = hass
+        self._listeners = {}
+        self._domain_listeners = {}
+        self._count = 0
+        self._unsub_bus = None
+
+    @property
+    def count(self):
+        """Return the number of registered listeners."""
+        return self._count
+
+    @callback
+    def async_add(self, entity_ids, listener, domains=()):
+        """Add a listener for entity_ids, a tuple or MATCH_ALL, and domains.
+
+        Returns a function that can be called to remove the listener.
+
+        This method must be run in the event loop.
+        """
+        if entity_ids == MATCH_ALL:
+            keys = (MATCH_ALL,)
+        else:
+            keys = tuple(set(entity_ids))
+
+        domains = tuple(set(domains))
+
+        for key in keys:
+            if key in self._listeners:
+                self._listeners[key].append(listener)
+            else:
+                self._listeners[key] = [listener]
+
+        for domain in domains:
+            if domain in self._domain_listeners:
+                self._domain_listeners[domain].append(listener)
+            else:
+                self._domain_listeners[domain] = [listener]
+
+        self._count += 1
+
+        if self._unsub_bus is None:
+            self._unsub_bus = self._hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._async_state_changed)
+
+        @callback
+        def remove_listener():
+            """Remove the listener."""
+            self._async_remove(keys, domains, listener)
+
+        return remove_listener
+
+    @callback
+    def _async_remove(self, keys, domains, listener):
+        """Remove a listener from the index.
+
+        This method must be run in the event loop.
+        """
+        try:
+            for index, index_keys in ((self._listeners, keys),
+                                      (self._domain_listeners, domains)):
+                for key in index_keys:
+                    index[key].remove(listener)
+
+                    # delete entity_id or domain list if empty
+                    if not index[key]:
+                        index.pop(key)
+        except (KeyError, ValueError):
+            # KeyError is key entity_id listener did not exist
+            # ValueError if listener did not exist within entity_id
+            _LOGGER.warning("Unable to remove unknown listener %s", listener)
+            return
+
+        self._count -= 1
+
+        if self._count == 0 and self._unsub_bus is not None:
+            self._unsub_bus()
+            self._unsub_bus = None
+
+    @callback
+    def _async_state_changed(self, event):
+        """Run the listeners that track the changed entity."""
+        entity_id = event.data.get('entity_id')
+        listeners = self._listeners.get(MATCH_ALL, []) + \
+            self._listeners.get(entity_id, [])
+
+        if self._domain_listeners:
+            listeners += self._domain_listeners.get(
+                split_entity_id(entity_id)[0], [])
+
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error in state change listener %s",
+                                  listener)
+
+
 @callback
 def async_track_state_change(hass, entity_ids, action, from_state=None,
                              to_state=None):
@@ -57,13 +172,11 @@ def async_track_state_change(hass, entity_ids, action, from_state=None,
     else:
         entity_ids = tuple(entity_id.lower() for entity_id in entity_ids)
 
+    job = HassJob(action)
+
     @callback
     def state_change_listener(event):
         """Handle specific state changes."""
-        if entity_ids != MATCH_ALL and \
-           event.data.get('entity_id') not in entity_ids:
-            return
-
         if event.data.get('old_state') is not None:
             old_state = event.data['old_state'].state
         else:
@@ -75,21 +188,98 @@ def async_track_state_change(hass, entity_ids, action, from_state=None,
             new_state = None
 
         if _matcher(old_state, from_state) and _matcher(new_state, to_state):
-            hass.async_run_job(action, event.data.get('entity_id'),
-                               event.data.get('old_state'),
-                               event.data.get('new_state'))
+            hass.async_run_hass_job(job, event.data.get('entity_id'),
+                                    event.data.get('old_state'),
+                                    event.data.get('new_state'))
+
+    if DATA_STATE_CHANGE_LISTENERS not in hass.data:
+        hass.data[DATA_STATE_CHANGE_LISTENERS] = StateChangeListeners(hass)
 
-    return hass.bus.async_listen(EVENT_STATE_CHANGED, state_change_listener)
+    return hass.data[DATA_STATE_CHANGE_LISTENERS].async_add(
+        entity_ids, state_change_listener)
 
 
 track_state_change = threaded_listener_factory(async_track_state_change)
 
 
+class RenderInfoTracker(object):
+    """Track the state changes of the states that template renders read.
+
+    After each render, async_update tracks the entities and domains that
+    the renders read. Renders that read no states track all entities, as
+    templates without entity references always did.
+    """
+
+    def __init__(self, hass, action):
+        """Initialize the tracker of action(entity_id, from_s, to_s)."""
+        self._hass = hass
+        self._job = HassJob(action)
+        self._tracked = None
+        self._remove = None
+
+    @callback
+    def async_update(self, *render_infos):
+        """Track the states read by the latest renders."""
+        entities = set()
+        domains = set()
+        all_states = False
+
+        for render_info in render_infos:
+            entities |= render_info.entities
+            domains |= render_info.domains
+            all_states = all_states or render_info.all_states
+
+        if all_states or not (entities or domains):
+            tracked = MATCH_ALL
+        else:
+            # Entities of tracked domains would run the listener twice
+            tracked = (frozenset(
+                entity_id for entity_id in entities
+                if split_entity_id(entity_id)[0] not in domains),
+                       frozenset(domains))
+
+        if tracked == self._tracked:
+            return
+
+        self.async_remove()
+        self._tracked = tracked
+
+        if DATA_STATE_CHANGE_LISTENERS not in self._hass.data:
+            self._hass.data[DATA_STATE_CHANGE_LISTENERS] = \
+                StateChangeListeners(self._hass)
+
+        listeners = self._hass.data[DATA_STATE_CHANGE_LISTENERS]
+
+        if tracked == MATCH_ALL:
+            self._remove = listeners.async_add(
+                MATCH_ALL, self._async_state_changed)
+        else:
+            self._remove = listeners.async_add(
+                tracked[0], self._async_state_changed, tracked[1])
+
+    @callback
+    def async_remove(self):
+        """Stop tracking states."""
+        if self._remove is not None:
+            self._remove()
+            self._remove = None
+            self._tracked = None
+
+    @callback
+    def _async_state_changed(self, event):
+        """Run the action for a state change."""
+        self._hass.async_run_hass_job(
+            self._job, event.data.get('entity_id'),
+            event.data.get('old_state'), event.data.get('new_state'))
+
+
 @callback
 def async_track_template(hass, template, action, variables=None):
-    """Add a listener that track state changes with template condition."""
-    from . import condition
+    """Add a listener that track state changes with template condition.
 
+    The listener tracks the states that the latest render of the template
+    read.
+    """
     # Local variable to keep track of if the action has already been triggered
     already_triggered = False
 
@@ -97,7 +287,7 @@ def async_track_template(hass, template, action, variables=None):
     def template_condition_listener(entity_id, from_s, to_s):
         """Check if condition is correct and run action."""
         nonlocal already_triggered
-        template_result = condition.async_template(hass, template, variables)
+        template_result = render_template()
 
         # Check to see if template returns true
         if template_result and not already_triggered:
@@ -106,8 +296,26 @@ def async_track_template(hass, template, action, variables=None):
         elif not template_result:
             already_triggered = False
 
-    return async_track_state_change(
-        hass, template.extract_entities(), template_condition_listener)
+    tracker = RenderInfoTracker(hass, template_condition_listener)
+
+    @callback
+    def render_template(log_error=True):
+        """Render the template condition and track the states it read."""
+        render_info = template.async_render_to_info(variables)
+        tracker.async_update(render_info)
+
+        if render_info.exception is None:
+            return render_info.result().lower() == 'true'
+
+        if log_error:
+            _LOGGER.error("Error during template condition: %s",
+                          render_info.exception)
+
+        return False
+
+    # Only find out which states to track, the condition is not checked
+    render_template(log_error=False)
+    return tracker.async_remove
 
 
 track_template = threaded_listener_factory(async_track_template)
@@ -130,34 +338,109 @@ def async_track_point_in_time(hass, action, point_in_time):
 track_point_in_time = threaded_listener_factory(async_track_point_in_time)
 
 
-@callback
-def async_track_point_in_utc_time(hass, action, point_in_time):
-    """Add a listener that fires once after a specific point in UTC time."""
-    # Ensure point_in_time is UTC
-    point_in_time = dt_util.as_utc(point_in_time)
+class PointInTimeListeners(object):
+    """Schedule of point in time listeners ordered by their deadline.
+
+    A single time_changed bus listener pops the listeners that are due from
+    a heap, so every tick costs O(1) when nothing is due instead of running
+    each pending listener once a second.
+    """
+
+    def __init__(self, hass):
+        """Initialize the schedule."""
+        self._hass = hass
+        self._heap = []
+        self._count = 0
+        self._sequence = 0
+        self._unsub_bus = None
+
+    @property
+    def count(self):
+        """Return the number of pending listeners."""
+        return self._count
+
+    @callback
+    def async_add(self, point_in_time, action):
+        """Run action once at the first time_changed past point_in_time.
+
+        Returns a function that can be called to remove the listener.
+
+        This method must be run in the event loop.
+        """
+        # [deadline, sequence, job]; job is set to None on removal
+        entry = [point_in_time, self._sequence, HassJob(action)]
+        self._sequence += 1
+        heapq.heappush(self._heap, entry)
+        self._count += 1
+
+        if self._unsub_bus is None:
+            self._unsub_bus = self._hass.bus.async_listen(
+                EVENT_TIME_CHANGED, self._async_time_changed)
+
+        @callback
+        def remove_listener():
+            """Remove the listener."""
+            if entry[2] is None:
+                return
+
+            entry[2] = None
+            self._async_entry_done()
+
+            # Compact the heap if it mostly holds removed listeners
+            if len(self._heap) > 2 * self._count + 16:
+                self._heap = [item for item in self._heap
+                              if item[2] is not None]
+                heapq.heapify(self._heap)
+
+        return remove_listener
 
     @callback
-    def point_in_time_listener(event):
-        """Listen for matching time_changed events."""
+    def _async_entry_done(self):
+        """Stop listening to the bus if no listeners are pending."""
+        self._count -= 1
+
+        if self._count == 0:
+            self._heap.clear()
+
+            if self._unsub_bus is not None:
+                self._unsub_bus()
+                self._unsub_bus = None
+
+    @callback
+    def _async_time_changed(self, event):
+        """Run the listeners whose point in time has passed."""
         now = event.data[ATTR_NOW]
+        heap = self._heap
+        jobs = []
 
-        if now < point_in_time or hasattr(point_in_time_listener, 'run'):
-            return
+        # Collect first so listeners scheduled by the actions run next tick
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
 
-        # Set variable so that we will never run twice.
-        # Because the event bus might have to wait till a thread comes
-        # available to execute this listener it might occur that the
-        # listener gets lined up twice to be executed. This will make
-        # sure the second time it does nothing.
-        point_in_time_listener.run = True
-        async_unsub()
+            if entry[2] is not None:
+                jobs.append(entry[2])
+                entry[2] = None
+                self._async_entry_done()
 
-        hass.async_run_job(action, now)
+        for job in jobs:
+            try:
+                self._hass.async_run_hass_job(job, now)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error in point in time listener %s",
+                                  job.target)
 
-    async_unsub = hass.bus.async_listen(EVENT_TIME_CHANGED,
-                                        point_in_time_listener)
 
-    return async_unsub
+@callback
+def async_track_point_in_utc_time(hass, action, point_in_time):
+    """Add a listener that fires once after a specific point in UTC time."""
+    # Ensure point_in_time is UTC
+    point_in_time = dt_util.as_utc(point_in_time)
+
+    if DATA_POINT_IN_TIME_LISTENERS not in hass.data:
+        hass.data[DATA_POINT_IN_TIME_LISTENERS] = PointInTimeListeners(hass)
+
+    return hass.data[DATA_POINT_IN_TIME_LISTENERS].async_add(
+        point_in_time, action)
 
 
 track_point_in_utc_time = threaded_listener_factory(
@@ -257,39 +540,66 @@ def async_track_utc_time_change(hass, action, year=None, month=None, day=None,
     """Add a listener that will fire if time matches a pattern."""
     # We do not have to wrap the function with time pattern matching logic
     # if no pattern given
+    job = HassJob(action)
+
     if all(val is None for val in (year, month, day, hour, minute, second)):
         @callback
         def time_change_listener(event):
             """Fire every time event that comes in."""
-            hass.async_run_job(action, event.data[ATTR_NOW])
+            hass.async_run_hass_job(job, event.data[ATTR_NOW])
 
         return hass.bus.async_listen(EVENT_TIME_CHANGED, time_change_listener)
 
-    pmp = _process_time_match
-    year, month, day = pmp(year), pmp(month), pmp(day)
-    hour, minute, second = pmp(hour), pmp(minute), pmp(second)
+    matching = (
+        dt_util.parse_time_expression(second, 0, 59),
+        dt_util.parse_time_expression(minute, 0, 59),
+        dt_util.parse_time_expression(hour, 0, 23),
+        dt_util.parse_time_expression(day, 1, 31),
+        dt_util.parse_time_expression(month, 1, 12),
+        dt_util.parse_time_expression(year, 1970, 2100),
+    )
 
-    @callback
-    def pattern_time_change_listener(event):
-        """Listen for matching time_changed events."""
-        now = event.data[ATTR_NOW]
+    if not all(matching):
+        raise ValueError(
+            "Time pattern matches no time: year={}, month={}, day={}, "
+            "hour={}, minute={}, second={}".format(
+                year, month, day, hour, minute, second))
 
+    unsub_point_in_time = None
+
+    @callback
+    def async_schedule_next(now):
+        """Schedule the listener for the next matching time from now on."""
+        nonlocal unsub_point_in_time
         if local:
             now = dt_util.as_local(now)
-        mat = _matcher
 
-        # pylint: disable=too-many-boolean-expressions
-        if mat(now.year, year) and \
-           mat(now.month, month) and \
-           mat(now.day, day) and \
-           mat(now.hour, hour) and \
-           mat(now.minute, minute) and \
-           mat(now.second, second):
+        next_time = dt_util.find_next_time_expression_time(now, *matching)
 
-            hass.async_run_job(action, now)
+        if next_time is None:
+            unsub_point_in_time = None
+            return
 
-    return hass.bus.async_listen(EVENT_TIME_CHANGED,
-                                 pattern_time_change_listener)
+        unsub_point_in_time = async_track_point_in_utc_time(
+            hass, pattern_time_change_listener, next_time)
+
+    @callback
+    def pattern_time_change_listener(now):
+        """Run action and schedule the next matching time."""
+        async_schedule_next(
+            now.replace(microsecond=0) + timedelta(seconds=1))
+
+        hass.async_run_hass_job(job, dt_util.as_local(now) if local else now)
+
+    async_schedule_next(dt_util.utcnow())
+
+    @callback
+    def unsub_pattern_time_change_listener():
+        """Remove the time pattern listener."""
+        if unsub_point_in_time is not None:
+            unsub_point_in_time()
+
+    return unsub_pattern_time_change_listener
 
 
 track_utc_time_change = threaded_listener_factory(async_track_utc_time_change)
@@ -316,27 +626,9 @@ def _process_state_match(parameter):
         return tuple(parameter)
 
 
-def _process_time_match(parameter):
-    """Wrap parameter in a tuple if it is not one and returns it."""
-    if parameter is None or parameter == MATCH_ALL:
-        return MATCH_ALL
-    elif isinstance(parameter, str) and parameter.startswith('/'):
-        return parameter
-    elif isinstance(parameter, str) or not hasattr(parameter, '__iter__'):
-        return (parameter,)
-    else:
-        return tuple(parameter)
-
-
 def _matcher(subject, pattern):
     """Return True if subject matches the pattern.
 
     Pattern is either a tuple of allowed subjects or a `MATCH_ALL`.
     """
-    if isinstance(pattern, str) and pattern.startswith('/'):
-        try:
-            return subject % float(pattern.lstrip('/')) == 0
-        except ValueError:
-            return False
-
     return MATCH_ALL == pattern or subject in pattern
@@ -0,0 +1,316 @@
+"""Helpers to send states to external services in batches."""
+import asyncio
+from collections import deque
+from datetime import timedelta
+import logging
+
+import aiohttp
+import async_timeout
+import voluptuous as vol
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED
+from homeassistant.core import callback, split_entity_id
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util.async import run_callback_threadsafe
+import homeassistant.util.dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_BATCH_SIZE = 'batch_size'
+CONF_FLUSH_INTERVAL = 'flush_interval'
+CONF_MAX_BUFFER = 'max_buffer'
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1
+DEFAULT_MAX_BUFFER = 10000
+
+MAX_RETRY_WAIT = 60  # seconds
+TIMEOUT = 10  # seconds
+
+_POSITIVE = vol.All(vol.Coerce(int), vol.Range(min=1))
+
+EXPORTER_SCHEMA = vol.Schema({
+    vol.Optional(CONF_BATCH_SIZE, default=DEFAULT_BATCH_SIZE): _POSITIVE,
+    vol.Optional(CONF_FLUSH_INTERVAL, default=DEFAULT_FLUSH_INTERVAL):
+        _POSITIVE,
+    vol.Optional(CONF_MAX_BUFFER, default=DEFAULT_MAX_BUFFER): _POSITIVE,
+})
+
+
+class ExportError(HomeAssistantError):
+    """Error raised when sending a batch again may succeed."""
+
+    pass
+
+
+def generate_entity_filter(include_domains=None, include_entities=None,
+                           exclude_domains=None, exclude_entities=None):
+    """Return a function that tells if the states of an entity are sent.
+
+    Excluded entities and domains are never sent. If entities or domains are
+    included, only those are sent. The verdict for an entity_id is cached.
+    """
+    include_d = set(include_domains or [])
+    include_e = set(include_entities or [])
+    exclude_d = set(exclude_domains or [])
+    exclude_e = set(exclude_entities or [])
+    cache = {}
+
+    def entity_filter(entity_id):
+        """Return if the states of an entity are sent."""
+        accepted = cache.get(entity_id)
+
+        if accepted is None:
+            domain = split_entity_id(entity_id)[0]
+
+            if entity_id in exclude_e or domain in exclude_d:
+                accepted = False
+            elif include_e or include_d:
+                accepted = entity_id in include_e or domain in include_d
+            else:
+                accepted = True
+
+            cache[entity_id] = accepted
+
+        return accepted
+
+    return entity_filter
+
+
+class BatchExporter(object):
+    """Send items to an external service in batches.
+
+    Subclasses convert the state changes to items and send batches of them.
+    A batch is sent once batch_size items are queued or flush_interval
+    seconds after its first item was queued, one batch at a time. A batch
+    that fails with an ExportError is sent again after a growing delay. If
+    more than max_buffer items are queued, the oldest are dropped. The
+    queued items are sent when Home Assistant stops.
+    """
+
+    def __init__(self, hass, name, config=None):
+        """Initialize the exporter."""
+        config = config or {}
+        self.hass = hass
+        self.name = name
+        self.batch_size = config.get(CONF_BATCH_SIZE, DEFAULT_BATCH_SIZE)
+        self.flush_interval = config.get(
+            CONF_FLUSH_INTERVAL, DEFAULT_FLUSH_INTERVAL)
+        self.max_buffer = config.get(CONF_MAX_BUFFER, DEFAULT_MAX_BUFFER)
+        self.items = deque()
+        self.sent = 0
+        self.dropped = 0
+        self._tries = 0
+        self._sending = None
+        self._stopping = False
+        self._remove_timer = None
+
+    def start(self, entity_filter=None):
+        """Start sending the state changes of the entities passing a filter."""
+        run_callback_threadsafe(
+            self.hass.loop, self.async_start, entity_filter).result()
+
+    @callback
+    def async_start(self, entity_filter=None, track_states=True):
+        """Start sending the state changes of the entities passing a filter.
+
+        Without track_states, only the items passed to async_queue are sent.
+
+        This method must be run in the event loop.
+        """
+        self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_stop)
+
+        if not track_states:
+            return
+
+        @callback
+        def async_state_changed(event):
+            """Queue the item for a state change."""
+            state = event.data.get('new_state')
+
+            if state is None or (entity_filter is not None and
+                                 not entity_filter(state.entity_id)):
+                return
+
+            item = self.convert(event)
+
+            if item is not None:
+                self.async_queue(item)
+
+        self.hass.bus.async_listen(EVENT_STATE_CHANGED, async_state_changed)
+
+    def convert(self, event):
+        """Return the item to send for a state changed event or None.
+
+        This method runs in the event loop.
+        """
+        raise NotImplementedError()
+
+    def send(self, batch):
+        """Send a batch of items.
+
+        Raise ExportError if sending the batch again may succeed. This method
+        runs in the executor, unless async_send is overridden.
+        """
+        raise NotImplementedError()
+
+    def async_send(self, batch):
+        """Send a batch of items.
+
+        This method must be run in the event loop and returns a coroutine.
+        """
+        return self.hass.async_add_job(self.send, batch)
+
+    @asyncio.coroutine
+    def async_post(self, url, **kwargs):
+        """Post to a URL using the shared aiohttp session.
+
+        Connections are kept alive between batches. Raise ExportError if the
+        request failed or the service is unavailable.
+
+        This method is a coroutine.
+        """
+        session = async_get_clientsession(self.hass)
+
+        try:
+            with async_timeout.timeout(TIMEOUT, loop=self.hass.loop):
+                response = yield from session.post(url, **kwargs)
+                yield from response.release()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            raise ExportError("Error posting to {}: {}".format(url, err))
+
+        if response.status >= 500 or response.status == 429:
+            raise ExportError("{} is unavailable (HTTP status {})".format(
+                url, response.status))
+        elif response.status >= 400:
+            raise HomeAssistantError("{} rejected the data (HTTP status {})"
+                                     .format(url, response.status))
+
+        return response
+
+    @asyncio.coroutine
+    def async_close(self):
+        """Close the connections to the service.
+
+        This method is a coroutine.
+        """
+        pass
+
+    @callback
+    def async_queue(self, item):
+        """Queue an item, dropping the oldest item if the buffer is full.
+
+        This method must be run in the event loop.
+        """
+        if len(self.items) >= self.max_buffer:
+            self.items.popleft()
+            self.dropped += 1
+
+        self.items.append(item)
+
+        if not self._stopping:
+            self._async_schedule()
+
+    @callback
+    def _async_schedule(self):
+        """Send the next batch now or schedule sending it."""
+        if self._sending is not None or not self.items:
+            return
+
+        if not self._tries and len(self.items) >= self.batch_size:
+            if self._remove_timer is not None:
+                self._remove_timer()
+                self._remove_timer = None
+
+            self._sending = self.hass.async_add_job(
+                self._async_send_next_batch())
+        elif self._remove_timer is None:
+            if self._tries:
+                delay = min(2**(self._tries - 1), MAX_RETRY_WAIT)
+            else:
+                delay = self.flush_interval
+
+            self._remove_timer = async_track_point_in_utc_time(
+                self.hass, self._async_timer_fired,
+                dt_util.utcnow() + timedelta(seconds=delay))
+
+    @callback
+    def _async_timer_fired(self, now):
+        """Send the next batch."""
+        self._remove_timer = None
+
+        if self._sending is None and self.items:
+            self._sending = self.hass.async_add_job(
+                self._async_send_next_batch())
+
+    @callback
+    def _async_next_batch(self):
+        """Take the next batch from the queue."""
+        return [self.items.popleft() for _ in
+                range(min(self.batch_size, len(self.items)))]
+
+    @asyncio.coroutine
+    def _async_send_next_batch(self):
+        """Send the next batch, queue it again if it should be retried."""
+        batch = self._async_next_batch()
+
+        if (yield from self._async_send_batch(batch)):
+            self._tries = 0
+        else:
+            self.items.extendleft(reversed(batch))
+
+            while len(self.items) > self.max_buffer:
+                self.items.popleft()
+                self.dropped += 1
+
+            self._tries += 1
+
+        self._sending = None
+
+        if not self._stopping:
+            self._async_schedule()
+
+    @asyncio.coroutine
+    def _async_send_batch(self, batch):
+        """Send a batch, return False if it should be sent again."""
+        try:
+            yield from self.async_send(batch)
+        except ExportError as err:
+            _LOGGER.warning("Unable to send %s items to %s: %s",
+                            len(batch), self.name, err)
+            return False
+        except Exception:  # pylint: disable=broad-except
+            # Sending the same items again would fail again
+            _LOGGER.exception("Error sending %s items to %s",
+                              len(batch), self.name)
+        else:
+            self.sent += len(batch)
+
+        return True
+
+    @asyncio.coroutine
+    def _async_stop(self, event):
+        """Send the queued items and close the connections."""
+        self._stopping = True
+
+        if self._remove_timer is not None:
+            self._remove_timer()
+            self._remove_timer = None
+
+        if self._sending is not None:
+            yield from self._sending
+
+        while self.items:
+            batch = self._async_next_batch()
+
+            if not (yield from self._async_send_batch(batch)):
+                dropped = len(batch) + len(self.items)
+                _LOGGER.error("Dropped %s items that could not be sent to %s "
+                              "before stopping", dropped, self.name)
+                self.dropped += dropped
+                self.items.clear()
+
+        yield from self.async_close()
@@ -1,9 +1,12 @@
 """Template helper methods for rendering strings with Home Assistant data."""
+from collections import OrderedDict
 from datetime import datetime
+import functools as ft
 import json
 import logging
 import random
 import re
+import threading
 
 import jinja2
 from jinja2 import contextfilter
@@ -20,8 +23,12 @@ from homeassistant.util.async import run_callback_threadsafe
 
 _LOGGER = logging.getLogger(__name__)
 _SENTINEL = object()
+_RENDER_INFO = threading.local()
 DATE_STR_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Number of template sources of which the compiled code is kept
+COMPILED_CACHE_SIZE = 1024
+
 _RE_NONE_ENTITIES = re.compile(r"distance\(|closest\(", re.I | re.M)
 _RE_GET_ENTITIES = re.compile(
     r"(?:(?:states\.|(?:is_state|is_state_attr|states)\(.)([\w]+\.[\w]+))",
@@ -52,6 +59,48 @@ def extract_entities(template):
     return MATCH_ALL
 
 
+def _collect_entity(entity_id):
+    """Collect an entity read by the render running in this thread."""
+    render_info = getattr(_RENDER_INFO, 'info', None)
+
+    if render_info is not None:
+        render_info.entities.add(str(entity_id).lower())
+
+
+def _collect_domain(domain):
+    """Collect a domain read by the render running in this thread."""
+    render_info = getattr(_RENDER_INFO, 'info', None)
+
+    if render_info is not None:
+        render_info.domains.add(domain)
+
+
+def _collect_all_states():
+    """Collect that the render running in this thread read all states."""
+    render_info = getattr(_RENDER_INFO, 'info', None)
+
+    if render_info is not None:
+        render_info.all_states = True
+
+
+class RenderInfo(object):
+    """The result of a render and the states the render read."""
+
+    def __init__(self):
+        """Initialize the render info."""
+        self.entities = set()
+        self.domains = set()
+        self.all_states = False
+        self.exception = None
+        self._result = None
+
+    def result(self):
+        """Return the result of the render, raise its TemplateError."""
+        if self.exception is not None:
+            raise self.exception
+        return self._result
+
+
 class Template(object):
     """Class to hold a template and manage caching and rendering."""
 
@@ -71,7 +120,7 @@ class Template(object):
             return
 
         try:
-            self._compiled_code = ENV.compile(self.template)
+            self._compiled_code = ENV.compile_cached(self.template)
         except jinja2.exceptions.TemplateSyntaxError as err:
             raise TemplateError(err)
 
@@ -102,6 +151,24 @@ class Template(object):
         except jinja2.TemplateError as err:
             raise TemplateError(err)
 
+    def async_render_to_info(self, variables=None, **kwargs):
+        """Render given template and collect the states it read.
+
+        This method must be run in the event loop.
+        """
+        render_info = RenderInfo()
+        _RENDER_INFO.info = render_info
+
+        try:
+            # pylint: disable=protected-access
+            render_info._result = self.async_render(variables, **kwargs)
+        except TemplateError as ex:
+            render_info.exception = ex
+        finally:
+            _RENDER_INFO.info = None
+
+        return render_info
+
     def render_with_possible_json_value(self, value, error_value=_SENTINEL):
         """Render template with value exposed.
 
@@ -151,8 +218,8 @@ class Template(object):
         global_vars = ENV.make_globals({
             'closest': location_methods.closest,
             'distance': location_methods.distance,
-            'is_state': self.hass.states.is_state,
-            'is_state_attr': self.hass.states.is_state_attr,
+            'is_state': ft.partial(_is_state, self.hass),
+            'is_state_attr': ft.partial(_is_state_attr, self.hass),
             'states': AllStates(self.hass),
         })
 
@@ -168,6 +235,18 @@ class Template(object):
                 self.hass == other.hass)
 
 
+def _is_state(hass, entity_id, state):
+    """Test if an entity is in a state, collecting the entity."""
+    _collect_entity(entity_id)
+    return hass.states.is_state(entity_id, state)
+
+
+def _is_state_attr(hass, entity_id, name, value):
+    """Test if an entity attribute has a value, collecting the entity."""
+    _collect_entity(entity_id)
+    return hass.states.is_state_attr(entity_id, name, value)
+
+
 class AllStates(object):
     """Class to expose all HA states as attributes."""
 
@@ -181,11 +260,13 @@ class AllStates(object):
 
     def __iter__(self):
         """Return all states."""
+        _collect_all_states()
         return iter(sorted(self._hass.states.async_all(),
                            key=lambda state: state.entity_id))
 
     def __call__(self, entity_id):
         """Return the states."""
+        _collect_entity(entity_id)
         state = self._hass.states.get(entity_id)
         return STATE_UNKNOWN if state is None else state.state
 
@@ -200,10 +281,13 @@ class DomainStates(object):
 
     def __getattr__(self, name):
         """Return the states."""
-        return self._hass.states.get('{}.{}'.format(self._domain, name))
+        entity_id = '{}.{}'.format(self._domain, name)
+        _collect_entity(entity_id)
+        return self._hass.states.get(entity_id)
 
     def __iter__(self):
         """Return the iteration over all the states."""
+        _collect_domain(self._domain)
         return iter(sorted(
             (state for state in self._hass.states.async_all()
              if state.domain == self._domain),
@@ -274,9 +358,13 @@ class LocationMethods(object):
                 gr_entity_id = str(entities)
 
             group = get_component('group')
+            _collect_entity(gr_entity_id)
+            states = []
 
-            states = [self._hass.states.get(entity_id) for entity_id
-                      in group.expand_entity_ids(self._hass, [gr_entity_id])]
+            for entity_id in group.expand_entity_ids(
+                    self._hass, [gr_entity_id]):
+                _collect_entity(entity_id)
+                states.append(self._hass.states.get(entity_id))
 
         return loc_helper.closest(latitude, longitude, states)
 
@@ -333,6 +421,7 @@ class LocationMethods(object):
         if isinstance(entity_id_or_state, State):
             return entity_id_or_state
         elif isinstance(entity_id_or_state, str):
+            _collect_entity(entity_id_or_state)
             return self._hass.states.get(entity_id_or_state)
         return None
 
@@ -433,6 +522,40 @@ def random_every_time(context, values):
 class TemplateEnvironment(ImmutableSandboxedEnvironment):
     """The Home Assistant template environment."""
 
+    def __init__(self):
+        """Initialize the environment."""
+        super().__init__()
+        self._compiled_cache = OrderedDict()
+        self._compiled_cache_lock = threading.Lock()
+        self.compiled_cache_hits = 0
+        self.compiled_cache_misses = 0
+
+    def compile_cached(self, source):
+        """Compile a template source, sharing the code of equal sources.
+
+        The code of the COMPILED_CACHE_SIZE most recently used sources is
+        kept. Templates are compiled from the event loop and from threads.
+        """
+        with self._compiled_cache_lock:
+            code = self._compiled_cache.get(source)
+
+            if code is not None:
+                self._compiled_cache.move_to_end(source)
+                self.compiled_cache_hits += 1
+                return code
+
+            self.compiled_cache_misses += 1
+
+        code = self.compile(source)
+
+        with self._compiled_cache_lock:
+            self._compiled_cache[source] = code
+
+            while len(self._compiled_cache) > COMPILED_CACHE_SIZE:
+                self._compiled_cache.popitem(last=False)
+
+        return code
+
     def is_safe_callable(self, obj):
         """Test if callback is safe."""
         return isinstance(obj, AllStates) or super().is_safe_callable(obj)
@@ -2,13 +2,18 @@
 import asyncio
 import argparse
 from contextlib import suppress
+import itertools
 import logging
 from timeit import default_timer as timer
 
 from homeassistant import core
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.helpers.event import async_track_state_change
 
 BENCHMARKS = {}
 
+_LOGGER = logging.getLogger(__name__)
+
 
 def run(args):
     """Handle ensure config commandline script."""
@@ -48,20 +53,65 @@ def benchmark(func):
 @benchmark
 @asyncio.coroutine
 def async_million_events(hass):
-    """Run a million events."""
-    count = 0
-    event_name = 'benchmark_event'
-    event = asyncio.Event(loop=hass.loop)
+    """Run a million events with a callback listener."""
+    done, count = _million_counter(hass)
 
     @core.callback
     def listener(_):
         """Handle event."""
-        nonlocal count
-        count += 1
+        count()
 
-        if count == 10**6:
-            event.set()
+    return (yield from _async_fire_million_events(hass, listener, done))
+
+
+@benchmark
+@asyncio.coroutine
+def async_million_coroutine_events(hass):
+    """Run a million events with a coroutine listener."""
+    done, count = _million_counter(hass)
+
+    @asyncio.coroutine
+    def listener(_):
+        """Handle event."""
+        count()
+
+    return (yield from _async_fire_million_events(hass, listener, done))
+
+
+@benchmark
+@asyncio.coroutine
+def async_million_executor_events(hass):
+    """Run a million events with a listener that runs in the executor."""
+    done, count = _million_counter(hass)
+
+    def listener(_):
+        """Handle event."""
+        count()
+
+    return (yield from _async_fire_million_events(hass, listener, done))
+
+
+def _million_counter(hass):
+    """Return an event that is set once count has been called 10**6 times.
+
+    count is safe to call from the executor, next() on itertools.count is
+    atomic unlike += on a nonlocal.
+    """
+    done = asyncio.Event(loop=hass.loop)
+    counter = itertools.count(1)
 
+    def count():
+        """Count a handled event."""
+        if next(counter) == 10**6:
+            hass.loop.call_soon_threadsafe(done.set)
+
+    return done, count
+
+
+@asyncio.coroutine
+def _async_fire_million_events(hass, listener, done):
+    """Fire a million events at listener and return the time it took."""
+    event_name = 'benchmark_event'
     hass.bus.async_listen(event_name, listener)
 
     start = timer()
@@ -69,6 +119,151 @@ def async_million_events(hass):
     for _ in range(10**6):
         hass.bus.async_fire(event_name)
 
+    yield from done.wait()
+
+    return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+def async_state_changed_trackers(hass):
+    """Run 100k state changes with 1000 entities tracked."""
+    count = 0
+    entity_id = 'light.kitchen_0'
+    event = asyncio.Event(loop=hass.loop)
+
+    @core.callback
+    def listener(*args):
+        """Handle state change."""
+        nonlocal count
+        count += 1
+
+        if count == 10**5:
+            event.set()
+
+    for idx in range(1000):
+        async_track_state_change(
+            hass, 'light.kitchen_{}'.format(idx), listener)
+
+    event_data = {
+        'entity_id': entity_id,
+        'old_state': core.State(entity_id, 'off'),
+        'new_state': core.State(entity_id, 'on'),
+    }
+
+    start = timer()
+
+    for _ in range(10**5):
+        hass.bus.async_fire(EVENT_STATE_CHANGED, event_data)
+
     yield from event.wait()
 
     return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+def async_state_memory(hass):
+    """Keep 100 updates of 10k entities in memory and report the size."""
+    import tracemalloc
+
+    states = []
+    attributes = {
+        'friendly_name': 'Temperature',
+        'unit_of_measurement': '°C',
+        'icon': 'mdi:thermometer',
+    }
+
+    @core.callback
+    def listener(event):
+        """Keep the new state, like the history of an entity."""
+        states.append(event.data['new_state'])
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, listener)
+    entity_ids = ['sensor.temperature_{}'.format(idx) for idx in range(10**4)]
+
+    tracemalloc.start()
+    start = timer()
+
+    for value in range(100):
+        for entity_id in entity_ids:
+            hass.states.async_set(entity_id, value, dict(attributes))
+
+    # Run the scheduled listeners
+    yield from asyncio.sleep(0, loop=hass.loop)
+
+    runtime = timer() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    _LOGGER.info("%d states use %.1f MB", len(states), memory / 1024**2)
+
+    return runtime
+
+
+@benchmark
+@asyncio.coroutine
+def async_serialize_state_changed(hass):
+    """Encode 100k state changed events for 10 subscribers."""
+    count = 0
+    event = asyncio.Event(loop=hass.loop)
+    attributes = {
+        'friendly_name': 'Temperature',
+        'unit_of_measurement': '°C',
+        'icon': 'mdi:thermometer',
+    }
+
+    @core.callback
+    def listener(state_event):
+        """Encode the event once per subscriber."""
+        nonlocal count
+        for _ in range(10):
+            state_event.as_json()
+        count += 1
+
+        if count == 10**5:
+            event.set()
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, listener)
+    start = timer()
+
+    for value in range(10**5):
+        hass.states.async_set('sensor.temperature', value, attributes)
+
+    yield from event.wait()
+
+    return timer() - start
+
+
+@benchmark
+@asyncio.coroutine
+def async_mqtt_dispatch(hass):
+    """Match 100k MQTT messages against 1000 subscriptions."""
+    from homeassistant.components import mqtt
+
+    count = 0
+    subscriptions = mqtt.SubscriptionTrie()
+
+    def subscriber():
+        """Count the matched messages."""
+        nonlocal count
+        count += 1
+
+    for device in range(200):
+        subscriptions.add('home/{}/temperature'.format(device), subscriber)
+        subscriptions.add('home/{}/humidity'.format(device), subscriber)
+        subscriptions.add('home/{}/+'.format(device), subscriber)
+        subscriptions.add('zigbee/{}/#'.format(device), subscriber)
+        subscriptions.add('zigbee/{}/state'.format(device), subscriber)
+
+    topics = ['home/{}/temperature'.format(device % 200)
+              for device in range(10**5)]
+    start = timer()
+
+    for topic in topics:
+        for matched in subscriptions.matches(topic):
+            matched()
+
+    _LOGGER.info("%d subscribers called", count)
+
+    return timer() - start
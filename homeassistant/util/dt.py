@@ -1,12 +1,16 @@
 """Helper methods to handle the time in Home Assistant."""
+from bisect import bisect_left
+import calendar
 import datetime as dt
 import re
 
 # pylint: disable=unused-import
-from typing import Any, Union, Optional, Tuple  # NOQA
+from typing import Any, Union, Optional, Tuple, List  # NOQA
 
 import pytz
 
+from homeassistant.const import MATCH_ALL
+
 DATE_STR_FORMAT = "%Y-%m-%d"
 UTC = DEFAULT_TIME_ZONE = pytz.utc  # type: dt.tzinfo
 
@@ -212,3 +216,106 @@ def get_age(date: dt.datetime) -> str:
         return formatn(minute, 'minute')
 
     return formatn(second, 'second') if second > 0 else "0 seconds"
+
+
+def parse_time_expression(parameter: Any, min_value: int,
+                          max_value: int) -> List[int]:
+    """Parse a time expression part and return the sorted values it matches.
+
+    The parameter is either None or MATCH_ALL to match all values, a string
+    like '/5' to match all values divisible by 5, or a value or list of
+    values to match.
+    """
+    if parameter is None or parameter == MATCH_ALL:
+        return list(range(min_value, max_value + 1))
+    elif isinstance(parameter, str) and parameter.startswith('/'):
+        try:
+            divisor = float(parameter.lstrip('/'))
+        except ValueError:
+            return []
+
+        if not divisor:
+            return []
+
+        return [value for value in range(min_value, max_value + 1)
+                if value % divisor == 0]
+    elif isinstance(parameter, str) or not hasattr(parameter, '__iter__'):
+        parameter = (parameter,)
+
+    return sorted(set(value for value in parameter
+                      if isinstance(value, int) and
+                      min_value <= value <= max_value))
+
+
+def _iter_time_expression(start, expression, parts, on_start):
+    """Yield the naive datetimes matching expression from start onwards.
+
+    start and expression are in (year, month, day, hour, minute, second)
+    order, parts holds the values picked for the leading fields.
+    """
+    index = len(parts)
+
+    if index == len(expression):
+        yield dt.datetime(*parts)
+        return
+
+    values = expression[index]
+    lower = bisect_left(values, start[index]) if on_start else 0
+
+    if index == 2:
+        # Days that do not exist in the picked month are skipped
+        values = values[lower:bisect_left(
+            values, calendar.monthrange(parts[0], parts[1])[1] + 1)]
+    else:
+        values = values[lower:]
+
+    for value in values:
+        yield from _iter_time_expression(
+            start, expression, parts + [value],
+            on_start and value == start[index])
+
+
+def find_next_time_expression_time(now: dt.datetime, seconds: List[int],
+                                   minutes: List[int], hours: List[int],
+                                   days: List[int], months: List[int],
+                                   years: List[int]) -> Optional[dt.datetime]:
+    """Return the first time at or after now that matches the expression.
+
+    The values are lists as returned by parse_time_expression. The matching
+    is done on the wall clock of the time zone of now, wall times that do
+    not exist because of a DST transition are skipped and ambiguous ones
+    resolve to their first occurrence at or after now. Returns None if
+    nothing matches.
+    """
+    # A field that matches no value never matches, don't search every year
+    if not all((seconds, minutes, hours, days, months, years)):
+        return None
+
+    tzinfo = now.tzinfo
+    start = (now.year, now.month, now.day, now.hour, now.minute, now.second)
+
+    if now.microsecond:
+        start = (now.replace(microsecond=0) + dt.timedelta(seconds=1))
+        start = (start.year, start.month, start.day, start.hour,
+                 start.minute, start.second)
+
+    expression = (years, months, days, hours, minutes, seconds)
+
+    for candidate in _iter_time_expression(start, expression, [], True):
+        if tzinfo is None:
+            return candidate
+        elif not hasattr(tzinfo, 'localize'):
+            return candidate.replace(tzinfo=tzinfo)
+
+        try:
+            return tzinfo.localize(candidate, is_dst=None)
+        except pytz.exceptions.AmbiguousTimeError:
+            for is_dst in (True, False):
+                localized = tzinfo.localize(candidate, is_dst=is_dst)
+
+                if localized >= now:
+                    return localized
+        except pytz.exceptions.NonExistentTimeError:
+            continue
+
+    return None
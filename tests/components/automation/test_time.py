@@ -1,17 +1,23 @@
 """The tests for the time automation."""
-from datetime import timedelta
+from datetime import datetime, timedelta
 import unittest
 from unittest.mock import patch
 
+import voluptuous as vol
+
 from homeassistant.core import callback
 from homeassistant.setup import setup_component
 import homeassistant.util.dt as dt_util
 import homeassistant.components.automation as automation
+from homeassistant.components.automation import time
 
 from tests.common import (
     fire_time_changed, get_test_home_assistant, assert_setup_component,
     mock_component)
 
+# Time triggers are scheduled for the first matching time after setup
+SETUP_TIME = datetime(2017, 1, 1, 0, 0, 0, tzinfo=dt_util.UTC)
+
 
 # pylint: disable=invalid-name
 class TestAutomationTime(unittest.TestCase):
@@ -36,84 +42,92 @@ class TestAutomationTime(unittest.TestCase):
 
     def test_if_fires_when_hour_matches(self):
         """Test for firing if hour is matching."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'hours': 0,
-                },
-                'action': {
-                    'service': 'test.automation'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'hours': 0,
+                    },
+                    'action': {
+                        'service': 'test.automation'
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(hour=0))
+        fire_time_changed(self.hass, SETUP_TIME.replace(hour=0))
         self.hass.block_till_done()
         self.assertEqual(1, len(self.calls))
 
         automation.turn_off(self.hass)
         self.hass.block_till_done()
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(hour=0))
+        fire_time_changed(self.hass, SETUP_TIME.replace(hour=0))
         self.hass.block_till_done()
         self.assertEqual(1, len(self.calls))
 
     def test_if_fires_when_minute_matches(self):
         """Test for firing if minutes are matching."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'minutes': 0,
-                },
-                'action': {
-                    'service': 'test.automation'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'minutes': 0,
+                    },
+                    'action': {
+                        'service': 'test.automation'
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(minute=0))
+        fire_time_changed(self.hass, SETUP_TIME.replace(minute=0))
 
         self.hass.block_till_done()
         self.assertEqual(1, len(self.calls))
 
     def test_if_fires_when_second_matches(self):
         """Test for firing if seconds are matching."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'seconds': 0,
-                },
-                'action': {
-                    'service': 'test.automation'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'seconds': 0,
+                    },
+                    'action': {
+                        'service': 'test.automation'
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(second=0))
+        fire_time_changed(self.hass, SETUP_TIME.replace(second=0))
 
         self.hass.block_till_done()
         self.assertEqual(1, len(self.calls))
 
     def test_if_fires_when_all_matches(self):
         """Test for firing if everything matches."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'hours': 1,
-                    'minutes': 2,
-                    'seconds': 3,
-                },
-                'action': {
-                    'service': 'test.automation'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'hours': 1,
+                        'minutes': 2,
+                        'seconds': 3,
+                    },
+                    'action': {
+                        'service': 'test.automation'
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(
+        fire_time_changed(self.hass, SETUP_TIME.replace(
             hour=1, minute=2, second=3))
 
         self.hass.block_till_done()
@@ -121,19 +135,21 @@ class TestAutomationTime(unittest.TestCase):
 
     def test_if_fires_periodic_seconds(self):
         """Test for firing periodically every second."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'seconds': "/2",
-                },
-                'action': {
-                    'service': 'test.automation'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'seconds': "/2",
+                    },
+                    'action': {
+                        'service': 'test.automation'
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(
+        fire_time_changed(self.hass, SETUP_TIME.replace(
             hour=0, minute=0, second=2))
 
         self.hass.block_till_done()
@@ -141,19 +157,21 @@ class TestAutomationTime(unittest.TestCase):
 
     def test_if_fires_periodic_minutes(self):
         """Test for firing periodically every minute."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'minutes': "/2",
-                },
-                'action': {
-                    'service': 'test.automation'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'minutes': "/2",
+                    },
+                    'action': {
+                        'service': 'test.automation'
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(
+        fire_time_changed(self.hass, SETUP_TIME.replace(
             hour=0, minute=2, second=0))
 
         self.hass.block_till_done()
@@ -161,19 +179,21 @@ class TestAutomationTime(unittest.TestCase):
 
     def test_if_fires_periodic_hours(self):
         """Test for firing periodically every hour."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'hours': "/2",
-                },
-                'action': {
-                    'service': 'test.automation'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'hours': "/2",
+                    },
+                    'action': {
+                        'service': 'test.automation'
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(
+        fire_time_changed(self.hass, SETUP_TIME.replace(
             hour=2, minute=0, second=0))
 
         self.hass.block_till_done()
@@ -181,23 +201,25 @@ class TestAutomationTime(unittest.TestCase):
 
     def test_if_fires_using_at(self):
         """Test for firing at."""
-        assert setup_component(self.hass, automation.DOMAIN, {
-            automation.DOMAIN: {
-                'trigger': {
-                    'platform': 'time',
-                    'at': '5:00:00',
-                },
-                'action': {
-                    'service': 'test.automation',
-                    'data_template': {
-                        'some': '{{ trigger.platform }} - '
-                                '{{ trigger.now.hour }}'
+        with patch('homeassistant.util.dt.utcnow',
+                   return_value=SETUP_TIME):
+            assert setup_component(self.hass, automation.DOMAIN, {
+                automation.DOMAIN: {
+                    'trigger': {
+                        'platform': 'time',
+                        'at': '5:00:00',
                     },
+                    'action': {
+                        'service': 'test.automation',
+                        'data_template': {
+                            'some': '{{ trigger.platform }} - '
+                                    '{{ trigger.now.hour }}'
+                        },
+                    }
                 }
-            }
-        })
+            })
 
-        fire_time_changed(self.hass, dt_util.utcnow().replace(
+        fire_time_changed(self.hass, SETUP_TIME.replace(
             hour=5, minute=0, second=0))
 
         self.hass.block_till_done()
@@ -224,6 +246,13 @@ class TestAutomationTime(unittest.TestCase):
         self.hass.block_till_done()
         self.assertEqual(0, len(self.calls))
 
+    def test_if_not_working_with_invalid_patterns(self):
+        """Test that patterns that match no time are rejected."""
+        for key, value in (('seconds', 75), ('minutes', 60), ('hours', 24),
+                           ('minutes', '/0'), ('seconds', '/x')):
+            with self.assertRaises(vol.Invalid):
+                time.TRIGGER_SCHEMA({'platform': 'time', key: value})
+
     def test_if_not_fires_using_wrong_at(self):
         """YAML translates time values to total seconds.
 
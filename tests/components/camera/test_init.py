@@ -1,10 +1,12 @@
 """The tests for the camera component."""
 import asyncio
-from unittest.mock import patch
+import io
+from unittest.mock import patch, PropertyMock
 
+from PIL import Image
 import pytest
 
-from homeassistant.setup import setup_component
+from homeassistant.setup import async_setup_component, setup_component
 from homeassistant.const import ATTR_ENTITY_PICTURE
 import homeassistant.components.camera as camera
 import homeassistant.components.http as http
@@ -105,3 +107,186 @@ class TestGetImage(object):
                 self.hass, 'camera.demo_camera'), self.hass.loop).result()
 
         assert len(aioclient_mock.mock_calls) == 1
+
+
+class MockCamera(camera.Camera):
+    """Camera returning the queued images and counting the fetches."""
+
+    def __init__(self, hass, images):
+        """Initialize the camera."""
+        super().__init__()
+        self.hass = hass
+        self.entity_id = 'camera.mock'
+        self.images = list(images)
+        self.fetches = 0
+
+    @property
+    def frame_interval(self):
+        """Fetch images quickly."""
+        return 0.01
+
+    @asyncio.coroutine
+    def async_camera_image(self):
+        """Return the next image."""
+        self.fetches += 1
+        yield from asyncio.sleep(0, loop=self.hass.loop)
+        return self.images.pop(0) if self.images else None
+
+
+@asyncio.coroutine
+def test_frame_broker_shares_fetches(hass):
+    """Test that concurrent and fresh snapshots share a fetch."""
+    mock_camera = MockCamera(hass, [b'Frame1', b'Frame2'])
+    broker = mock_camera.frame_broker
+
+    frames = yield from asyncio.gather(
+        broker.async_get_frame(), broker.async_get_frame(), loop=hass.loop)
+    assert frames == [b'Frame1', b'Frame1']
+    assert (yield from broker.async_get_frame()) == b'Frame1'
+    assert mock_camera.fetches == 1
+
+    yield from asyncio.sleep(0.02, loop=hass.loop)
+    assert (yield from broker.async_get_frame()) == b'Frame2'
+    assert mock_camera.fetches == 2
+
+
+@asyncio.coroutine
+def test_frame_broker_streams(hass):
+    """Test that all streams are sent the images of one fetch loop."""
+    mock_camera = MockCamera(hass, [b'Frame1', b'Frame2'])
+    broker = mock_camera.frame_broker
+    first_id = broker.async_subscribe()
+    second_id = broker.async_subscribe()
+
+    first = yield from broker.async_next_frame(first_id)
+    second = yield from broker.async_next_frame(second_id)
+    assert first == second == (1, b'Frame1')
+
+    assert (yield from broker.async_next_frame(1)) == (2, b'Frame2')
+    # The camera returned no image, the streams end
+    assert (yield from broker.async_next_frame(2)) == (3, None)
+    assert mock_camera.fetches == 3
+
+    broker.async_unsubscribe()
+    broker.async_unsubscribe()
+    yield from hass.async_block_till_done()
+    assert mock_camera.fetches <= 4
+
+
+@asyncio.coroutine
+def test_mjpeg_stream(hass, test_client):
+    """Test that the stream sends the images until there are no more."""
+    yield from async_setup_component(hass, 'camera', {
+        'camera': {
+            'platform': 'demo'
+        }})
+    client = yield from test_client(hass.http.app)
+
+    with patch('homeassistant.components.camera.demo.DemoCamera.'
+               'camera_image', side_effect=[b'Frame1', b'Frame2', None]), \
+            patch('homeassistant.components.camera.DEFAULT_FRAME_INTERVAL',
+                  0.01):
+        resp = yield from client.get(
+            '/api/camera_proxy_stream/camera.demo_camera')
+        assert resp.status == 200
+        body = yield from resp.read()
+
+    # Browsers ignore the first image, it is sent twice
+    assert body.count(b'Frame1') == 2
+    assert body.count(b'Frame2') == 1
+
+
+def _jpeg(width, height):
+    """Return a JPEG of a size."""
+    output = io.BytesIO()
+    Image.new('RGB', (width, height)).save(output, 'JPEG')
+    return output.getvalue()
+
+
+@asyncio.coroutine
+def test_resized_image(hass, test_client):
+    """Test that resized images are cached until the next image."""
+    yield from async_setup_component(hass, 'camera', {
+        'camera': {
+            'platform': 'demo'
+        }})
+    client = yield from test_client(hass.http.app)
+    url = '/api/camera_proxy/camera.demo_camera'
+    resizes = []
+    orig_resize_image = camera._resize_image
+
+    def resize_image(*args):
+        """Count the resizes."""
+        resizes.append(args[1:])
+        return orig_resize_image(*args)
+
+    with patch('homeassistant.components.camera.demo.DemoCamera.'
+               'camera_image', side_effect=[_jpeg(64, 48), _jpeg(32, 32)]), \
+            patch('homeassistant.components.camera._resize_image',
+                  new=resize_image):
+        for _ in range(2):
+            resp = yield from client.get(url, params={'width': 32})
+            assert resp.status == 200
+            assert resp.content_type == 'image/jpeg'
+            body = yield from resp.read()
+            assert Image.open(io.BytesIO(body)).size == (32, 24)
+
+        assert resizes == [(32, 0)]
+
+        with patch('homeassistant.components.camera.DEFAULT_FRAME_INTERVAL',
+                   0):
+            resp = yield from client.get(
+                url, params={'width': 32, 'height': 16})
+            body = yield from resp.read()
+
+        assert Image.open(io.BytesIO(body)).size == (16, 16)
+        assert resizes == [(32, 0), (32, 16)]
+
+
+@asyncio.coroutine
+def test_resized_image_invalid(hass, test_client):
+    """Test invalid sizes and images that can't be resized."""
+    yield from async_setup_component(hass, 'camera', {
+        'camera': {
+            'platform': 'demo'
+        }})
+    client = yield from test_client(hass.http.app)
+    url = '/api/camera_proxy/camera.demo_camera'
+
+    for params in ({'width': 'wide'}, {'height': -1}):
+        resp = yield from client.get(url, params=params)
+        assert resp.status == 400
+
+    with patch('homeassistant.components.camera.demo.DemoCamera.'
+               'camera_image', return_value=b'<svg></svg>'):
+        resp = yield from client.get(url, params={'width': 32})
+        assert resp.status == 200
+        assert (yield from resp.read()) == b'<svg></svg>'
+
+
+@asyncio.coroutine
+def test_resize_image_without_pillow(hass, test_client):
+    """Test that images are served as is when Pillow is not installed."""
+    yield from async_setup_component(hass, 'camera', {
+        'camera': {
+            'platform': 'demo'
+        }})
+    client = yield from test_client(hass.http.app)
+    url = '/api/camera_proxy/camera.demo_camera'
+
+    with patch('homeassistant.components.camera.demo.DemoCamera.'
+               'camera_image', return_value=b'<svg></svg>'), \
+            patch('homeassistant.components.camera.demo.DemoCamera.'
+                  'content_type', new_callable=PropertyMock, create=True,
+                  return_value='image/svg+xml'), \
+            patch.dict('sys.modules', {'PIL': None}):
+        resp = yield from client.get(url, params={'width': 32})
+        assert resp.status == 200
+        assert resp.content_type == 'image/svg+xml'
+        assert (yield from resp.read()) == b'<svg></svg>'
+
+
+def test_resize_invalid_image():
+    """Test that images that are too large to decode are not resized."""
+    with patch('PIL.Image.open', side_effect=ValueError):
+        assert camera._resize_image(_jpeg(64, 48), 32, 0) is None
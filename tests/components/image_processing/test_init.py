@@ -1,15 +1,21 @@
 """The tests for the image_processing component."""
+import asyncio
+import io
 from unittest.mock import patch, PropertyMock
 
+from PIL import Image
+import pytest
+
 from homeassistant.core import callback
-from homeassistant.const import ATTR_ENTITY_PICTURE
-from homeassistant.setup import setup_component
+from homeassistant.const import ATTR_ENTITY_PICTURE, EVENT_HOMEASSISTANT_STOP
+from homeassistant.setup import async_setup_component, setup_component
 from homeassistant.exceptions import HomeAssistantError
 import homeassistant.components.http as http
 import homeassistant.components.image_processing as ip
 
 from tests.common import (
-    get_test_home_assistant, get_test_instance_port, assert_setup_component)
+    get_test_home_assistant, get_test_instance_port, assert_setup_component,
+    mock_coro)
 
 
 class TestSetupImageProcessing(object):
@@ -296,3 +302,128 @@ class TestImageProcessingFace(object):
         assert event_data[0]['gender'] == 'male'
         assert event_data[0]['entity_id'] == \
             'image_processing.demo_face'
+
+
+def _gradient(reverse=False, noise=0):
+    """Return a JPEG getting darker to the right or to the left."""
+    img = Image.new('L', (64, 48))
+    img.putdata([(255 - x * 4 if not reverse else x * 4) + (y % 2) * noise
+                 for y in range(48) for x in range(64)])
+    output = io.BytesIO()
+    img.save(output, 'JPEG')
+    return output.getvalue()
+
+
+class MockImageProcessing(ip.ImageProcessingEntity):
+    """Image processing entity that keeps the processed images."""
+
+    def __init__(self, hass, change_threshold):
+        """Initialize the entity."""
+        self.hass = hass
+        self.entity_id = 'image_processing.mock'
+        self.images = []
+        self._change_threshold = change_threshold
+
+    @property
+    def change_threshold(self):
+        """Return how many bits of the hash must change to process images."""
+        return self._change_threshold
+
+    def process_image(self, image):
+        """Keep the image."""
+        self.images.append(image)
+
+
+def test_difference_hash():
+    """Test that alike images have alike hashes."""
+    image_hash = ip.difference_hash(_gradient())
+
+    assert image_hash == 2**64 - 1
+    assert ip.difference_hash(_gradient(noise=2)) == image_hash
+    assert ip.difference_hash(_gradient(reverse=True)) == 0
+    assert ip.difference_hash(b'no image') is None
+
+    with patch('PIL.Image.open', side_effect=ValueError):
+        assert ip.difference_hash(_gradient()) is None
+
+    with patch.dict('sys.modules', {'PIL': None}):
+        assert ip.difference_hash(_gradient()) is None
+
+
+@asyncio.coroutine
+def test_skip_unchanged_images(hass):
+    """Test that images alike the last processed image are skipped."""
+    entity = MockImageProcessing(hass, 8)
+    images = [_gradient(), _gradient(noise=2), _gradient(reverse=True)]
+
+    with patch('homeassistant.components.camera.async_get_image',
+               side_effect=lambda *args, **kwargs: mock_coro(images.pop(0))):
+        for _ in range(3):
+            yield from entity.async_update()
+
+    assert entity.images == [_gradient(), _gradient(reverse=True)]
+    assert entity.processed == 2
+    assert entity.skipped == 1
+    assert entity.total_process_time >= entity.process_time > 0
+
+    attr = entity.state_attributes
+    assert attr[ip.ATTR_PROCESSED] == 2
+    assert attr[ip.ATTR_SKIPPED] == 1
+    assert attr[ip.ATTR_TOTAL_PROCESS_TIME] >= attr[ip.ATTR_PROCESS_TIME]
+
+
+@asyncio.coroutine
+def test_process_all_images_without_pillow(hass):
+    """Test that all images are processed when Pillow is not installed."""
+    entity = MockImageProcessing(hass, 8)
+    images = [_gradient(), _gradient(noise=2)]
+
+    with patch('homeassistant.components.camera.async_get_image',
+               side_effect=lambda *args, **kwargs: mock_coro(images.pop(0))), \
+            patch.dict('sys.modules', {'PIL': None}):
+        for _ in range(2):
+            yield from entity.async_update()
+
+    assert entity.images == [_gradient(), _gradient(noise=2)]
+    assert entity.processed == 2
+    assert entity.skipped == 0
+
+
+@asyncio.coroutine
+def test_scan_processes_unchanged_images(hass):
+    """Test that the scan service processes an image that did not change."""
+    image = _gradient()
+
+    with patch('homeassistant.components.image_processing.demo.'
+               'DemoImageProcessingAlpr.change_threshold',
+               new_callable=PropertyMock, return_value=8), \
+            patch('homeassistant.components.camera.async_get_image',
+                  side_effect=lambda *args, **kwargs: mock_coro(image)), \
+            patch('homeassistant.components.image_processing.demo.'
+                  'DemoImageProcessingAlpr.process_image') as mock_process:
+        yield from async_setup_component(hass, ip.DOMAIN, {
+            ip.DOMAIN: {
+                'platform': 'demo'
+            }})
+
+        for _ in range(2):
+            yield from hass.services.async_call(ip.DOMAIN, ip.SERVICE_SCAN, {
+                'entity_id': 'image_processing.demo_alpr'}, blocking=True)
+
+    assert mock_process.call_count == 2
+
+
+@asyncio.coroutine
+def test_process_pool(hass):
+    """Test that functions run in the process pool until stopping."""
+    with patch.object(ip, 'PROCESS_POOL_SIZE', 1):
+        result = yield from ip.async_run_in_process_pool(hass, sum, [1, 2])
+        assert result == 3
+        assert ip.DATA_PROCESS_POOL in hass.data
+
+        with pytest.raises(ValueError):
+            yield from ip.async_run_in_process_pool(hass, int, 'no number')
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+    yield from hass.async_block_till_done()
+    assert ip.DATA_PROCESS_POOL not in hass.data
@@ -283,6 +283,47 @@ class TestMQTT(unittest.TestCase):
         self.assertEqual('$test-topic/subtree/some-topic', self.calls[0][0])
         self.assertEqual('test-payload', self.calls[0][1])
 
+    def test_subscribe_topic_subtree_wildcard_level_prefix_no_match(self):
+        """Test that a subtree wildcard only matches whole levels."""
+        mqtt.subscribe(self.hass, 'test-topic/#', self.record_calls)
+
+        fire_mqtt_message(self.hass, 'test-topic-2/bier', 'test-payload')
+
+        self.hass.block_till_done()
+        self.assertEqual(0, len(self.calls))
+
+    def test_subscribe_overlapping_topics(self):
+        """Test that every matching subscription receives a message once."""
+        unsub = mqtt.subscribe(self.hass, 'test-topic/+', self.record_calls)
+        mqtt.subscribe(self.hass, 'test-topic/#', self.record_calls)
+        mqtt.subscribe(self.hass, 'test-topic/bier', self.record_calls)
+
+        fire_mqtt_message(self.hass, 'test-topic/bier', 'test-payload')
+        self.hass.block_till_done()
+        self.assertEqual(3, len(self.calls))
+
+        unsub()
+        fire_mqtt_message(self.hass, 'test-topic/bier', 'test-payload')
+        self.hass.block_till_done()
+        self.assertEqual(5, len(self.calls))
+
+    def test_subscriber_error_does_not_stop_others(self):
+        """Test that an error of a subscriber is logged."""
+        @callback
+        def broken(*args):
+            """Raise an error."""
+            raise ValueError()
+
+        mqtt.subscribe(self.hass, 'test-topic', broken)
+        mqtt.subscribe(self.hass, 'test-topic', self.record_calls)
+
+        with mock.patch.object(mqtt, '_LOGGER') as mock_logger:
+            fire_mqtt_message(self.hass, 'test-topic', 'test-payload')
+            self.hass.block_till_done()
+
+        self.assertTrue(mock_logger.exception.called)
+        self.assertEqual(1, len(self.calls))
+
     def test_subscribe_special_characters(self):
         """Test the subscription to topics with special characters."""
         topic = '/test-topic/$(.)[^]{-}'
@@ -412,6 +453,29 @@ class TestMQTTCallbacks(unittest.TestCase):
         self.assertRaises(vol.Invalid, mqtt.valid_subscribe_topic, 'bad\0one')
 
 
+def test_subscription_trie_remove_unused_levels():
+    """Test that removing subscribers removes the levels left unused."""
+    trie = mqtt.SubscriptionTrie()
+    trie.add('home/+/temperature', 'first')
+    trie.add('home/#', 'second')
+    trie.add('home/+/temperature', 'third')
+
+    assert trie.matches('home/kitchen/temperature') == [
+        'second', 'first', 'third']
+    assert trie.matches('home') == ['second']
+    assert trie.matches('home/kitchen/humidity') == ['second']
+
+    trie.remove('home/+/temperature', 'first')
+    trie.remove('home/+/temperature', 'third')
+    trie.remove('home/+/temperature', 'unknown')
+    trie.remove('home/+/unknown', 'second')
+    assert trie.matches('home/kitchen/temperature') == ['second']
+    assert list(trie._root.children['home'].children) == ['#']
+
+    trie.remove('home/#', 'second')
+    assert trie._root.children == {}
+
+
 @asyncio.coroutine
 def test_setup_embedded_starts_with_no_config(hass):
     """Test setting up embedded server with no config."""
@@ -578,3 +642,122 @@ def test_mqtt_subscribes_topics_on_connect(hass):
                 if qos is not None]
 
     assert [call[1][1:] for call in hass.add_job.mock_calls] == expected
+
+
+@asyncio.coroutine
+def mock_event_loop_client(hass, sock):
+    """Mock the MQTT paho client of a client driven by the event loop."""
+    with mock.patch('paho.mqtt.client.Client') as mock_client:
+        mock_client().connect = lambda *args: 0
+        mock_client().socket.return_value = sock
+        mock_client().want_write.return_value = False
+        result = yield from async_setup_component(hass, mqtt.DOMAIN, {
+            mqtt.DOMAIN: {
+                mqtt.CONF_BROKER: 'mock-broker',
+                mqtt.CONF_EVENT_LOOP: True,
+            }
+        })
+        assert result
+        return mock_client()
+
+
+@asyncio.coroutine
+def test_event_loop_reads_socket(hass):
+    """Test that the event loop reads the socket instead of a thread."""
+    sock, remote = socket.socketpair()
+    mqtt_client = yield from mock_event_loop_client(hass, sock)
+
+    assert not mqtt_client.loop_start.called
+
+    mqtt_client.loop_read.side_effect = lambda: sock.recv(1)
+    remote.send(b'x')
+    yield from asyncio.sleep(0.01, loop=hass.loop)
+
+    assert mqtt_client.loop_read.call_count == 1
+
+    yield from hass.data['mqtt'].async_disconnect()
+
+    assert mqtt_client.disconnect.called
+    assert not mqtt_client.loop_stop.called
+    assert hass.data['mqtt']._socket_fd is None
+    sock.close()
+    remote.close()
+
+
+@asyncio.coroutine
+def test_event_loop_writes_socket_only_with_pending_data(hass):
+    """Test that the socket writer is only registered for pending data."""
+    sock, remote = socket.socketpair()
+    mqtt_client = yield from mock_event_loop_client(hass, sock)
+    mqtt_client.want_write.return_value = True
+
+    yield from hass.data['mqtt'].async_publish('test/topic', 'test', 0, False)
+
+    mqtt_client.publish.assert_called_once_with('test/topic', 'test', 0, False)
+    assert hass.data['mqtt']._writing
+
+    mqtt_client.want_write.return_value = False
+    yield from asyncio.sleep(0.01, loop=hass.loop)
+
+    assert mqtt_client.loop_write.call_count == 1
+    assert not hass.data['mqtt']._writing
+
+    yield from hass.data['mqtt'].async_disconnect()
+    sock.close()
+    remote.close()
+
+
+@asyncio.coroutine
+def test_event_loop_routes_messages_in_loop(hass):
+    """Test that received messages are routed without a thread handoff."""
+    sock, remote = socket.socketpair()
+    mqtt_client = yield from mock_event_loop_client(hass, sock)
+    mqtt_client.subscribe.return_value = (0, 1)
+    calls = []
+
+    @callback
+    def record(topic, payload, qos):
+        """Record the message."""
+        calls.append(topic)
+
+    yield from mqtt.async_subscribe(hass, 'test/#', record)
+
+    MQTTMessage = namedtuple('MQTTMessage', ['topic', 'qos', 'payload'])
+
+    with mock.patch('homeassistant.components.mqtt.dispatcher_send') \
+            as mock_send:
+        hass.data['mqtt']._mqtt_on_message(
+            None, None, MQTTMessage('test/topic', 0, b'test'))
+        yield from hass.async_block_till_done()
+
+    assert not mock_send.called
+    assert calls == ['test/topic']
+
+    yield from hass.data['mqtt'].async_disconnect()
+    sock.close()
+    remote.close()
+
+
+@asyncio.coroutine
+def test_event_loop_reconnects_without_blocking(hass):
+    """Test that a lost connection is restored in the background."""
+    sock, remote = socket.socketpair()
+    mqtt_client = yield from mock_event_loop_client(hass, sock)
+    mqtt_client.reconnect.side_effect = [1, 0]
+
+    with mock.patch('homeassistant.components.mqtt.asyncio.sleep',
+                    side_effect=lambda *args, **kwargs: mock_coro()
+                    ) as mock_sleep:
+        hass.data['mqtt']._mqtt_on_disconnect(None, None, 1)
+
+        assert hass.data['mqtt']._socket_fd is None
+
+        yield from hass.async_block_till_done()
+
+    assert mqtt_client.reconnect.call_count == 2
+    assert mock.call(1, loop=hass.loop) in mock_sleep.mock_calls
+    assert hass.data['mqtt']._socket_fd == sock.fileno()
+
+    yield from hass.data['mqtt'].async_disconnect()
+    sock.close()
+    remote.close()
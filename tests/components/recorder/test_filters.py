@@ -0,0 +1,57 @@
+"""The tests for the recorder event filter."""
+# pylint: disable=protected-access
+import homeassistant.core as ha
+from homeassistant.const import EVENT_STATE_CHANGED, EVENT_TIME_CHANGED
+from homeassistant.components.recorder.filters import RecorderFilter
+
+
+def _state_changed(entity_id):
+    """Return a state changed event for an entity."""
+    return ha.Event(EVENT_STATE_CHANGED, {'entity_id': entity_id})
+
+
+def test_drop_time_changed_and_excluded_event_types():
+    """Test that time changed and excluded event types are dropped."""
+    recorder_filter = RecorderFilter({}, {'event_types': ['test']})
+
+    assert not recorder_filter.accept(ha.Event(EVENT_TIME_CHANGED))
+    assert not recorder_filter.accept(ha.Event('test'))
+    assert recorder_filter.accept(ha.Event('test2'))
+    assert recorder_filter.dropped == 2
+    assert recorder_filter.recorded == 1
+
+
+def test_include_globs():
+    """Test including entities by glob."""
+    recorder_filter = RecorderFilter(
+        {'entities': ['light.kitchen'], 'entity_globs': ['sensor.*_temp']},
+        {})
+
+    assert recorder_filter.accept(_state_changed('light.kitchen'))
+    assert recorder_filter.accept(_state_changed('sensor.outside_temp'))
+    assert not recorder_filter.accept(_state_changed('sensor.outside_hum'))
+    assert not recorder_filter.accept(_state_changed('light.bedroom'))
+    assert recorder_filter.recorded == 2
+    assert recorder_filter.dropped == 2
+
+
+def test_exclude_globs():
+    """Test excluding entities by glob, unless included explicitly."""
+    recorder_filter = RecorderFilter(
+        {'entities': ['sensor.outside_temp']},
+        {'domains': ['sensor'], 'entity_globs': ['light.*_strip']})
+
+    assert not recorder_filter.accept(_state_changed('light.led_strip'))
+    assert recorder_filter.accept(_state_changed('light.kitchen'))
+    assert not recorder_filter.accept(_state_changed('sensor.outside_hum'))
+    assert recorder_filter.accept(_state_changed('sensor.outside_temp'))
+
+
+def test_verdict_cached():
+    """Test that the verdict for an entity_id is cached."""
+    recorder_filter = RecorderFilter({}, {'entities': ['light.kitchen']})
+
+    assert not recorder_filter.accept(_state_changed('light.kitchen'))
+    recorder_filter._exclude_e.clear()
+    assert not recorder_filter.accept(_state_changed('light.kitchen'))
+    assert recorder_filter.dropped == 2
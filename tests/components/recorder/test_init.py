@@ -1,5 +1,6 @@
 """The tests for the Recorder component."""
 # pylint: disable=protected-access
+import threading
 import unittest
 from unittest.mock import patch
 
@@ -10,7 +11,8 @@ from homeassistant.const import MATCH_ALL
 from homeassistant.components.recorder import Recorder
 from homeassistant.components.recorder.const import DATA_INSTANCE
 from homeassistant.components.recorder.util import session_scope
-from homeassistant.components.recorder.models import States, Events
+from homeassistant.components.recorder.models import (
+    Events, StateAttributes, States)
 
 from tests.common import get_test_home_assistant, init_recorder_component
 
@@ -127,6 +129,23 @@ def _add_events(hass, events):
 
 
 # pylint: disable=redefined-outer-name,invalid-name
+def test_filter_counters_logged_on_stop(hass_recorder, caplog):
+    """Test that the recorded and filtered events are logged on stop."""
+    hass = hass_recorder({'exclude': {'event_types': ['test']}})
+    _add_events(hass, ['test', 'test2'])
+    instance = hass.data[DATA_INSTANCE]
+    recorded = instance.filter.recorded
+    dropped = instance.filter.dropped
+    assert recorded >= 1
+    assert dropped >= 1
+
+    instance.queue.put(None)
+    instance.join()
+
+    assert 'Recorded {} events, {} events were filtered out'.format(
+        recorded, dropped) in caplog.text
+
+
 def test_saving_state_include_domains(hass_recorder):
     """Test saving and restoring a state."""
     hass = hass_recorder({'include': {'domains': 'test2'}})
@@ -188,6 +207,142 @@ def test_saving_state_include_domain_exclude_entity(hass_recorder):
     assert hass.states.get('test.ok').state == 'state2'
 
 
+def test_saving_states_in_one_transaction(hass_recorder):
+    """Test that events are committed to the database in batches."""
+    from sqlalchemy.orm.session import Session
+
+    hass = hass_recorder()
+
+    with patch('homeassistant.components.recorder.COMMIT_INTERVAL', 100), \
+            patch.object(Session, 'commit', autospec=True,
+                         side_effect=Session.commit) as mock_commit:
+        for idx in range(5):
+            hass.states.set('test.recorder', idx)
+            hass.block_till_done()
+        hass.data[DATA_INSTANCE].block_till_done()
+
+    assert mock_commit.call_count == 1
+
+    with session_scope(hass=hass) as session:
+        db_states = list(session.query(States))
+        assert len(db_states) == 5
+        assert all(state.event_id is not None for state in db_states)
+
+
+def test_saving_states_commit_max_events(hass_recorder):
+    """Test that a batch is committed once it is full."""
+    hass = hass_recorder()
+
+    with patch('homeassistant.components.recorder.COMMIT_MAX_EVENTS', 2), \
+            patch('homeassistant.components.recorder.COMMIT_INTERVAL', 100):
+        for idx in range(4):
+            hass.states.set('test.recorder', idx)
+        hass.block_till_done()
+
+        # Wait for the recorder to commit the batches by itself
+        hass.data[DATA_INSTANCE].queue.join()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 4
+
+
+def test_saving_states_commit_interval_under_load(hass_recorder):
+    """Test that a batch is committed in time while events keep coming."""
+    from sqlalchemy.orm.session import Session
+
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+    resume = threading.Event()
+
+    # Keep the recorder busy until the events are queued
+    with patch.object(instance, '_purge_batch', side_effect=resume.wait), \
+            patch('homeassistant.components.recorder.COMMIT_INTERVAL', 0), \
+            patch.object(Session, 'commit', autospec=True,
+                         side_effect=Session.commit) as mock_commit:
+        instance.queue.put(instance.purge_task)
+
+        for idx in range(4):
+            hass.states.set('test.recorder', idx)
+        hass.block_till_done()
+
+        resume.set()
+        instance.block_till_done()
+
+    assert mock_commit.call_count == 4
+
+
+def test_saving_batch_with_failing_event(hass_recorder):
+    """Test that an event that fails to be added doesn't lose the batch."""
+    hass = hass_recorder()
+    from_event = Events.from_event
+
+    def failing_from_event(event):
+        """Return an event row that cannot be flushed for failing events."""
+        dbevent = from_event(event)
+        if event.event_type == 'test_failing':
+            dbevent.event_data = object()
+        return dbevent
+
+    with patch('homeassistant.components.recorder.COMMIT_INTERVAL', 100), \
+            patch.object(Events, 'from_event', failing_from_event):
+        hass.states.set('test.recorder', 'before')
+        hass.bus.fire('test_failing')
+        hass.states.set('test.recorder', 'after')
+        hass.block_till_done()
+        hass.data[DATA_INSTANCE].block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert [state.state for state in session.query(States).order_by(
+            States.state_id)] == ['before', 'after']
+        assert session.query(Events).filter_by(
+            event_type='test_failing').count() == 0
+
+
+def test_saving_states_rolled_back_together(hass_recorder):
+    """Test that the events of a batch are committed in one transaction."""
+    from sqlalchemy.orm.session import Session
+
+    hass = hass_recorder()
+
+    with patch.object(Session, 'commit', side_effect=Exception):
+        hass.states.set('test.recorder', 'first')
+        hass.states.set('test.recorder', 'second')
+        hass.block_till_done()
+        hass.data[DATA_INSTANCE].block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 0
+
+
+def test_saving_state_shares_attributes(hass_recorder):
+    """Test that equal attributes are stored once."""
+    hass = hass_recorder()
+    attributes = {'friendly_name': 'Temperature', 'unit_of_measurement': 'C'}
+
+    hass.states.set('sensor.temperature', 20, attributes)
+    hass.states.set('sensor.temperature', 21, attributes)
+    hass.states.set('sensor.other', 21, attributes)
+    hass.block_till_done()
+    hass.data[DATA_INSTANCE].block_till_done()
+
+    with session_scope(hass=hass) as session:
+        assert session.query(StateAttributes).count() == 1
+
+        db_states = list(session.query(States).order_by(States.state_id))
+        assert len(db_states) == 3
+        assert db_states[0].attributes is None
+        assert db_states[0].old_state_id is None
+        assert db_states[1].old_state_id == db_states[0].state_id
+        assert db_states[2].old_state_id is None
+        assert db_states[1].to_native() == \
+            hass.states.get('sensor.temperature')
+
+        db_event = session.query(Events).filter_by(
+            event_id=db_states[1].event_id).one()
+        assert db_event.to_native().data == {
+            'entity_id': 'sensor.temperature'}
+
+
 def test_recorder_setup_failure():
     """Test some exceptions."""
     hass = get_test_home_assistant()
@@ -201,3 +356,29 @@ def test_recorder_setup_failure():
         rec.join()
 
     hass.stop()
+
+
+def test_saving_state_after_failed_commit(hass_recorder):
+    """Test that a failed commit keeps the ids of committed old states."""
+    from sqlalchemy.orm.session import Session
+
+    hass = hass_recorder()
+    instance = hass.data[DATA_INSTANCE]
+
+    hass.states.set('sensor.temperature', 20)
+    hass.block_till_done()
+    instance.block_till_done()
+
+    with patch.object(Session, 'commit', side_effect=Exception):
+        hass.states.set('sensor.temperature', 21)
+        hass.block_till_done()
+        instance.block_till_done()
+
+    hass.states.set('sensor.temperature', 22)
+    hass.block_till_done()
+    instance.block_till_done()
+
+    with session_scope(hass=hass) as session:
+        db_states = list(session.query(States).order_by(States.state_id))
+        assert [state.state for state in db_states] == ['20', '22']
+        assert db_states[1].old_state_id == db_states[0].state_id
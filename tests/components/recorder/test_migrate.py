@@ -5,10 +5,12 @@ from unittest.mock import patch, call
 
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 
 from homeassistant.bootstrap import async_setup_component
 from homeassistant.components.recorder import wait_connection_ready, migration
-from homeassistant.components.recorder.models import SCHEMA_VERSION
+from homeassistant.components.recorder.models import (
+    SCHEMA_VERSION, StateAttributes, States)
 from homeassistant.components.recorder.const import DATA_INSTANCE
 from tests.components.recorder import models_original
 
@@ -65,3 +67,55 @@ def test_invalid_update():
     """Test that an invalid new version raises an exception."""
     with pytest.raises(ValueError):
         migration._apply_update(None, -1)
+
+
+def test_migrate_state_attributes():
+    """Test moving the attributes of states to the state_attributes table."""
+    engine = create_engine('sqlite://')
+    models_original.Base.metadata.create_all(engine)
+    StateAttributes.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+
+    for idx, attributes in enumerate(['{"a": 1}', '{"a": 2}', '{"a": 1}']):
+        session.add(models_original.States(
+            entity_id='sensor.test', domain='sensor', state=str(idx),
+            attributes=attributes))
+    session.commit()
+
+    with patch.object(migration, 'MIGRATE_BATCH_SIZE', 2):
+        migration._apply_update(engine, 4)
+
+    assert session.query(StateAttributes).count() == 2
+
+    db_states = list(session.query(States).order_by(States.state_id))
+    assert [state.attributes for state in db_states] == [None] * 3
+    assert db_states[0].attributes_id == db_states[2].attributes_id
+    assert db_states[0].to_native().attributes == {'a': 1}
+    assert db_states[1].to_native().attributes == {'a': 2}
+
+
+def test_migrate_state_attributes_again():
+    """Test that the attributes migration can be run again."""
+    engine = create_engine('sqlite://')
+    models_original.Base.metadata.create_all(engine)
+    StateAttributes.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(models_original.States(
+        entity_id='sensor.test', domain='sensor', state='0',
+        attributes='{"a": 1}'))
+    session.commit()
+
+    migration._apply_update(engine, 4)
+
+    # A state that was recorded before the migration was interrupted
+    engine.execute(States.__table__.insert().values(
+        entity_id='sensor.test', domain='sensor', state='1',
+        attributes='{"a": 1}'))
+
+    migration._apply_update(engine, 4)
+
+    assert session.query(StateAttributes).count() == 1
+
+    db_states = list(session.query(States).order_by(States.state_id))
+    assert [state.attributes for state in db_states] == [None] * 2
+    assert db_states[0].attributes_id == db_states[1].attributes_id
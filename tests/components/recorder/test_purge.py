@@ -1,12 +1,22 @@
 """Test data purging."""
 import json
 from datetime import datetime, timedelta
+import os
+from tempfile import TemporaryDirectory
 import unittest
+from unittest.mock import patch
 
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from homeassistant.core import callback
 from homeassistant.components import recorder
-from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.components.recorder.const import (
+    DATA_INSTANCE, EVENT_RECORDER_PURGED)
+from homeassistant.components.recorder import purge
 from homeassistant.components.recorder.purge import purge_old_data
-from homeassistant.components.recorder.models import States, Events
+from homeassistant.components.recorder.models import (
+    Base, Events, StateAttributes, States)
 from homeassistant.components.recorder.util import session_scope
 from tests.common import get_test_home_assistant, init_recorder_component
 
@@ -107,3 +117,145 @@ class TestRecorderPurge(unittest.TestCase):
 
             # now we should only have 3 events left
             self.assertEqual(events.count(), 3)
+
+    def test_purge_unused_attributes(self):
+        """Test deleting attributes that are no longer used."""
+        now = datetime.now()
+        five_days_ago = now - timedelta(days=5)
+
+        self.hass.block_till_done()
+        self.hass.data[DATA_INSTANCE].block_till_done()
+
+        with recorder.session_scope(hass=self.hass) as session:
+            for idx, timestamp in enumerate((five_days_ago, now)):
+                shared_attrs = json.dumps({'test_attr': idx})
+                attributes = StateAttributes(
+                    hash=StateAttributes.hash_shared_attrs(shared_attrs),
+                    shared_attrs=shared_attrs)
+                session.add(attributes)
+                session.flush()
+                session.add(States(
+                    entity_id='test.recorder2',
+                    domain='sensor',
+                    state='state',
+                    attributes_id=attributes.attributes_id,
+                    last_changed=timestamp,
+                    last_updated=timestamp,
+                    created=timestamp,
+                ))
+
+        with session_scope(hass=self.hass) as session:
+            attributes = session.query(StateAttributes)
+            self.assertEqual(attributes.count(), 2)
+
+            purge_old_data(self.hass.data[DATA_INSTANCE], 4)
+
+            self.assertEqual(attributes.count(), 1)
+            self.assertEqual(attributes.one().shared_attrs, '{"test_attr": 1}')
+
+    def test_purge_in_batches(self):
+        """Test that old data is purged in batches."""
+        self._add_test_states()
+        self._add_test_events()
+
+        with patch.object(purge, 'PURGE_BATCH_SIZE', 2):
+            purge_run = purge.PurgeRun(4)
+            batches = 0
+
+            while not purge.purge_batch(
+                    self.hass.data[DATA_INSTANCE], purge_run):
+                batches += 1
+
+        # 3 states and 2 events in batches of 2, and a final batch
+        self.assertEqual(batches, 3)
+        self.assertEqual(purge_run.batches, 4)
+        self.assertEqual(purge_run.states, 3)
+        self.assertEqual(purge_run.events, 2)
+        self.assertIsNotNone(purge_run.finished)
+
+    def test_purge_task_interleaved(self):
+        """Test that the recorder records events between purge batches."""
+        self._add_test_states()
+        instance = self.hass.data[DATA_INSTANCE]
+        instance.purge_days = 4
+        batches = []
+        original_purge_batch = purge.purge_batch
+
+        def purge_batch(instance, purge_run):
+            """Record a state while the purge runs."""
+            batches.append(purge_run.batches)
+            self.hass.states.set('test.recorder', len(batches))
+            return original_purge_batch(instance, purge_run)
+
+        with patch.object(purge, 'PURGE_BATCH_SIZE', 1), \
+                patch.object(purge, 'purge_batch', side_effect=purge_batch):
+            instance.queue.put(instance.purge_task)
+            self.hass.block_till_done()
+            instance.block_till_done()
+
+        self.assertEqual(batches, [0, 1, 2, 3])
+        self.assertTrue(instance.purge_run.done)
+
+        with session_scope(hass=self.hass) as session:
+            self.assertEqual(session.query(States).filter_by(
+                entity_id='test.recorder').count(), 4)
+
+    def test_purge_fires_metrics(self):
+        """Test that the metrics of a finished purge are fired."""
+        self._add_test_states()
+        instance = self.hass.data[DATA_INSTANCE]
+        instance.purge_days = 4
+        events = []
+
+        @callback
+        def purged(event):
+            """Keep the purged event."""
+            events.append(event)
+
+        self.hass.bus.listen(EVENT_RECORDER_PURGED, purged)
+
+        with patch.object(purge, 'PURGE_BATCH_SIZE', 2):
+            instance.queue.put(instance.purge_task)
+            instance.block_till_done()
+            self.hass.block_till_done()
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].data['states'], 3)
+        self.assertEqual(events[0].data['batches'], 3)
+        self.assertGreater(events[0].data['duration'], 0)
+        self.assertIsNotNone(events[0].data['finished'])
+
+
+def test_purge_incremental_vacuum():
+    """Test that SQLite pages are released with incremental vacuum."""
+    class MockInstance(object):
+        """Recorder with a file database."""
+
+    with TemporaryDirectory() as tmpdir:
+        engine = create_engine(
+            'sqlite:///' + os.path.join(tmpdir, 'test.db'))
+        with engine.connect() as connection:
+            connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            Base.metadata.create_all(connection)
+        instance = MockInstance()
+        instance.engine = engine
+        instance.get_session = scoped_session(sessionmaker(bind=engine))
+
+        five_days_ago = datetime.utcnow() - timedelta(days=5)
+        attributes = json.dumps({'test_attr': 'x' * 1000})
+
+        with session_scope(session=instance.get_session()) as session:
+            for _ in range(100):
+                session.add(States(
+                    entity_id='test.recorder', domain='test', state='on',
+                    attributes=attributes, created=five_days_ago))
+
+        with patch.object(purge, 'VACUUM_BATCH_PAGES', 10):
+            purge_run = purge_old_data(instance, 4)
+
+        assert purge_run.states == 100
+        assert purge_run.vacuumed_pages > 10
+        # Each vacuum batch releases multiple pages
+        assert purge_run.batches < purge_run.vacuumed_pages
+        assert engine.execute('PRAGMA freelist_count').scalar() == 0
+        engine.dispose()
@@ -1,5 +1,6 @@
 """The test for the Template sensor platform."""
 import asyncio
+from unittest.mock import patch
 
 from homeassistant.core import CoreState, State
 from homeassistant.setup import setup_component, async_setup_component
@@ -49,6 +50,37 @@ class TestTemplateSensor:
         state = self.hass.states.get('sensor.test_template_sensor')
         assert state.state == 'It Works.'
 
+    def test_template_tracks_rendered_states(self):
+        """Test the sensor updates for the states its template read."""
+        with assert_setup_component(1):
+            assert setup_component(self.hass, 'sensor', {
+                'sensor': {
+                    'platform': 'template',
+                    'sensors': {
+                        'lights_on': {
+                            'value_template':
+                                "{{ states.light | selectattr('state', "
+                                "'eq', 'on') | list | count }}"
+                        }
+                    }
+                }
+            })
+
+        self.hass.start()
+        self.hass.block_till_done()
+        assert self.hass.states.get('sensor.lights_on').state == '0'
+
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.block_till_done()
+        assert self.hass.states.get('sensor.lights_on').state == '1'
+
+        with patch('homeassistant.components.sensor.template.SensorTemplate.'
+                   'async_update') as mock_update:
+            self.hass.states.set('switch.kitchen', 'on')
+            self.hass.block_till_done()
+
+        assert not mock_update.called
+
     def test_icon_template(self):
         """Test icon template."""
         with assert_setup_component(1):
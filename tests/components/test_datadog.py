@@ -1,4 +1,5 @@
 """The tests for the Datadog component."""
+import datetime
 from unittest import mock
 import unittest
 
@@ -11,9 +12,11 @@ from homeassistant.const import (
 from homeassistant.setup import setup_component
 import homeassistant.components.datadog as datadog
 import homeassistant.core as ha
+from homeassistant.util.async import run_callback_threadsafe
+import homeassistant.util.dt as dt_util
 
-from tests.common import (assert_setup_component, get_test_home_assistant,
-                          MockDependency)
+from tests.common import (assert_setup_component, fire_time_changed,
+                          get_test_home_assistant, MockDependency)
 
 
 class TestDatadog(unittest.TestCase):
@@ -27,6 +30,24 @@ class TestDatadog(unittest.TestCase):
         """Stop everything that was started."""
         self.hass.stop()
 
+    def _setup_component(self, config):
+        """Set up the component and keep the listeners by event type."""
+        with mock.patch.object(self.hass.bus, 'async_listen',
+                               wraps=self.hass.bus.async_listen) as listen:
+            assert setup_component(self.hass, datadog.DOMAIN, config)
+
+        self.listeners = {call[1][0]: call[1][1]
+                          for call in listen.mock_calls}
+
+    def _handle(self, event_type, event):
+        """Pass an event to a listener and send the queued items."""
+        run_callback_threadsafe(
+            self.hass.loop, self.listeners[event_type], event).result()
+        self.hass.block_till_done()
+        fire_time_changed(
+            self.hass, dt_util.utcnow() + datetime.timedelta(seconds=60))
+        self.hass.block_till_done()
+
     def test_invalid_config(self):
         """Test invalid configuration."""
         with assert_setup_component(0):
@@ -39,10 +60,9 @@ class TestDatadog(unittest.TestCase):
     @MockDependency('datadog', 'beer')
     def test_datadog_setup_full(self, mock_datadog):
         """Test setup with all data."""
-        self.hass.bus.listen = mock.MagicMock()
         mock_connection = mock_datadog.initialize
 
-        assert setup_component(self.hass, datadog.DOMAIN, {
+        self._setup_component({
             datadog.DOMAIN: {
                 'host': 'host',
                 'port': 123,
@@ -57,19 +77,15 @@ class TestDatadog(unittest.TestCase):
             mock.call(statsd_host='host', statsd_port=123)
         )
 
-        self.assertTrue(self.hass.bus.listen.called)
-        self.assertEqual(EVENT_LOGBOOK_ENTRY,
-                         self.hass.bus.listen.call_args_list[0][0][0])
-        self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[1][0][0])
+        self.assertIn(EVENT_LOGBOOK_ENTRY, self.listeners)
+        self.assertIn(EVENT_STATE_CHANGED, self.listeners)
 
     @MockDependency('datadog')
     def test_datadog_setup_defaults(self, mock_datadog):
         """Test setup with defaults."""
-        self.hass.bus.listen = mock.MagicMock()
         mock_connection = mock_datadog.initialize
 
-        assert setup_component(self.hass, datadog.DOMAIN, {
+        self._setup_component({
             datadog.DOMAIN: {
                 'host': 'host',
                 'port': datadog.DEFAULT_PORT,
@@ -82,32 +98,30 @@ class TestDatadog(unittest.TestCase):
             mock_connection.call_args,
             mock.call(statsd_host='host', statsd_port=8125)
         )
-        self.assertTrue(self.hass.bus.listen.called)
+        self.assertIn(EVENT_STATE_CHANGED, self.listeners)
 
     @MockDependency('datadog')
     def test_logbook_entry(self, mock_datadog):
         """Test event listener."""
-        self.hass.bus.listen = mock.MagicMock()
         mock_client = mock_datadog.statsd
 
-        assert setup_component(self.hass, datadog.DOMAIN, {
+        self._setup_component({
             datadog.DOMAIN: {
                 'host': 'host',
                 'rate': datadog.DEFAULT_RATE,
             }
         })
 
-        self.assertTrue(self.hass.bus.listen.called)
-        handler_method = self.hass.bus.listen.call_args_list[0][0][1]
-
         event = {
             'domain': 'automation',
             'entity_id': 'sensor.foo.bar',
             'message': 'foo bar biz',
             'name': 'triggered something'
         }
-        handler_method(mock.MagicMock(data=event))
+        self._handle(EVENT_LOGBOOK_ENTRY, mock.MagicMock(data=event))
 
+        self.assertEqual(mock_client.open_buffer.call_count, 1)
+        self.assertEqual(mock_client.close_buffer.call_count, 1)
         self.assertEqual(mock_client.event.call_count, 1)
         self.assertEqual(
             mock_client.event.call_args,
@@ -126,10 +140,9 @@ class TestDatadog(unittest.TestCase):
     @MockDependency('datadog')
     def test_state_changed(self, mock_datadog):
         """Test event listener."""
-        self.hass.bus.listen = mock.MagicMock()
         mock_client = mock_datadog.statsd
 
-        assert setup_component(self.hass, datadog.DOMAIN, {
+        self._setup_component({
             datadog.DOMAIN: {
                 'host': 'host',
                 'prefix': 'ha',
@@ -137,9 +150,6 @@ class TestDatadog(unittest.TestCase):
             }
         })
 
-        self.assertTrue(self.hass.bus.listen.called)
-        handler_method = self.hass.bus.listen.call_args_list[1][0][1]
-
         valid = {
             '1': 1,
             '1.0': 1.0,
@@ -155,15 +165,16 @@ class TestDatadog(unittest.TestCase):
         for in_, out in valid.items():
             state = mock.MagicMock(domain="sensor", entity_id="sensor.foo.bar",
                                    state=in_, attributes=attributes)
-            handler_method(mock.MagicMock(data={'new_state': state}))
+            self._handle(EVENT_STATE_CHANGED,
+                         mock.MagicMock(data={'new_state': state}))
 
             self.assertEqual(mock_client.gauge.call_count, 3)
 
             for attribute, value in attributes.items():
                 mock_client.gauge.assert_has_calls([
                     mock.call(
-                        "ha.sensor.{}".format(attribute),
-                        value,
+                        metric="ha.sensor.{}".format(attribute),
+                        value=value,
                         sample_rate=1,
                         tags=["entity:{}".format(state.entity_id)]
                     )
@@ -171,7 +182,7 @@ class TestDatadog(unittest.TestCase):
 
             self.assertEqual(
                 mock_client.gauge.call_args,
-                mock.call("ha.sensor", out, sample_rate=1, tags=[
+                mock.call(metric="ha.sensor", value=out, sample_rate=1, tags=[
                     "entity:{}".format(state.entity_id)
                 ])
             )
@@ -179,6 +190,6 @@ class TestDatadog(unittest.TestCase):
             mock_client.gauge.reset_mock()
 
         for invalid in ('foo', '', object):
-            handler_method(mock.MagicMock(data={
+            self._handle(EVENT_STATE_CHANGED, mock.MagicMock(data={
                 'new_state': ha.State('domain.test', invalid, {})}))
             self.assertFalse(mock_client.gauge.called)
@@ -1,4 +1,6 @@
 """The tests for the Graphite component."""
+import datetime
+import select
 import socket
 import unittest
 from unittest import mock
@@ -7,10 +9,12 @@ from unittest.mock import patch
 from homeassistant.setup import setup_component
 import homeassistant.core as ha
 import homeassistant.components.graphite as graphite
-from homeassistant.const import (
-    EVENT_STATE_CHANGED, EVENT_HOMEASSISTANT_START, EVENT_HOMEASSISTANT_STOP,
-    STATE_ON, STATE_OFF)
-from tests.common import get_test_home_assistant
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.helpers.exporter import ExportError
+from homeassistant.util.async import run_coroutine_threadsafe
+import homeassistant.util.dt as dt_util
+
+from tests.common import fire_time_changed, get_test_home_assistant
 
 
 class TestGraphite(unittest.TestCase):
@@ -25,6 +29,11 @@ class TestGraphite(unittest.TestCase):
         """Stop everything that was started."""
         self.hass.stop()
 
+    def _convert(self, state):
+        """Return the lines for a state of an entity called entity."""
+        return self.gf.convert(mock.MagicMock(
+            data={'entity_id': 'entity', 'new_state': state}))
+
     @patch('socket.socket')
     def test_setup(self, mock_socket):
         """Test setup."""
@@ -50,7 +59,7 @@ class TestGraphite(unittest.TestCase):
         self.assertTrue(setup_component(self.hass, graphite.DOMAIN, config))
         self.assertEqual(mock_gf.call_count, 1)
         self.assertEqual(
-            mock_gf.call_args, mock.call(self.hass, 'foo', 123, 'me')
+            mock_gf.call_args[0][:4], (self.hass, 'foo', 123, 'me')
         )
         self.assertEqual(mock_socket.call_count, 1)
         self.assertEqual(
@@ -77,42 +86,24 @@ class TestGraphite(unittest.TestCase):
             mock.call(socket.AF_INET, socket.SOCK_STREAM)
         )
 
-    def test_subscribe(self):
-        """Test the subscription."""
-        fake_hass = mock.MagicMock()
-        gf = graphite.GraphiteFeeder(fake_hass, 'foo', 123, 'ha')
-        fake_hass.bus.listen_once.has_calls([
-            mock.call(EVENT_HOMEASSISTANT_START, gf.start_listen),
-            mock.call(EVENT_HOMEASSISTANT_STOP, gf.shutdown),
-        ])
-        self.assertEqual(fake_hass.bus.listen.call_count, 1)
-        self.assertEqual(
-            fake_hass.bus.listen.call_args,
-            mock.call(EVENT_STATE_CHANGED, gf.event_listener)
-        )
+    @patch('socket.socket')
+    @patch('time.time')
+    def test_state_changed(self, mock_time, mock_socket):
+        """Test that state changes are sent in one batch."""
+        mock_time.return_value = 12345
+        assert setup_component(self.hass, graphite.DOMAIN, {'graphite': {}})
+        self.hass.states.set('light.kitchen', STATE_ON)
+        self.hass.states.set('sensor.temperature', '20.5')
+        self.hass.block_till_done()
+        fire_time_changed(
+            self.hass, dt_util.utcnow() + datetime.timedelta(seconds=60))
+        self.hass.block_till_done()
 
-    def test_start(self):
-        """Test the start."""
-        with mock.patch.object(self.gf, 'start') as mock_start:
-            self.gf.start_listen('event')
-            self.assertEqual(mock_start.call_count, 1)
-            self.assertEqual(mock_start.call_args, mock.call())
-
-    def test_shutdown(self):
-        """Test the shutdown."""
-        with mock.patch.object(self.gf, '_queue') as mock_queue:
-            self.gf.shutdown('event')
-            self.assertEqual(mock_queue.put.call_count, 1)
-            self.assertEqual(
-                mock_queue.put.call_args, mock.call(self.gf._quit_object)
-            )
-
-    def test_event_listener(self):
-        """Test the event listener."""
-        with mock.patch.object(self.gf, '_queue') as mock_queue:
-            self.gf.event_listener('foo')
-            self.assertEqual(mock_queue.put.call_count, 1)
-            self.assertEqual(mock_queue.put.call_args, mock.call('foo'))
+        sock = mock_socket.return_value
+        self.assertEqual(sock.sendall.call_count, 1)
+        self.assertEqual(sock.sendall.call_args, mock.call(
+            b'ha.light.kitchen.state 1.000000 12345\n'
+            b'ha.sensor.temperature.state 20.500000 12345\n'))
 
     @patch('time.time')
     def test_report_attributes(self, mock_time):
@@ -132,10 +123,8 @@ class TestGraphite(unittest.TestCase):
             ]
 
         state = mock.MagicMock(state=0, attributes=attrs)
-        with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
-            actual = mock_send.call_args_list[0][0][0].split('\n')
-            self.assertEqual(sorted(expected), sorted(actual))
+        actual = self._convert(state).split('\n')
+        self.assertEqual(sorted(expected), sorted(actual))
 
     @patch('time.time')
     def test_report_with_string_state(self, mock_time):
@@ -147,46 +136,36 @@ class TestGraphite(unittest.TestCase):
             ]
 
         state = mock.MagicMock(state='above_horizon', attributes={'foo': 1.0})
-        with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
-            actual = mock_send.call_args_list[0][0][0].split('\n')
-            self.assertEqual(sorted(expected), sorted(actual))
+        actual = self._convert(state).split('\n')
+        self.assertEqual(sorted(expected), sorted(actual))
 
     @patch('time.time')
     def test_report_with_binary_state(self, mock_time):
         """Test the reporting with binary state."""
         mock_time.return_value = 12345
         state = ha.State('domain.entity', STATE_ON, {'foo': 1.0})
-        with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
-            expected = ['ha.entity.foo 1.000000 12345',
-                        'ha.entity.state 1.000000 12345']
-            actual = mock_send.call_args_list[0][0][0].split('\n')
-            self.assertEqual(sorted(expected), sorted(actual))
-
-        state.state = STATE_OFF
-        with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            self.gf._report_attributes('entity', state)
-            expected = ['ha.entity.foo 1.000000 12345',
-                        'ha.entity.state 0.000000 12345']
-            actual = mock_send.call_args_list[0][0][0].split('\n')
-            self.assertEqual(sorted(expected), sorted(actual))
-
-    @patch('time.time')
-    def test_send_to_graphite_errors(self, mock_time):
-        """Test the sending with errors."""
-        mock_time.return_value = 12345
-        state = ha.State('domain.entity', STATE_ON, {'foo': 1.0})
-        with mock.patch.object(self.gf, '_send_to_graphite') as mock_send:
-            mock_send.side_effect = socket.error
-            self.gf._report_attributes('entity', state)
-            mock_send.side_effect = socket.gaierror
-            self.gf._report_attributes('entity', state)
-
+        expected = ['ha.entity.foo 1.000000 12345',
+                    'ha.entity.state 1.000000 12345']
+        actual = self._convert(state).split('\n')
+        self.assertEqual(sorted(expected), sorted(actual))
+
+        state = ha.State('domain.entity', STATE_OFF, {'foo': 1.0})
+        expected = ['ha.entity.foo 1.000000 12345',
+                    'ha.entity.state 0.000000 12345']
+        actual = self._convert(state).split('\n')
+        self.assertEqual(sorted(expected), sorted(actual))
+
+    def test_report_without_numbers(self):
+        """Test that states without numbers are not sent."""
+        state = ha.State('domain.entity', 'foo', {'bar': 'baz'})
+        self.assertIsNone(self._convert(state))
+
+    @patch('select.select', return_value=([], [], []))
     @patch('socket.socket')
-    def test_send_to_graphite(self, mock_socket):
-        """Test the sending of data."""
-        self.gf._send_to_graphite('foo')
+    def test_send_keeps_connection(self, mock_socket, mock_select):
+        """Test that the connection is kept open between batches."""
+        self.gf.send(['foo'])
+        self.gf.send(['bar', 'baz'])
         self.assertEqual(mock_socket.call_count, 1)
         self.assertEqual(
             mock_socket.call_args,
@@ -195,51 +174,50 @@ class TestGraphite(unittest.TestCase):
         sock = mock_socket.return_value
         self.assertEqual(sock.connect.call_count, 1)
         self.assertEqual(sock.connect.call_args, mock.call(('foo', 123)))
-        self.assertEqual(sock.sendall.call_count, 1)
-        self.assertEqual(
-            sock.sendall.call_args, mock.call('foo'.encode('ascii'))
-        )
-        self.assertEqual(sock.send.call_count, 1)
-        self.assertEqual(sock.send.call_args, mock.call('\n'.encode('ascii')))
+        self.assertEqual(sock.sendall.call_args_list, [
+            mock.call(b'foo\n'), mock.call(b'bar\nbaz\n')])
+
+        run_coroutine_threadsafe(
+            self.gf.async_close(), self.hass.loop).result()
         self.assertEqual(sock.close.call_count, 1)
-        self.assertEqual(sock.close.call_args, mock.call())
-
-    def test_run_stops(self):
-        """Test the stops."""
-        with mock.patch.object(self.gf, '_queue') as mock_queue:
-            mock_queue.get.return_value = self.gf._quit_object
-            self.assertEqual(None, self.gf.run())
-            self.assertEqual(mock_queue.get.call_count, 1)
-            self.assertEqual(mock_queue.get.call_args, mock.call())
-            self.assertEqual(mock_queue.task_done.call_count, 1)
-            self.assertEqual(mock_queue.task_done.call_args, mock.call())
-
-    def test_run(self):
-        """Test the running."""
-        runs = []
-        event = mock.MagicMock(event_type=EVENT_STATE_CHANGED,
-                               data={'entity_id': 'entity',
-                                     'new_state': mock.MagicMock()})
-
-        def fake_get():
-            if len(runs) >= 2:
-                return self.gf._quit_object
-            elif runs:
-                runs.append(1)
-                return mock.MagicMock(event_type='somethingelse',
-                                      data={'new_event': None})
-            else:
-                runs.append(1)
-                return event
-
-        with mock.patch.object(self.gf, '_queue') as mock_queue:
-            with mock.patch.object(self.gf, '_report_attributes') as mock_r:
-                mock_queue.get.side_effect = fake_get
-                self.gf.run()
-                # Twice for two events, once for the stop
-                self.assertEqual(3, mock_queue.task_done.call_count)
-                self.assertEqual(mock_r.call_count, 1)
-                self.assertEqual(
-                    mock_r.call_args,
-                    mock.call('entity', event.data['new_state'])
-                )
+
+    @patch('socket.socket')
+    def test_send_errors(self, mock_socket):
+        """Test that the connection is closed and opened again on errors."""
+        sock = mock_socket.return_value
+        sock.sendall.side_effect = socket.error
+
+        with self.assertRaises(ExportError):
+            self.gf.send(['foo'])
+
+        self.assertEqual(sock.close.call_count, 1)
+
+        sock.sendall.side_effect = None
+        self.gf.send(['foo'])
+        self.assertEqual(mock_socket.call_count, 2)
+
+    def test_send_reconnects_when_closed(self):
+        """Test that a connection closed by Graphite is opened again."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(2)
+        server.settimeout(10)
+        self.gf = graphite.GraphiteFeeder(
+            self.hass, '127.0.0.1', server.getsockname()[1], 'ha')
+
+        try:
+            self.gf.send(['foo'])
+            conn, _ = server.accept()
+            self.assertEqual(conn.recv(100), b'foo\n')
+            # Graphite closes connections that are idle
+            conn.close()
+            select.select([self.gf._sock], [], [], 10)
+
+            self.gf.send(['bar'])
+            conn, _ = server.accept()
+            conn.settimeout(10)
+            self.assertEqual(conn.recv(100), b'bar\n')
+            conn.close()
+        finally:
+            self.gf._close_socket()
+            server.close()
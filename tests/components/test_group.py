@@ -10,6 +10,7 @@ from homeassistant.const import (
     STATE_ON, STATE_OFF, STATE_HOME, STATE_UNKNOWN, ATTR_ICON, ATTR_HIDDEN,
     ATTR_ASSUMED_STATE, STATE_NOT_HOME)
 import homeassistant.components.group as group
+from homeassistant.helpers.event import DATA_STATE_CHANGE_LISTENERS
 
 from tests.common import get_test_home_assistant, assert_setup_component
 
@@ -337,7 +338,7 @@ class TestComponentsGroup(unittest.TestCase):
 
         assert sorted(self.hass.states.entity_ids()) == \
             ['group.empty_group', 'group.second_group', 'group.test_group']
-        assert self.hass.bus.listeners['state_changed'] == 3
+        assert self.hass.data[DATA_STATE_CHANGE_LISTENERS].count == 3
 
         with patch('homeassistant.config.load_yaml_config_file', return_value={
                 'group': {
@@ -350,7 +351,7 @@ class TestComponentsGroup(unittest.TestCase):
             self.hass.block_till_done()
 
         assert self.hass.states.entity_ids() == ['group.hello']
-        assert self.hass.bus.listeners['state_changed'] == 1
+        assert self.hass.data[DATA_STATE_CHANGE_LISTENERS].count == 1
 
     def test_stopping_a_group(self):
         """Test that a group correctly removes itself."""
@@ -1,13 +1,17 @@
 """The tests the History component."""
 # pylint: disable=protected-access,invalid-name
+import asyncio
 from datetime import timedelta
+import json
 import unittest
 from unittest.mock import patch, sentinel
 
-from homeassistant.setup import setup_component
+from homeassistant.setup import async_setup_component, setup_component
 import homeassistant.core as ha
 import homeassistant.util.dt as dt_util
 from homeassistant.components import history, recorder
+from homeassistant.remote import JSONEncoder
+from homeassistant.util.async import run_callback_threadsafe
 
 from tests.common import (
     init_recorder_component, mock_http_component, mock_state_change_event,
@@ -145,6 +149,59 @@ class TestComponentHistory(unittest.TestCase):
             self.hass, zero, four, filters=history.Filters())
         assert states == hist
 
+    def test_stream_significant_states(self):
+        """Test that streamed states are equal to the significant states."""
+        zero, four, _ = self.record_states()
+        self.hass.states.set('light.kitchen', 'on', {'brightness': 144})
+        self.wait_recording_done()
+
+        # Start after the states were recorded, with states at start time
+        for start in (zero, dt_util.utcnow()):
+            hist = history.get_significant_states(
+                self.hass, start, four, filters=history.Filters())
+
+            with patch.object(history, 'STREAM_BATCH_SIZE', 2):
+                streamed = json.loads(''.join(
+                    history.stream_significant_states(
+                        self.hass, start, four, filters=history.Filters())))
+
+            assert sorted(json.loads(json.dumps(
+                list(hist.values()), cls=JSONEncoder)),
+                          key=lambda states: states[0]['entity_id']) == \
+                sorted(streamed, key=lambda states: states[0]['entity_id'])
+
+    def test_stream_significant_states_collation(self):
+        """Test streaming rows sorted differently than Python sorts ids."""
+        from homeassistant.components.recorder.models import States
+
+        zero, four, _ = self.record_states()
+        start = zero + timedelta(seconds=1.5)
+        hist = history.get_significant_states(
+            self.hass, start, four, filters=history.Filters())
+        filter_significant_states = history._filter_significant_states
+
+        def filter_descending(*args):
+            """Sort the rows on descending entity ids first."""
+            return filter_significant_states(*args).order_by(
+                States.entity_id.desc())
+
+        with patch.object(history, '_filter_significant_states',
+                          filter_descending):
+            streamed = json.loads(''.join(history.stream_significant_states(
+                self.hass, start, four, filters=history.Filters())))
+
+        assert len(streamed) == len(hist)
+        assert {states[0]['entity_id']: states for states in streamed} == \
+            json.loads(json.dumps(hist, cls=JSONEncoder))
+
+    def test_stream_significant_states_empty(self):
+        """Test streaming a period without states."""
+        self.init_recorder()
+        start = dt_util.utcnow() - timedelta(days=1)
+
+        assert ''.join(history.stream_significant_states(
+            self.hass, start, start + timedelta(hours=1))) == '[]'
+
     def test_get_significant_states_entity_id(self):
         """Test that only significant states are returned for one entity."""
         zero, four, states = self.record_states()
@@ -360,6 +417,91 @@ class TestComponentHistory(unittest.TestCase):
             self.hass, zero, four, filters=filters)
         assert states == hist
 
+    def start_recent_history(self, max_states=10):
+        """Start keeping the recent history."""
+        recent = history.RecentHistory(
+            self.hass, timedelta(days=1), max_states,
+            self.hass.data[recorder.DATA_INSTANCE].filter)
+        run_callback_threadsafe(self.hass.loop, recent.async_start).result()
+        return recent
+
+    def recent_significant_states(self, recent, *args):
+        """Return the recent significant states as a dict."""
+        result = run_callback_threadsafe(
+            self.hass.loop, recent.async_significant_states, *args).result()
+
+        if result is None:
+            return None
+
+        return {states[0].entity_id: states for states in result}
+
+    def test_recent_history(self):
+        """Test that recent states are equal to the significant states."""
+        self.init_recorder()
+        self.hass.states.set('light.kitchen', 'on', {'brightness': 144})
+        self.hass.states.set('zone.home', 'zoning')
+        self.wait_recording_done()
+        recent = self.start_recent_history()
+
+        self.hass.states.set('light.kitchen', 'off')
+        self.hass.states.set('script.cannot_cancel', 'off')
+        self.hass.states.set('sensor.temperature', 21)
+        self.wait_recording_done()
+        middle = dt_util.utcnow()
+        self.hass.states.set('sensor.temperature', 21, {'unit': 'C'})
+        self.hass.states.set('light.kitchen', 'on', {'hidden': True})
+        self.hass.states.set('light.bedroom', 'on')
+        self.hass.states.remove('sensor.temperature')
+        self.wait_recording_done()
+        end = dt_util.utcnow() + timedelta(seconds=1)
+
+        for start, entity_id, filters in (
+                (recent.since, None, history.Filters()),
+                (middle, None, history.Filters()),
+                (middle, 'light.kitchen', history.Filters()),
+                (recent.since, 'sensor.temperature', history.Filters()),
+                (end, None, history.Filters())):
+            assert self.recent_significant_states(
+                recent, start, end, entity_id, filters) == \
+                history.get_significant_states(
+                    self.hass, start, end, entity_id, filters)
+
+        filters = history.Filters()
+        filters.excluded_domains = ['light']
+        filters.included_entities = ['light.bedroom', 'sensor.temperature']
+        assert self.recent_significant_states(
+            recent, middle, end, None, filters) == \
+            history.get_significant_states(
+                self.hass, middle, end, None, filters)
+        assert recent.hits == 6
+        assert recent.misses == 0
+
+    def test_recent_history_not_covered(self):
+        """Test that older periods are not served from recent history."""
+        self.init_recorder()
+        recent = self.start_recent_history(max_states=2)
+        filters = history.Filters()
+
+        assert self.recent_significant_states(
+            recent, recent.since - timedelta(seconds=1), None, None,
+            filters) is None
+
+        for state in range(4):
+            self.hass.states.set('sensor.temperature', state)
+        self.hass.block_till_done()
+        middle = dt_util.utcnow()
+        self.hass.states.set('sensor.temperature', 4)
+        self.hass.block_till_done()
+
+        # The oldest states were evicted for exceeding the maximum
+        assert self.recent_significant_states(
+            recent, recent.since, None, None, filters) is None
+        assert [state.state for state in self.recent_significant_states(
+            recent, middle, None, None, filters)['sensor.temperature']] == \
+            ['3', '4']
+        assert recent.misses == 2
+        assert recent.hits == 1
+
     def record_states(self):
         """Record some test states.
 
@@ -429,3 +571,78 @@ class TestComponentHistory(unittest.TestCase):
             set_state(therm, 22, attributes={'current_temperature': 21,
                                              'hidden': True})
         return zero, four, states
+
+
+@asyncio.coroutine
+def test_fetch_period_api(hass, test_client):
+    """Test the streamed history period response."""
+    yield from hass.async_add_job(init_recorder_component, hass)
+    yield from async_setup_component(hass, 'history', {
+        'history': {'cache_window': 0}})
+    assert history.DATA_RECENT_HISTORY not in hass.data
+
+    start = dt_util.utcnow()
+    hass.states.async_set('light.kitchen', 'on', {'brightness': 144})
+    hass.states.async_set('light.kitchen', 'off')
+    hass.states.async_set('sensor.temperature', 21)
+    yield from hass.async_block_till_done()
+    yield from hass.async_add_job(
+        hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = yield from test_client(hass.http.app)
+    response = yield from client.get(
+        '/api/history/period/{}'.format(start.isoformat()))
+    assert response.status == 200
+
+    result = yield from response.json()
+    assert [[state['state'] for state in states] for states in result] == \
+        [['on', 'off'], ['21']]
+    assert result[0][0]['attributes'] == {'brightness': 144}
+
+
+@asyncio.coroutine
+def test_fetch_period_api_recent_history(hass, test_client):
+    """Test the history period response from the recent history."""
+    yield from hass.async_add_job(init_recorder_component, hass)
+    hass.states.async_set('sensor.temperature', 20)
+    yield from async_setup_component(hass, 'history', {'history': {}})
+    recent = hass.data[history.DATA_RECENT_HISTORY]
+
+    hass.states.async_set('light.kitchen', 'on', {'brightness': 144})
+    hass.states.async_set('light.kitchen', 'off')
+    hass.states.async_set('sensor.temperature', 21)
+    yield from hass.async_block_till_done()
+
+    client = yield from test_client(hass.http.app)
+    response = yield from client.get(
+        '/api/history/period/{}'.format(recent.since.isoformat()))
+    assert response.status == 200
+    assert recent.hits == 1
+
+    result = yield from response.json()
+    assert [[state['state'] for state in states] for states in result] == \
+        [['on', 'off'], ['20', '21']]
+
+
+@asyncio.coroutine
+def test_fetch_period_api_recent_history_default_period(hass, test_client):
+    """Test the default period is served from the recent history."""
+    yield from hass.async_add_job(init_recorder_component, hass)
+    yield from async_setup_component(hass, 'history', {'history': {}})
+    recent = hass.data[history.DATA_RECENT_HISTORY]
+    # Pretend the recent history has been kept for longer than the window
+    recent.since -= timedelta(days=2)
+
+    hass.states.async_set('sensor.temperature', 20)
+    hass.states.async_set('sensor.temperature', 21)
+    yield from hass.async_block_till_done()
+
+    client = yield from test_client(hass.http.app)
+    response = yield from client.get('/api/history/period')
+    assert response.status == 200
+    assert recent.hits == 1
+    assert recent.misses == 0
+
+    result = yield from response.json()
+    assert [[state['state'] for state in states] for states in result] == \
+        [['20', '21']]
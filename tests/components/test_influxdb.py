@@ -8,8 +8,10 @@ import influxdb as influx_client
 from homeassistant.setup import setup_component
 import homeassistant.components.influxdb as influxdb
 from homeassistant.const import EVENT_STATE_CHANGED, STATE_OFF, STATE_ON
+from homeassistant.util.async import run_callback_threadsafe
+import homeassistant.util.dt as dt_util
 
-from tests.common import get_test_home_assistant
+from tests.common import fire_time_changed, get_test_home_assistant
 
 
 @mock.patch('influxdb.InfluxDBClient')
@@ -20,7 +22,6 @@ class TestInfluxDB(unittest.TestCase):
         """Setup things to be run when tests are started."""
         self.hass = get_test_home_assistant()
         self.handler_method = None
-        self.hass.bus.listen = mock.Mock()
 
     def tearDown(self):
         """Clear data."""
@@ -39,10 +40,8 @@ class TestInfluxDB(unittest.TestCase):
                 'verify_ssl': 'False',
             }
         }
-        assert setup_component(self.hass, influxdb.DOMAIN, config)
-        self.assertTrue(self.hass.bus.listen.called)
-        self.assertEqual(
-            EVENT_STATE_CHANGED, self.hass.bus.listen.call_args_list[0][0][0])
+        self._setup_component(config)
+        self.assertIsNotNone(self.handler_method)
         self.assertTrue(mock_client.return_value.query.called)
 
     def test_setup_config_defaults(self, mock_client):
@@ -54,10 +53,8 @@ class TestInfluxDB(unittest.TestCase):
                 'password': 'pass',
             }
         }
-        assert setup_component(self.hass, influxdb.DOMAIN, config)
-        self.assertTrue(self.hass.bus.listen.called)
-        self.assertEqual(
-            EVENT_STATE_CHANGED, self.hass.bus.listen.call_args_list[0][0][0])
+        self._setup_component(config)
+        self.assertIsNotNone(self.handler_method)
 
     def test_setup_minimal_config(self, mock_client):
         """Test the setup with minimal configuration."""
@@ -90,6 +87,24 @@ class TestInfluxDB(unittest.TestCase):
             influx_client.exceptions.InfluxDBClientError('fake')
         assert not setup_component(self.hass, influxdb.DOMAIN, config)
 
+    def _setup_component(self, config):
+        """Set up the component and keep the state changed listener."""
+        with mock.patch.object(self.hass.bus, 'async_listen',
+                               wraps=self.hass.bus.async_listen) as listen:
+            assert setup_component(self.hass, influxdb.DOMAIN, config)
+
+        listener = next(call[1][1] for call in listen.mock_calls
+                        if call[1][0] == EVENT_STATE_CHANGED)
+        self.handler_method = lambda event: run_callback_threadsafe(
+            self.hass.loop, listener, event).result()
+
+    def _flush(self):
+        """Write the queued points."""
+        self.hass.block_till_done()
+        fire_time_changed(
+            self.hass, dt_util.utcnow() + datetime.timedelta(seconds=60))
+        self.hass.block_till_done()
+
     def _setup(self):
         """Setup the client."""
         config = {
@@ -103,8 +118,7 @@ class TestInfluxDB(unittest.TestCase):
                 }
             }
         }
-        assert setup_component(self.hass, influxdb.DOMAIN, config)
-        self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self._setup_component(config)
 
     def test_event_listener(self, mock_client):
         """Test the event listener."""
@@ -179,6 +193,7 @@ class TestInfluxDB(unittest.TestCase):
                     },
                 }]
             self.handler_method(event)
+            self._flush()
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -213,6 +228,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self._flush()
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -233,6 +249,11 @@ class TestInfluxDB(unittest.TestCase):
         mock_client.return_value.write_points.side_effect = \
             influx_client.exceptions.InfluxDBClientError('foo')
         self.handler_method(event)
+        self._flush()
+
+        self.assertEqual(
+            mock_client.return_value.write_points.call_count, 1)
+        self.assertEqual(0, self.hass.data[influxdb.DOMAIN].sent)
 
     def test_event_listener_states(self, mock_client):
         """Test the event listener against ignored states."""
@@ -255,6 +276,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self._flush()
             if state_state == 1:
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -288,6 +310,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self._flush()
             if entity_id == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -322,6 +345,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self._flush()
             if domain == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -346,8 +370,7 @@ class TestInfluxDB(unittest.TestCase):
                 }
             }
         }
-        assert setup_component(self.hass, influxdb.DOMAIN, config)
-        self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self._setup_component(config)
 
         for entity_id in ('included', 'default'):
             state = mock.MagicMock(
@@ -366,6 +389,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self._flush()
             if entity_id == 'included':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -390,8 +414,7 @@ class TestInfluxDB(unittest.TestCase):
                 }
             }
         }
-        assert setup_component(self.hass, influxdb.DOMAIN, config)
-        self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self._setup_component(config)
 
         for domain in ('fake', 'another_fake'):
             state = mock.MagicMock(
@@ -411,6 +434,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self._flush()
             if domain == 'fake':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -423,6 +447,33 @@ class TestInfluxDB(unittest.TestCase):
                 self.assertFalse(mock_client.return_value.write_points.called)
             mock_client.return_value.write_points.reset_mock()
 
+    def test_event_listener_whitelist_entity_and_domain(self, mock_client):
+        """Test that included entities must also be in an included domain."""
+        config = {
+            'influxdb': {
+                'host': 'host',
+                'username': 'user',
+                'password': 'pass',
+                'include': {
+                    'entities': ['fake.included', 'other.included'],
+                    'domains': ['fake'],
+                }
+            }
+        }
+        self._setup_component(config)
+
+        for entity_id in ('fake.included', 'other.included', 'fake.other'):
+            domain, object_id = entity_id.split('.')
+            state = mock.MagicMock(
+                state=1, domain=domain, entity_id=entity_id,
+                object_id=object_id, attributes={})
+            self.handler_method(mock.MagicMock(
+                data={'new_state': state}, time_fired=12345))
+        self._flush()
+
+        self.assertEqual(
+            [['included']], self._written_entities(mock_client))
+
     def test_event_listener_invalid_type(self, mock_client):
         """Test the event listener when an attirbute has an invalid type."""
         self._setup()
@@ -476,6 +527,7 @@ class TestInfluxDB(unittest.TestCase):
                     },
                 }]
             self.handler_method(event)
+            self._flush()
             self.assertEqual(
                 mock_client.return_value.write_points.call_count, 1
             )
@@ -498,8 +550,7 @@ class TestInfluxDB(unittest.TestCase):
                 }
             }
         }
-        assert setup_component(self.hass, influxdb.DOMAIN, config)
-        self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self._setup_component(config)
 
         for entity_id in ('ok', 'blacklisted'):
             state = mock.MagicMock(
@@ -518,6 +569,7 @@ class TestInfluxDB(unittest.TestCase):
                 },
             }]
             self.handler_method(event)
+            self._flush()
             if entity_id == 'ok':
                 self.assertEqual(
                     mock_client.return_value.write_points.call_count, 1
@@ -529,3 +581,37 @@ class TestInfluxDB(unittest.TestCase):
             else:
                 self.assertFalse(mock_client.return_value.write_points.called)
             mock_client.return_value.write_points.reset_mock()
+
+    def _state_changed_events(self, count):
+        """Return state changed events for count entities."""
+        events = []
+
+        for index in range(count):
+            state = mock.MagicMock(
+                state=index, domain='fake',
+                entity_id='fake.entity_{}'.format(index),
+                object_id='entity_{}'.format(index), attributes={})
+            events.append(mock.MagicMock(
+                data={'new_state': state}, time_fired=12345))
+
+        return events
+
+    def _written_entities(self, mock_client):
+        """Return the object ids of the written points per batch."""
+        return [[point['tags']['entity_id'] for point in call[1][0]]
+                for call in mock_client.return_value.write_points.mock_calls]
+
+    def test_event_listener_retries_failed_write(self, mock_client):
+        """Test that a batch is written again after a server error."""
+        self._setup()
+        writer = self.hass.data[influxdb.DOMAIN]
+        mock_client.return_value.write_points.side_effect = [
+            influx_client.exceptions.InfluxDBServerError('fake'), None]
+
+        self.handler_method(self._state_changed_events(1)[0])
+        self._flush()
+        self._flush()
+
+        self.assertEqual(
+            [['entity_0'], ['entity_0']], self._written_entities(mock_client))
+        self.assertEqual(1, writer.sent)
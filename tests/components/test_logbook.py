@@ -1,5 +1,6 @@
 """The tests for the logbook component."""
 # pylint: disable=protected-access,invalid-name
+import asyncio
 import logging
 from datetime import timedelta
 import unittest
@@ -12,7 +13,7 @@ from homeassistant.const import (
     ATTR_HIDDEN, STATE_NOT_HOME, STATE_ON, STATE_OFF)
 import homeassistant.util.dt as dt_util
 from homeassistant.components import logbook
-from homeassistant.setup import setup_component
+from homeassistant.setup import async_setup_component, setup_component
 
 from tests.common import (
     mock_http_component, init_recorder_component, get_test_home_assistant)
@@ -170,6 +171,116 @@ class TestComponentLogbook(unittest.TestCase):
         self.assert_entry(
             entries[1], pointB, 'blu', domain='sensor', entity_id=entity_id2)
 
+    def test_get_events_from_recorder(self):
+        """Test reading state changed events back from the recorder."""
+        from homeassistant.components.recorder.const import DATA_INSTANCE
+
+        start = dt_util.utcnow() - timedelta(minutes=1)
+        self.hass.states.set('switch.test', STATE_OFF)
+        self.hass.states.set('switch.test', STATE_ON, {'extra': 1})
+        self.hass.states.remove('switch.test')
+        self.hass.block_till_done()
+        self.hass.data[DATA_INSTANCE].block_till_done()
+
+        # The new and removed entity are excluded in SQL
+        events = [
+            event for event in logbook._get_events(
+                self.hass, {}, start,
+                dt_util.utcnow() + timedelta(minutes=1))
+            if event.event_type == EVENT_STATE_CHANGED]
+
+        self.assertEqual(1, len(events))
+        self.assertEqual(STATE_OFF, events[0].data['old_state']['state'])
+        self.assertEqual(STATE_ON, events[0].data['new_state']['state'])
+        self.assertEqual({'extra': 1},
+                         events[0].data['new_state']['attributes'])
+
+        entries = list(logbook.humanify(
+            logbook._exclude_events(events, self.EMPTY_CONFIG)))
+
+        self.assertEqual(1, len(entries))
+        self.assert_entry(entries[0], name='test', domain='switch',
+                          entity_id='switch.test')
+
+    def test_get_events_filtered_in_sql(self):
+        """Test that events never shown are not read from the recorder."""
+        from homeassistant.components.recorder.const import DATA_INSTANCE
+
+        start = dt_util.utcnow()
+        for entity_id in ('sensor.temperature', 'sensor.door',
+                          'light.kitchen', 'switch.test', 'light.bedroom'):
+            self.hass.states.set(entity_id, 1)
+        self.hass.states.set(
+            'sensor.temperature', 21, {'unit_of_measurement': '°C'})
+        self.hass.states.set('sensor.door', 'open')
+        self.hass.states.set('light.kitchen', STATE_ON)
+        self.hass.states.set('light.kitchen', STATE_ON, {'brightness': 144})
+        self.hass.states.set('switch.test', STATE_ON)
+        self.hass.states.set('light.bedroom', STATE_ON)
+        logbook.log_entry(self.hass, 'Alarm', 'went off',
+                          entity_id='switch.test')
+        self.hass.block_till_done()
+        self.hass.data[DATA_INSTANCE].block_till_done()
+        end = dt_util.utcnow() + timedelta(minutes=1)
+        config = logbook.CONFIG_SCHEMA({logbook.DOMAIN: {
+            logbook.CONF_EXCLUDE: {
+                logbook.CONF_DOMAINS: ['light'],
+                logbook.CONF_ENTITIES: ['switch.test']},
+            logbook.CONF_INCLUDE: {
+                logbook.CONF_ENTITIES: ['light.bedroom']}}})[logbook.DOMAIN]
+
+        events = logbook._get_events(self.hass, config, start, end)
+
+        self.assertEqual(
+            [(EVENT_STATE_CHANGED, 'sensor.door'),
+             (EVENT_STATE_CHANGED, 'light.bedroom'),
+             (logbook.EVENT_LOGBOOK_ENTRY, 'switch.test')],
+            [(event.event_type, event.data.get('entity_id'))
+             for event in events])
+
+        events = logbook._get_events(
+            self.hass, {}, start, end, 'switch.test')
+
+        self.assertEqual(
+            [EVENT_STATE_CHANGED, logbook.EVENT_LOGBOOK_ENTRY],
+            [event.event_type for event in events])
+
+    def test_get_events_page(self):
+        """Test that pages end where a group of events ends."""
+        from homeassistant.components.recorder.const import DATA_INSTANCE
+        from homeassistant.components.recorder.models import Events
+        from homeassistant.components.recorder.util import session_scope
+
+        # A day in the past, so events recorded by the test hass are ignored
+        start = (dt_util.utcnow() - timedelta(days=2)).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        end = start + timedelta(days=1)
+        times = [start + timedelta(minutes=minutes)
+                 for minutes in (1, 2, 16, 17, 18, 40)]
+
+        # The in-memory database has one connection, shared with the recorder
+        self.hass.data[DATA_INSTANCE].block_till_done()
+
+        with session_scope(session=self.hass.data[DATA_INSTANCE]
+                           .get_session()) as session:
+            for time_fired in times:
+                session.add(Events.from_event(ha.Event(
+                    logbook.EVENT_LOGBOOK_ENTRY, {
+                        logbook.ATTR_NAME: 'test',
+                        logbook.ATTR_MESSAGE: 'message',
+                    }, time_fired=time_fired)))
+
+        pages = []
+        page_start = start
+
+        while page_start is not None:
+            events, page_start = logbook._get_events_page(
+                self.hass, {}, page_start, end, None, 3)
+            pages.append([event.time_fired for event in events])
+
+        # The second page exceeds the limit to keep the group complete
+        self.assertEqual([times[:2], times[2:5], times[5:]], pages)
+
     def test_exclude_events_hidden(self):
         """Test if events are excluded if entity is hidden."""
         entity_id = 'sensor.bla'
@@ -559,3 +670,42 @@ class TestComponentLogbook(unittest.TestCase):
             'old_state': state,
             'new_state': state,
         }, time_fired=event_time_fired)
+
+
+@asyncio.coroutine
+def test_logbook_view(hass, test_client):
+    """Test the streamed and the paginated logbook."""
+    from homeassistant.components.recorder.const import DATA_INSTANCE
+
+    yield from hass.async_add_job(init_recorder_component, hass)
+    yield from async_setup_component(hass, 'logbook', {})
+    start = dt_util.utcnow()
+    hass.states.async_set('switch.test', STATE_OFF)
+    hass.states.async_set('switch.test', STATE_ON)
+    hass.states.async_set('light.kitchen', STATE_OFF)
+    hass.states.async_set('light.kitchen', STATE_ON)
+    yield from hass.async_block_till_done()
+    yield from hass.async_add_job(hass.data[DATA_INSTANCE].block_till_done)
+
+    client = yield from test_client(hass.http.app)
+    url = '/api/logbook/{}'.format(start.isoformat())
+    response = yield from client.get(url)
+    assert response.status == 200
+    entries = yield from response.json()
+    assert [entry['entity_id'] for entry in entries] == \
+        ['switch.test', 'light.kitchen']
+
+    response = yield from client.get(url, params={
+        'entity_id': 'light.kitchen', 'limit': 10})
+    assert response.status == 200
+    result = yield from response.json()
+    assert result['cursor'] is None
+    assert [entry['message'] for entry in result['entries']] == \
+        ['turned on']
+
+    response = yield from client.get(url, params={'limit': 0})
+    assert response.status == 400
+
+    response = yield from client.get(url, params={
+        'limit': 10, 'cursor': 'yesterday'})
+    assert response.status == 400
@@ -1,115 +1,86 @@
 """The tests for the Splunk component."""
-import unittest
-from unittest import mock
+import asyncio
+from datetime import timedelta
+import json
 
-from homeassistant.setup import setup_component
+from homeassistant.setup import async_setup_component
 import homeassistant.components.splunk as splunk
-from homeassistant.const import STATE_ON, STATE_OFF, EVENT_STATE_CHANGED
+from homeassistant.const import STATE_ON, STATE_OFF
+import homeassistant.util.dt as dt_util
 
-from tests.common import get_test_home_assistant
+from tests.common import async_fire_time_changed
 
+COLLECTOR_URL = 'http://host:8088/services/collector/event'
 
-class TestSplunk(unittest.TestCase):
-    """Test the Splunk component."""
 
-    def setUp(self):  # pylint: disable=invalid-name
-        """Setup things to be run when tests are started."""
-        self.hass = get_test_home_assistant()
+@asyncio.coroutine
+def test_setup_config_full(hass):
+    """Test setup with all data."""
+    config = {
+        'splunk': {
+            'host': 'host',
+            'port': 123,
+            'token': 'secret',
+            'ssl': 'False',
+            'name': 'hostname',
+        }
+    }
 
-    def tearDown(self):  # pylint: disable=invalid-name
-        """Stop everything that was started."""
-        self.hass.stop()
+    assert (yield from async_setup_component(hass, splunk.DOMAIN, config))
 
-    def test_setup_config_full(self):
-        """Test setup with all data."""
-        config = {
-            'splunk': {
-                'host': 'host',
-                'port': 123,
-                'token': 'secret',
-                'ssl': 'False',
-                'name': 'hostname',
-            }
-        }
 
-        self.hass.bus.listen = mock.MagicMock()
-        self.assertTrue(setup_component(self.hass, splunk.DOMAIN, config))
-        self.assertTrue(self.hass.bus.listen.called)
-        self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[0][0][0])
-
-    def test_setup_config_defaults(self):
-        """Test setup with defaults."""
-        config = {
-            'splunk': {
-                'host': 'host',
-                'token': 'secret',
-            }
+@asyncio.coroutine
+def test_setup_config_defaults(hass):
+    """Test setup with defaults."""
+    config = {
+        'splunk': {
+            'host': 'host',
+            'token': 'secret',
         }
+    }
 
-        self.hass.bus.listen = mock.MagicMock()
-        self.assertTrue(setup_component(self.hass, splunk.DOMAIN, config))
-        self.assertTrue(self.hass.bus.listen.called)
-        self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[0][0][0])
-
-    def _setup(self, mock_requests):
-        """Test the setup."""
-        self.mock_post = mock_requests.post
-        self.mock_request_exception = Exception
-        mock_requests.exceptions.RequestException = self.mock_request_exception
-        config = {
-            'splunk': {
-                'host': 'host',
-                'token': 'secret',
-                'port': 8088,
-            }
-        }
+    assert (yield from async_setup_component(hass, splunk.DOMAIN, config))
 
-        self.hass.bus.listen = mock.MagicMock()
-        setup_component(self.hass, splunk.DOMAIN, config)
-        self.handler_method = self.hass.bus.listen.call_args_list[0][0][1]
-
-    @mock.patch.object(splunk, 'requests')
-    @mock.patch('json.dumps')
-    def test_event_listener(self, mock_dump, mock_requests):
-        """Test event listener."""
-        mock_dump.side_effect = lambda x: x
-        self._setup(mock_requests)
-
-        valid = {'1': 1,
-                 '1.0': 1.0,
-                 STATE_ON: 1,
-                 STATE_OFF: 0,
-                 'foo': 'foo',
-                 }
-
-        for in_, out in valid.items():
-            state = mock.MagicMock(state=in_,
-                                   domain='fake',
-                                   object_id='entity',
-                                   attributes={})
-            event = mock.MagicMock(data={'new_state': state}, time_fired=12345)
-
-            body = [{
-                'domain': 'fake',
-                'entity_id': 'entity',
-                'attributes': {},
-                'time': '12345',
-                'value': out,
-                'host': 'HASS',
-            }]
-
-            payload = {'host': 'http://host:8088/services/collector/event',
-                       'event': body}
-            self.handler_method(event)
-            self.assertEqual(self.mock_post.call_count, 1)
-            self.assertEqual(
-                self.mock_post.call_args,
-                mock.call(
-                    payload['host'], data=payload,
-                    headers={'Authorization': 'Splunk secret'},
-                    timeout=10
-                )
-            )
-            self.mock_post.reset_mock()
+
+@asyncio.coroutine
+def test_event_listener(hass, aioclient_mock):
+    """Test that the state changes are posted in one batch."""
+    aioclient_mock.post(COLLECTOR_URL)
+    config = {
+        'splunk': {
+            'host': 'host',
+            'token': 'secret',
+            'port': 8088,
+        }
+    }
+    assert (yield from async_setup_component(hass, splunk.DOMAIN, config))
+
+    valid = {'1': 1,
+             '1.0': 1.0,
+             STATE_ON: 1,
+             STATE_OFF: 0,
+             'foo': 'foo',
+             }
+
+    for in_ in valid:
+        hass.states.async_set('fake.entity', in_)
+
+    yield from hass.async_block_till_done()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=5))
+    yield from hass.async_block_till_done()
+
+    assert aioclient_mock.call_count == 1
+    method, url, data = aioclient_mock.mock_calls[0]
+    payloads = [json.loads(line) for line in data.split('\n')]
+
+    assert url == COLLECTOR_URL
+    assert [payload['host'] for payload in payloads] == \
+        [COLLECTOR_URL] * len(valid)
+    assert [payload['event'][0]['value'] for payload in payloads] == \
+        list(valid.values())
+
+    body = payloads[0]['event'][0]
+    assert body['domain'] == 'fake'
+    assert body['entity_id'] == 'entity'
+    assert body['attributes'] == {}
+    assert body['host'] == 'HASS'
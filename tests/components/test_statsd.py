@@ -1,4 +1,5 @@
 """The tests for the StatsD feeder."""
+import datetime
 import unittest
 from unittest import mock
 
@@ -8,8 +9,10 @@ from homeassistant.setup import setup_component
 import homeassistant.core as ha
 import homeassistant.components.statsd as statsd
 from homeassistant.const import (STATE_ON, STATE_OFF, EVENT_STATE_CHANGED)
+from homeassistant.util.async import run_callback_threadsafe
+import homeassistant.util.dt as dt_util
 
-from tests.common import get_test_home_assistant
+from tests.common import fire_time_changed, get_test_home_assistant
 
 
 class TestStatsd(unittest.TestCase):
@@ -23,6 +26,25 @@ class TestStatsd(unittest.TestCase):
         """Stop everything that was started."""
         self.hass.stop()
 
+    def _setup_component(self, config):
+        """Set up the component and keep the state changed listener."""
+        with mock.patch.object(self.hass.bus, 'async_listen',
+                               wraps=self.hass.bus.async_listen) as listen:
+            self.assertTrue(setup_component(self.hass, statsd.DOMAIN, config))
+
+        listener = next(call[1][1] for call in listen.mock_calls
+                        if call[1][0] == EVENT_STATE_CHANGED)
+        self.handler_method = lambda event: run_callback_threadsafe(
+            self.hass.loop, listener, event).result()
+
+    def _handle(self, event):
+        """Pass an event to the listener and send the queued items."""
+        self.handler_method(event)
+        self.hass.block_till_done()
+        fire_time_changed(
+            self.hass, dt_util.utcnow() + datetime.timedelta(seconds=60))
+        self.hass.block_till_done()
+
     def test_invalid_config(self):
         """Test configuration with defaults."""
         config = {
@@ -47,17 +69,14 @@ class TestStatsd(unittest.TestCase):
                 'prefix': 'foo',
             }
         }
-        self.hass.bus.listen = mock.MagicMock()
-        self.assertTrue(setup_component(self.hass, statsd.DOMAIN, config))
+        self._setup_component(config)
         self.assertEqual(mock_connection.call_count, 1)
         self.assertEqual(
             mock_connection.call_args,
             mock.call(host='host', port=123, prefix='foo')
         )
 
-        self.assertTrue(self.hass.bus.listen.called)
-        self.assertEqual(EVENT_STATE_CHANGED,
-                         self.hass.bus.listen.call_args_list[0][0][0])
+        self.assertIsNotNone(self.handler_method)
 
     @mock.patch('statsd.StatsClient')
     def test_statsd_setup_defaults(self, mock_connection):
@@ -71,14 +90,13 @@ class TestStatsd(unittest.TestCase):
         config['statsd'][statsd.CONF_PORT] = statsd.DEFAULT_PORT
         config['statsd'][statsd.CONF_PREFIX] = statsd.DEFAULT_PREFIX
 
-        self.hass.bus.listen = mock.MagicMock()
-        self.assertTrue(setup_component(self.hass, statsd.DOMAIN, config))
+        self._setup_component(config)
         self.assertEqual(mock_connection.call_count, 1)
         self.assertEqual(
             mock_connection.call_args,
             mock.call(host='host', port=8125, prefix='hass')
         )
-        self.assertTrue(self.hass.bus.listen.called)
+        self.assertIsNotNone(self.handler_method)
 
     @mock.patch('statsd.StatsClient')
     def test_event_listener_defaults(self, mock_client):
@@ -91,10 +109,9 @@ class TestStatsd(unittest.TestCase):
 
         config['statsd'][statsd.CONF_RATE] = statsd.DEFAULT_RATE
 
-        self.hass.bus.listen = mock.MagicMock()
-        setup_component(self.hass, statsd.DOMAIN, config)
-        self.assertTrue(self.hass.bus.listen.called)
-        handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self._setup_component(config)
+        pipe = mock_client.return_value.pipeline.return_value.__enter__ \
+            .return_value
 
         valid = {'1': 1,
                  '1.0': 1.0,
@@ -103,25 +120,25 @@ class TestStatsd(unittest.TestCase):
         for in_, out in valid.items():
             state = mock.MagicMock(state=in_,
                                    attributes={"attribute key": 3.2})
-            handler_method(mock.MagicMock(data={'new_state': state}))
-            mock_client.return_value.gauge.assert_has_calls([
+            self._handle(mock.MagicMock(data={'new_state': state}))
+            pipe.gauge.assert_has_calls([
                 mock.call(state.entity_id, out, statsd.DEFAULT_RATE),
             ])
 
-            mock_client.return_value.gauge.reset_mock()
+            pipe.gauge.reset_mock()
 
-            self.assertEqual(mock_client.return_value.incr.call_count, 1)
+            self.assertEqual(pipe.incr.call_count, 1)
             self.assertEqual(
-                mock_client.return_value.incr.call_args,
+                pipe.incr.call_args,
                 mock.call(state.entity_id, rate=statsd.DEFAULT_RATE)
             )
-            mock_client.return_value.incr.reset_mock()
+            pipe.incr.reset_mock()
 
         for invalid in ('foo', '', object):
-            handler_method(mock.MagicMock(data={
+            self._handle(mock.MagicMock(data={
                 'new_state': ha.State('domain.test', invalid, {})}))
-            self.assertFalse(mock_client.return_value.gauge.called)
-            self.assertTrue(mock_client.return_value.incr.called)
+            self.assertFalse(pipe.gauge.called)
+            self.assertTrue(pipe.incr.called)
 
     @mock.patch('statsd.StatsClient')
     def test_event_listener_attr_details(self, mock_client):
@@ -135,10 +152,9 @@ class TestStatsd(unittest.TestCase):
 
         config['statsd'][statsd.CONF_RATE] = statsd.DEFAULT_RATE
 
-        self.hass.bus.listen = mock.MagicMock()
-        setup_component(self.hass, statsd.DOMAIN, config)
-        self.assertTrue(self.hass.bus.listen.called)
-        handler_method = self.hass.bus.listen.call_args_list[0][0][1]
+        self._setup_component(config)
+        pipe = mock_client.return_value.pipeline.return_value.__enter__ \
+            .return_value
 
         valid = {'1': 1,
                  '1.0': 1.0,
@@ -147,25 +163,25 @@ class TestStatsd(unittest.TestCase):
         for in_, out in valid.items():
             state = mock.MagicMock(state=in_,
                                    attributes={"attribute key": 3.2})
-            handler_method(mock.MagicMock(data={'new_state': state}))
-            mock_client.return_value.gauge.assert_has_calls([
+            self._handle(mock.MagicMock(data={'new_state': state}))
+            pipe.gauge.assert_has_calls([
                 mock.call("%s.state" % state.entity_id,
                           out, statsd.DEFAULT_RATE),
                 mock.call("%s.attribute_key" % state.entity_id,
                           3.2, statsd.DEFAULT_RATE),
             ])
 
-            mock_client.return_value.gauge.reset_mock()
+            pipe.gauge.reset_mock()
 
-            self.assertEqual(mock_client.return_value.incr.call_count, 1)
+            self.assertEqual(pipe.incr.call_count, 1)
             self.assertEqual(
-                mock_client.return_value.incr.call_args,
+                pipe.incr.call_args,
                 mock.call(state.entity_id, rate=statsd.DEFAULT_RATE)
             )
-            mock_client.return_value.incr.reset_mock()
+            pipe.incr.reset_mock()
 
         for invalid in ('foo', '', object):
-            handler_method(mock.MagicMock(data={
+            self._handle(mock.MagicMock(data={
                 'new_state': ha.State('domain.test', invalid, {})}))
-            self.assertFalse(mock_client.return_value.gauge.called)
-            self.assertTrue(mock_client.return_value.incr.called)
+            self.assertFalse(pipe.gauge.called)
+            self.assertTrue(pipe.incr.called)
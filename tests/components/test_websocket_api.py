@@ -222,6 +222,108 @@ def test_subscribe_unsubscribe_events(hass, websocket_client):
     assert sum(hass.bus.async_listeners().values()) == init_count
 
 
+@asyncio.coroutine
+def test_subscribe_events_entity_filter(hass, websocket_client):
+    """Test subscribing to events of specific entities and domains."""
+    init_count = sum(hass.bus.async_listeners().values())
+
+    websocket_client.send_json({
+        'id': 5,
+        'type': wapi.TYPE_SUBSCRIBE_EVENTS,
+        'event_type': 'state_changed',
+        'entity_id': 'light.kitchen',
+    })
+
+    msg = yield from websocket_client.receive_json()
+    assert msg['success']
+
+    websocket_client.send_json({
+        'id': 6,
+        'type': wapi.TYPE_SUBSCRIBE_EVENTS,
+        'event_type': 'state_changed',
+        'domain': 'switch',
+    })
+
+    msg = yield from websocket_client.receive_json()
+    assert msg['success']
+
+    # Both subscriptions share a single bus listener
+    assert sum(hass.bus.async_listeners().values()) == init_count + 1
+
+    hass.states.async_set('light.bedroom', 'on')
+    hass.states.async_set('light.kitchen', 'on')
+    hass.states.async_set('sensor.kitchen', 'on')
+    hass.states.async_set('switch.kitchen', 'on')
+
+    with timeout(3, loop=hass.loop):
+        msg = yield from websocket_client.receive_json()
+
+    assert msg['id'] == 5
+    assert msg['event']['data']['entity_id'] == 'light.kitchen'
+    assert msg['event']['data']['new_state']['state'] == 'on'
+
+    with timeout(3, loop=hass.loop):
+        msg = yield from websocket_client.receive_json()
+
+    assert msg['id'] == 6
+    assert msg['event']['data']['entity_id'] == 'switch.kitchen'
+
+    for iden, subscription in ((7, 5), (8, 6)):
+        websocket_client.send_json({
+            'id': iden,
+            'type': wapi.TYPE_UNSUBSCRIBE_EVENTS,
+            'subscription': subscription,
+        })
+
+        msg = yield from websocket_client.receive_json()
+        assert msg['id'] == iden
+        assert msg['success']
+
+    assert sum(hass.bus.async_listeners().values()) == init_count
+
+
+@asyncio.coroutine
+def test_subscribe_all_events(hass, websocket_client):
+    """Test that subscribing without event type receives all events once."""
+    websocket_client.send_json({
+        'id': 5,
+        'type': wapi.TYPE_SUBSCRIBE_EVENTS,
+    })
+
+    msg = yield from websocket_client.receive_json()
+    assert msg['success']
+
+    websocket_client.send_json({
+        'id': 6,
+        'type': wapi.TYPE_SUBSCRIBE_EVENTS,
+        'event_type': 'test_event',
+    })
+
+    msg = yield from websocket_client.receive_json()
+    assert msg['success']
+
+    hass.bus.async_fire('test_event', {'hello': 'world'})
+    hass.bus.async_fire('other_event')
+
+    messages = []
+    for _ in range(3):
+        with timeout(3, loop=hass.loop):
+            messages.append((yield from websocket_client.receive_json()))
+
+    assert sorted((msg['id'], msg['event']['event_type'])
+                  for msg in messages) == [
+                      (5, 'other_event'), (5, 'test_event'),
+                      (6, 'test_event')]
+
+    # No duplicate of test_event is sent to the second subscription
+    hass.bus.async_fire('last_event')
+
+    with timeout(3, loop=hass.loop):
+        msg = yield from websocket_client.receive_json()
+
+    assert (msg['id'], msg['event']['event_type']) == (5, 'last_event')
+
+
 @asyncio.coroutine
 def test_get_states(hass, websocket_client):
     """Test get_states command."""
@@ -10,6 +10,7 @@ from homeassistant.components.binary_sensor.zwave import get_device
 from homeassistant.components.zwave import (
     const, CONFIG_SCHEMA, CONF_DEVICE_CONFIG_GLOB, DATA_NETWORK)
 from homeassistant.setup import setup_component
+import homeassistant.util.dt as dt_util
 
 import pytest
 import unittest
@@ -90,14 +91,16 @@ def test_network_options(hass, mock_openzwave):
 @asyncio.coroutine
 def test_auto_heal_midnight(hass, mock_openzwave):
     """Test network auto-heal at midnight."""
-    assert (yield from async_setup_component(hass, 'zwave', {
-        'zwave': {
-            'autoheal': True,
-        }}))
+    setup_time = datetime(2017, 5, 5, 12, 0, 0, tzinfo=dt_util.UTC)
+    with patch('homeassistant.util.dt.utcnow', return_value=setup_time):
+        assert (yield from async_setup_component(hass, 'zwave', {
+            'zwave': {
+                'autoheal': True,
+            }}))
     network = hass.data[zwave.DATA_NETWORK]
     assert not network.heal.called
 
-    time = datetime(2017, 5, 6, 0, 0, 0)
+    time = datetime(2017, 5, 6, 0, 0, 0, tzinfo=dt_util.UTC)
     async_fire_time_changed(hass, time)
     yield from hass.async_block_till_done()
     assert network.heal.called
@@ -114,7 +117,7 @@ def test_auto_heal_disabled(hass, mock_openzwave):
     network = hass.data[zwave.DATA_NETWORK]
     assert not network.heal.called
 
-    time = datetime(2017, 5, 6, 0, 0, 0)
+    time = datetime(2017, 5, 6, 0, 0, 0, tzinfo=dt_util.UTC)
     async_fire_time_changed(hass, time)
     yield from hass.async_block_till_done()
     assert not network.heal.called
@@ -191,3 +191,72 @@ def test_warn_slow_update_with_exception(hass):
         assert mock_call().cancel.called
 
         assert update_call
+
+
+class CoalescingEntity(entity.Entity):
+    """Entity that merges its state writes."""
+
+    def __init__(self, delay):
+        """Initialize the entity."""
+        self.entity_id = 'sensor.coalesced'
+        self.delay = delay
+        self.value = 0
+
+    @property
+    def state(self):
+        """Return the state."""
+        return self.value
+
+    @property
+    def coalesce_state_writes(self):
+        """Return the seconds in which writes are merged."""
+        return self.delay
+
+
+@asyncio.coroutine
+def test_coalesce_state_writes_in_loop_iteration(hass):
+    """Test that writes within one loop iteration are merged."""
+    ent = CoalescingEntity(0)
+    ent.hass = hass
+
+    with patch.object(hass.states, 'async_set',
+                      wraps=hass.states.async_set) as mock_set:
+        for value in range(3):
+            ent.value = value
+            yield from ent.async_update_ha_state()
+
+        assert hass.states.get('sensor.coalesced') is None
+        yield from hass.async_block_till_done()
+
+    assert mock_set.call_count == 1
+    assert hass.states.get('sensor.coalesced').state == '2'
+    assert ent.state_writes_saved == 2
+
+
+@asyncio.coroutine
+def test_coalesce_state_writes_debounced(hass):
+    """Test that writes within the debounce window are merged."""
+    ent = CoalescingEntity(0.01)
+    ent.hass = hass
+
+    with patch.object(hass.loop, 'call_later', MagicMock()) as mock_call:
+        yield from ent.async_update_ha_state()
+        ent.value = 1
+        yield from ent.async_update_ha_state()
+
+        assert len(mock_call.mock_calls) == 1
+        delay, write_pending = mock_call.mock_calls[0][1]
+        assert delay == 0.01
+        assert hass.states.get('sensor.coalesced') is None
+
+        # The debounce window passed
+        write_pending()
+        assert hass.states.get('sensor.coalesced').state == '1'
+        assert ent.state_writes_saved == 1
+
+        # A removed entity does not write its pending state
+        yield from ent.async_update_ha_state()
+        assert len(mock_call.mock_calls) == 2
+        yield from ent.async_remove()
+        assert mock_call().cancel.called
+        assert ent._pending_write is None
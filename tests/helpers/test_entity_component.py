@@ -3,6 +3,8 @@
 import asyncio
 from collections import OrderedDict
 import logging
+import threading
+import time
 import unittest
 from unittest.mock import patch, Mock, MagicMock
 from datetime import timedelta
@@ -164,6 +166,56 @@ class TestHelpersEntityComponent(unittest.TestCase):
         assert len(update_ok) == 3
         assert len(update_err) == 1
 
+    def test_polling_parallel_updates(self):
+        """Test that sync entities update in parallel up to the limit."""
+        updating = []
+        max_updating = []
+        lock = threading.Lock()
+
+        def update():
+            """Mock a slow update."""
+            with lock:
+                updating.append(None)
+                max_updating.append(len(updating))
+            time.sleep(0.01)
+            with lock:
+                updating.pop()
+
+        entities = [EntityTest(should_poll=True) for _ in range(5)]
+        for entity in entities:
+            entity.update = update
+
+        def platform_setup(hass, config, add_devices, discovery_info=None):
+            """Add the entities."""
+            add_devices(entities)
+
+        loader.set_component('test_domain.platform',
+                             MockPlatform(platform_setup))
+        component = EntityComponent(
+            _LOGGER, DOMAIN, self.hass, timedelta(seconds=20))
+        component.setup({
+            DOMAIN: {
+                'platform': 'platform',
+                'parallel_updates': 2,
+            }
+        })
+        self.hass.block_till_done()
+
+        fire_time_changed(self.hass, dt_util.utcnow() + timedelta(seconds=20))
+        self.hass.block_till_done()
+
+        assert len(max_updating) == 5
+        assert max(max_updating) == 2
+
+        platform = next(platform for platform
+                        in component._platforms.values()
+                        if platform.platform == 'platform')
+        assert platform.parallel_updates == 2
+        latency = platform.update_latency.as_dict()
+        assert latency['count'] == 5
+        assert latency['maximum'] >= 0.01
+        assert sum(count for _, count in latency['buckets']) == 5
+
     def test_update_state_adds_entities(self):
         """Test if updating poll entities cause an entity to be added works."""
         component = EntityComponent(_LOGGER, DOMAIN, self.hass)
@@ -578,3 +630,24 @@ def test_platform_not_ready(hass):
         yield from hass.async_block_till_done()
         assert len(platform1_setup.mock_calls) == 3
         assert 'test_domain.mod1' in hass.config.components
+
+
+@asyncio.coroutine
+def test_update_latency_logged(hass, caplog):
+    """Test that the update latency is logged and added to the warning."""
+    component = EntityComponent(_LOGGER, DOMAIN, hass)
+    platform = entity_component.EntityPlatform(
+        component, 'platform', timedelta(seconds=20), None)
+    yield from platform.async_add_entities([EntityTest(should_poll=True)])
+
+    with caplog.at_level(logging.DEBUG):
+        yield from platform._update_entity_states(None)
+    assert "Update latency of platform test_domain: {'buckets'" \
+        in caplog.text
+
+    platform.update_latency.add(1.5)
+
+    with (yield from platform._process_updates):
+        yield from platform._update_entity_states(None)
+
+    assert 'the slowest update so far took 1.500 seconds' in caplog.text
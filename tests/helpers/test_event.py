@@ -8,8 +8,11 @@ from astral import Astral
 
 from homeassistant.setup import setup_component
 import homeassistant.core as ha
-from homeassistant.const import MATCH_ALL
+from homeassistant.const import (
+    EVENT_STATE_CHANGED, EVENT_TIME_CHANGED, MATCH_ALL)
 from homeassistant.helpers.event import (
+    DATA_POINT_IN_TIME_LISTENERS,
+    DATA_STATE_CHANGE_LISTENERS,
     track_point_in_utc_time,
     track_point_in_time,
     track_utc_time_change,
@@ -80,26 +83,64 @@ class TestEventHelpers(unittest.TestCase):
         self.hass.block_till_done()
         self.assertEqual(2, len(runs))
 
+    def test_track_point_in_time_shares_bus_listener(self):
+        """Test point in time listeners share a time_changed listener."""
+        birthday_paulus = datetime(1986, 7, 9, 12, 0, 0, tzinfo=dt_util.UTC)
+        runs = []
+
+        unsub_later = track_point_in_utc_time(
+            self.hass, lambda x: runs.append('later'),
+            birthday_paulus + timedelta(seconds=5))
+        track_point_in_utc_time(
+            self.hass, lambda x: runs.append('first'), birthday_paulus)
+        unsub_removed = track_point_in_utc_time(
+            self.hass, lambda x: runs.append('removed'), birthday_paulus)
+        unsub_removed()
+
+        self.assertEqual(1, self.hass.bus.listeners[EVENT_TIME_CHANGED])
+        self.assertEqual(
+            2, self.hass.data[DATA_POINT_IN_TIME_LISTENERS].count)
+
+        self._send_time_changed(birthday_paulus)
+        self.hass.block_till_done()
+        self.assertEqual(['first'], runs)
+        self.assertEqual(
+            1, self.hass.data[DATA_POINT_IN_TIME_LISTENERS].count)
+
+        self._send_time_changed(birthday_paulus + timedelta(seconds=10))
+        self.hass.block_till_done()
+        self.assertEqual(['first', 'later'], runs)
+
+        # Removing a listener that already ran does nothing
+        unsub_later()
+        self.assertEqual(
+            0, self.hass.data[DATA_POINT_IN_TIME_LISTENERS].count)
+        self.assertNotIn(EVENT_TIME_CHANGED, self.hass.bus.listeners)
+
     def test_track_time_change(self):
         """Test tracking time change."""
         wildcard_runs = []
         specific_runs = []
 
         unsub = track_time_change(self.hass, lambda x: wildcard_runs.append(1))
-        unsub_utc = track_utc_time_change(
-            self.hass, lambda x: specific_runs.append(1), second=[0, 30])
+        unsub_utc = self._track_utc_time_change_at(
+            datetime(2014, 5, 24, 11, 59, 59, tzinfo=dt_util.UTC),
+            lambda x: specific_runs.append(1), second=[0, 30])
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
         self.assertEqual(1, len(wildcard_runs))
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 0, 15))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 0, 15, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
         self.assertEqual(2, len(wildcard_runs))
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 0, 30))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 0, 30, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
         self.assertEqual(3, len(wildcard_runs))
@@ -107,7 +148,8 @@ class TestEventHelpers(unittest.TestCase):
         unsub()
         unsub_utc()
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 0, 30))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 1, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
         self.assertEqual(3, len(wildcard_runs))
@@ -191,6 +233,35 @@ class TestEventHelpers(unittest.TestCase):
         self.assertEqual(5, len(wildcard_runs))
         self.assertEqual(6, len(wildercard_runs))
 
+    def test_track_state_change_shares_bus_listener(self):
+        """Test state trackers share a single state_changed bus listener."""
+        runs = []
+
+        unsub_bowl = track_state_change(
+            self.hass, ['light.Bowl', 'light.bowl'],
+            lambda *args: runs.append('bowl'))
+        unsub_all = track_state_change(
+            self.hass, MATCH_ALL, lambda *args: runs.append('all'))
+
+        self.assertEqual(1, self.hass.bus.listeners[EVENT_STATE_CHANGED])
+        self.assertEqual(
+            2, self.hass.data[DATA_STATE_CHANGE_LISTENERS].count)
+
+        self.hass.states.set('light.bowl', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(['all', 'bowl'], runs)
+
+        self.hass.states.set('switch.kitchen', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(['all', 'bowl', 'all'], runs)
+
+        unsub_bowl()
+        unsub_all()
+
+        self.assertEqual(
+            0, self.hass.data[DATA_STATE_CHANGE_LISTENERS].count)
+        self.assertNotIn(EVENT_STATE_CHANGED, self.hass.bus.listeners)
+
     def test_track_template(self):
         """Test tracking template."""
         specific_runs = []
@@ -262,6 +333,65 @@ class TestEventHelpers(unittest.TestCase):
         self.assertEqual(2, len(wildcard_runs))
         self.assertEqual(2, len(wildercard_runs))
 
+    def test_track_template_render_entities(self):
+        """Test tracking the states a template read in its last render."""
+        runs = []
+        template_condition = Template(
+            "{{ is_state(states.input_select.target.state, 'on') }}",
+            self.hass)
+
+        self.hass.states.set('input_select.target', 'light.kitchen')
+        self.hass.states.set('light.kitchen', 'off')
+        self.hass.states.set('light.bedroom', 'off')
+
+        @ha.callback
+        def run_callback(entity_id, old_state, new_state):
+            runs.append(entity_id)
+
+        remove = track_template(self.hass, template_condition, run_callback)
+
+        # Computed entity ids are tracked, other entities are not
+        self.hass.states.set('light.bedroom', 'on')
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(['light.kitchen'], runs)
+
+        # The tracked entities follow the last render
+        self.hass.states.set('input_select.target', 'light.bedroom')
+        self.hass.states.set('light.kitchen', 'off')
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(['light.kitchen'], runs)
+
+        self.hass.states.set('light.bedroom', 'off')
+        self.hass.states.set('light.bedroom', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(['light.kitchen', 'light.bedroom'], runs)
+
+        remove()
+        self.hass.block_till_done()
+        self.assertEqual(
+            0, self.hass.data[DATA_STATE_CHANGE_LISTENERS].count)
+
+    def test_track_template_render_domain(self):
+        """Test tracking the domains a template iterated over."""
+        runs = []
+        template_condition = Template(
+            "{{ states.light | selectattr('state', 'eq', 'on') | list | "
+            "count > 1 }}", self.hass)
+
+        @ha.callback
+        def run_callback(entity_id, old_state, new_state):
+            runs.append(entity_id)
+
+        track_template(self.hass, template_condition, run_callback)
+
+        self.hass.states.set('light.kitchen', 'on')
+        self.hass.states.set('switch.kitchen', 'on')
+        self.hass.states.set('light.bedroom', 'on')
+        self.hass.block_till_done()
+        self.assertEqual(['light.bedroom'], runs)
+
     def test_track_time_interval(self):
         """Test tracking time interval."""
         specific_runs = []
@@ -412,28 +542,38 @@ class TestEventHelpers(unittest.TestCase):
         """Send a time changed event."""
         self.hass.bus.fire(ha.EVENT_TIME_CHANGED, {ha.ATTR_NOW: now})
 
+    def _track_utc_time_change_at(self, now, *args, **kwargs):
+        """Start tracking a time pattern at a specific UTC time."""
+        with patch('homeassistant.util.dt.utcnow', return_value=now):
+            return track_utc_time_change(self.hass, *args, **kwargs)
+
     def test_periodic_task_minute(self):
         """Test periodic tasks per minute."""
         specific_runs = []
 
-        unsub = track_utc_time_change(
-            self.hass, lambda x: specific_runs.append(1), minute='/5')
+        unsub = self._track_utc_time_change_at(
+            datetime(2014, 5, 24, 11, 59, 59, tzinfo=dt_util.UTC),
+            lambda x: specific_runs.append(1), minute='/5', second=0)
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 3, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 3, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 5, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 5, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
 
         unsub()
 
-        self._send_time_changed(datetime(2014, 5, 24, 12, 5, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 12, 10, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
 
@@ -441,32 +581,40 @@ class TestEventHelpers(unittest.TestCase):
         """Test periodic tasks per hour."""
         specific_runs = []
 
-        unsub = track_utc_time_change(
-            self.hass, lambda x: specific_runs.append(1), hour='/2')
+        unsub = self._track_utc_time_change_at(
+            datetime(2014, 5, 24, 21, 0, 0, tzinfo=dt_util.UTC),
+            lambda x: specific_runs.append(1), hour='/2', minute=0,
+            second=0)
 
-        self._send_time_changed(datetime(2014, 5, 24, 22, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 22, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 24, 23, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 24, 23, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 24, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 25, 0, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 25, 1, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 25, 1, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 25, 2, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 25, 2, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(3, len(specific_runs))
 
         unsub()
 
-        self._send_time_changed(datetime(2014, 5, 25, 2, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 25, 4, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(3, len(specific_runs))
 
@@ -474,24 +622,30 @@ class TestEventHelpers(unittest.TestCase):
         """Test periodic tasks per day."""
         specific_runs = []
 
-        unsub = track_utc_time_change(
-            self.hass, lambda x: specific_runs.append(1), day='/2')
+        unsub = self._track_utc_time_change_at(
+            datetime(2014, 5, 1, 12, 0, 0, tzinfo=dt_util.UTC),
+            lambda x: specific_runs.append(1), day='/2', hour=0, minute=0,
+            second=0)
 
-        self._send_time_changed(datetime(2014, 5, 2, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 2, 0, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 3, 12, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 3, 12, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
 
-        self._send_time_changed(datetime(2014, 5, 4, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 4, 0, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
 
         unsub()
 
-        self._send_time_changed(datetime(2014, 5, 4, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2014, 5, 6, 0, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(2, len(specific_runs))
 
@@ -499,34 +653,55 @@ class TestEventHelpers(unittest.TestCase):
         """Test periodic tasks per year."""
         specific_runs = []
 
-        unsub = track_utc_time_change(
-            self.hass, lambda x: specific_runs.append(1), year='/2')
+        unsub = self._track_utc_time_change_at(
+            datetime(2015, 5, 2, 0, 0, 0, tzinfo=dt_util.UTC),
+            lambda x: specific_runs.append(1), year='/2')
 
-        self._send_time_changed(datetime(2014, 5, 2, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2015, 12, 31, 23, 59, 59, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
-        self.assertEqual(1, len(specific_runs))
+        self.assertEqual(0, len(specific_runs))
 
-        self._send_time_changed(datetime(2015, 5, 2, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2016, 1, 1, 0, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(1, len(specific_runs))
 
-        self._send_time_changed(datetime(2016, 5, 2, 0, 0, 0))
-        self.hass.block_till_done()
-        self.assertEqual(2, len(specific_runs))
-
         unsub()
 
-        self._send_time_changed(datetime(2016, 5, 2, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2016, 5, 2, 0, 0, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
-        self.assertEqual(2, len(specific_runs))
+        self.assertEqual(1, len(specific_runs))
 
     def test_periodic_task_wrong_input(self):
         """Test periodic tasks with wrong input."""
+        for kwargs in ({'year': '/two'}, {'second': 75}, {'hour': 24},
+                       {'minute': '/0'}):
+            with self.assertRaises(ValueError):
+                track_utc_time_change(self.hass, lambda x: None, **kwargs)
+
+    def test_periodic_task_local_dst(self):
+        """Test local time patterns skip times that do not exist."""
+        dt_util.set_default_time_zone(dt_util.get_time_zone('Europe/Vienna'))
         specific_runs = []
 
-        track_utc_time_change(
-            self.hass, lambda x: specific_runs.append(1), year='/two')
+        # 2017-03-26 02:30 does not exist in Vienna, clocks jump to 03:00
+        unsub = self._track_utc_time_change_at(
+            datetime(2017, 3, 25, 12, 0, 0, tzinfo=dt_util.UTC),
+            lambda x: specific_runs.append(x), hour=2, minute=30, second=0,
+            local=True)
 
-        self._send_time_changed(datetime(2014, 5, 2, 0, 0, 0))
+        self._send_time_changed(
+            datetime(2017, 3, 26, 1, 30, 0, tzinfo=dt_util.UTC))
         self.hass.block_till_done()
         self.assertEqual(0, len(specific_runs))
+
+        self._send_time_changed(
+            datetime(2017, 3, 27, 0, 30, 0, tzinfo=dt_util.UTC))
+        self.hass.block_till_done()
+        self.assertEqual(1, len(specific_runs))
+        self.assertEqual(2, specific_runs[0].hour)
+
+        unsub()
+        dt_util.set_default_time_zone(dt_util.UTC)
@@ -0,0 +1,174 @@
+"""Test the batching exporter helper."""
+import asyncio
+from datetime import timedelta
+
+import aiohttp
+import pytest
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import exporter
+import homeassistant.util.dt as dt_util
+
+from tests.common import async_fire_time_changed
+
+
+class MockExporter(exporter.BatchExporter):
+    """Exporter that records the sent batches."""
+
+    def __init__(self, hass, config=None, errors=None):
+        """Initialize the exporter."""
+        super().__init__(hass, 'Mock', config)
+        self.batches = []
+        self.errors = list(errors or [])
+
+    def convert(self, event):
+        """Return the entity_id of the new state."""
+        return event.data['new_state'].entity_id
+
+    @asyncio.coroutine
+    def async_send(self, batch):
+        """Record the batch or raise the next error."""
+        self.batches.append(batch)
+
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+@asyncio.coroutine
+def _async_flush(hass, seconds=60):
+    """Fire the flush timer and wait for the batch to be sent."""
+    yield from hass.async_block_till_done()
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=seconds))
+    yield from hass.async_block_till_done()
+
+
+def test_entity_filter():
+    """Test that excludes win and includes limit the entities."""
+    entity_filter = exporter.generate_entity_filter(
+        include_domains=['light'], include_entities=['sensor.included'],
+        exclude_entities=['light.excluded'])
+
+    assert entity_filter('light.kitchen')
+    assert entity_filter('sensor.included')
+    assert not entity_filter('light.excluded')
+    assert not entity_filter('sensor.other')
+    assert exporter.generate_entity_filter()('sensor.other')
+
+
+@asyncio.coroutine
+def test_send_on_batch_size_and_interval(hass):
+    """Test that full batches are sent right away, others on the timer."""
+    mock_exporter = MockExporter(hass, {exporter.CONF_BATCH_SIZE: 2})
+    mock_exporter.async_start()
+
+    for index in range(3):
+        hass.states.async_set('light.test_{}'.format(index), 'on')
+    yield from hass.async_block_till_done()
+
+    assert mock_exporter.batches == [['light.test_0', 'light.test_1']]
+
+    yield from _async_flush(hass)
+
+    assert mock_exporter.batches[1:] == [['light.test_2']]
+    assert mock_exporter.sent == 3
+
+
+@asyncio.coroutine
+def test_entity_filter_applied(hass):
+    """Test that only the states passing the filter are sent."""
+    mock_exporter = MockExporter(hass)
+    mock_exporter.async_start(exporter.generate_entity_filter(
+        include_domains=['light']))
+
+    hass.states.async_set('light.kitchen', 'on')
+    hass.states.async_set('sensor.temperature', '20')
+    yield from _async_flush(hass)
+
+    assert mock_exporter.batches == [['light.kitchen']]
+
+
+@asyncio.coroutine
+def test_drop_oldest_items(hass):
+    """Test that the oldest items are dropped when the buffer is full."""
+    mock_exporter = MockExporter(hass, {exporter.CONF_MAX_BUFFER: 2})
+    mock_exporter.async_start(track_states=False)
+
+    for item in range(3):
+        mock_exporter.async_queue(item)
+    yield from _async_flush(hass)
+
+    assert mock_exporter.batches == [[1, 2]]
+    assert mock_exporter.dropped == 1
+
+
+@asyncio.coroutine
+def test_retry_export_errors(hass):
+    """Test that a batch failing with an ExportError is sent again."""
+    mock_exporter = MockExporter(
+        hass, errors=[exporter.ExportError('unavailable')] * 2)
+    mock_exporter.async_start(track_states=False)
+    mock_exporter.async_queue('first')
+    yield from _async_flush(hass)
+
+    # Items queued while retrying wait for the retry
+    mock_exporter.async_queue('second')
+    yield from _async_flush(hass, 1)
+    yield from _async_flush(hass, 2)
+
+    assert mock_exporter.batches == [
+        ['first'], ['first', 'second'], ['first', 'second']]
+    assert mock_exporter.sent == 2
+
+
+@asyncio.coroutine
+def test_drop_batch_on_other_errors(hass):
+    """Test that a batch failing with another error is not sent again."""
+    mock_exporter = MockExporter(hass, errors=[ValueError('invalid')])
+    mock_exporter.async_start(track_states=False)
+    mock_exporter.async_queue('first')
+    yield from _async_flush(hass)
+    yield from _async_flush(hass)
+
+    assert mock_exporter.batches == [['first']]
+    assert mock_exporter.sent == 0
+
+
+@asyncio.coroutine
+def test_send_queued_items_on_stop(hass):
+    """Test that the queued items are sent when stopping."""
+    mock_exporter = MockExporter(hass)
+    mock_exporter.async_start(track_states=False)
+    mock_exporter.async_queue('first')
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+    yield from hass.async_block_till_done()
+
+    assert mock_exporter.batches == [['first']]
+
+
+@asyncio.coroutine
+def test_post(hass, aioclient_mock):
+    """Test that posting raises ExportError only for retryable failures."""
+    mock_exporter = MockExporter(hass)
+    aioclient_mock.post('http://example.com/ok')
+    aioclient_mock.post('http://example.com/busy', status=503)
+    aioclient_mock.post('http://example.com/invalid', status=400)
+    aioclient_mock.post('http://example.com/down',
+                        exc=aiohttp.ClientError())
+
+    yield from mock_exporter.async_post('http://example.com/ok', data='test')
+
+    with pytest.raises(exporter.ExportError):
+        yield from mock_exporter.async_post('http://example.com/busy')
+
+    with pytest.raises(exporter.ExportError):
+        yield from mock_exporter.async_post('http://example.com/down')
+
+    with pytest.raises(HomeAssistantError) as exc_info:
+        yield from mock_exporter.async_post('http://example.com/invalid')
+
+    assert not isinstance(exc_info.value, exporter.ExportError)
+    assert aioclient_mock.mock_calls[0] == (
+        'post', 'http://example.com/ok', 'test')
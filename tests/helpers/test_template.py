@@ -16,6 +16,7 @@ from homeassistant.const import (
     MATCH_ALL,
 )
 import homeassistant.util.dt as dt_util
+from homeassistant.util.async import run_callback_threadsafe
 
 from tests.common import get_test_home_assistant
 
@@ -36,6 +37,74 @@ class TestHelpersTemplate(unittest.TestCase):
         """Stop down stuff we started."""
         self.hass.stop()
 
+    def test_compiled_code_shared(self):
+        """Test that templates with the same source share compiled code."""
+        env = template.TemplateEnvironment()
+
+        with patch.object(template, 'ENV', env), \
+                patch.object(template, 'COMPILED_CACHE_SIZE', 2):
+            first = template.Template('{{ 1 + 1 }}', self.hass)
+            second = template.Template('{{ 1 + 1 }}', self.hass)
+            first.ensure_valid()
+            second.ensure_valid()
+            self.assertIs(first._compiled_code, second._compiled_code)
+            self.assertEqual('2', second.render())
+            self.assertEqual(1, env.compiled_cache_hits)
+            self.assertEqual(1, env.compiled_cache_misses)
+
+            # The least recently used code is evicted
+            template.Template('{{ 2 }}').ensure_valid()
+            template.Template('{{ 3 }}').ensure_valid()
+            template.Template('{{ 1 + 1 }}').ensure_valid()
+            self.assertEqual(4, env.compiled_cache_misses)
+
+            # Invalid templates are not cached
+            for _ in range(2):
+                with self.assertRaises(TemplateError):
+                    template.Template('{{ 1 + }}').ensure_valid()
+            self.assertEqual(6, env.compiled_cache_misses)
+            self.assertEqual(1, env.compiled_cache_hits)
+
+    def render_to_info(self, template_str):
+        """Render a template and collect the states it read."""
+        return run_callback_threadsafe(
+            self.hass.loop, template.Template(
+                template_str, self.hass).async_render_to_info).result()
+
+    def test_render_to_info(self):
+        """Test collecting the states a render read."""
+        self.hass.states.set('sensor.temperature', 21)
+        self.hass.states.set('group.children', 'home', {
+            'entity_id': ['device_tracker.child']})
+
+        info = self.render_to_info(
+            "{{ states.sensor.temperature.state }}"
+            "{{ states('Light.Kitchen') }}"
+            "{{ is_state('switch.test', 'on') }}"
+            "{% for state in states.binary_sensor %}{% endfor %}"
+            "{{ closest('group.children') }}")
+
+        self.assertEqual('21unknownFalseNone', info.result())
+        self.assertEqual({
+            'sensor.temperature', 'light.kitchen', 'switch.test',
+            'group.children', 'device_tracker.child'}, info.entities)
+        self.assertEqual({'binary_sensor'}, info.domains)
+        self.assertFalse(info.all_states)
+
+        info = self.render_to_info("{{ states | list | count }}")
+        self.assertEqual('2', info.result())
+        self.assertTrue(info.all_states)
+
+        # States read by renders outside of render_to_info are not collected
+        template.Template(
+            "{{ states.sensor.humidity }}", self.hass).render()
+        self.assertNotIn('sensor.humidity', info.entities)
+
+        info = self.render_to_info("{{ 1 + }}")
+        self.assertIsInstance(info.exception, TemplateError)
+        with self.assertRaises(TemplateError):
+            info.result()
+
     def test_referring_states_by_entity_id(self):
         """Test referring states by entity id."""
         self.hass.states.set('test.object', 'happy')
@@ -109,6 +109,7 @@ class TestCheckConfig(unittest.TestCase):
                     'discovery': False,
                     'discovery_prefix': 'homeassistant',
                     'tls_version': 'auto',
+                    'event_loop': False,
                 },
                  'light': [],
                  'group': None},
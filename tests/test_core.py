@@ -1,6 +1,7 @@
 """Test to verify that Home Assistant core works."""
 # pylint: disable=protected-access
 import asyncio
+import json
 import logging
 import os
 import unittest
@@ -19,7 +20,10 @@ from homeassistant.util.unit_system import (METRIC_SYSTEM)
 from homeassistant.const import (
     __version__, EVENT_STATE_CHANGED, ATTR_FRIENDLY_NAME, CONF_UNIT_SYSTEM,
     ATTR_NOW, EVENT_TIME_CHANGED, EVENT_HOMEASSISTANT_STOP,
-    EVENT_HOMEASSISTANT_CLOSE, EVENT_SERVICE_REGISTERED, EVENT_SERVICE_REMOVED)
+    EVENT_HOMEASSISTANT_CLOSE, EVENT_SERVICE_REGISTERED, EVENT_SERVICE_REMOVED,
+    MATCH_ALL)
+
+from homeassistant.remote import JSONEncoder
 
 from tests.common import get_test_home_assistant
 
@@ -92,6 +96,52 @@ def test_async_run_job_delegates_non_async():
     assert len(hass.async_add_job.mock_calls) == 1
 
 
+def test_hass_job_type():
+    """Test that the job type is determined once at creation."""
+    @ha.callback
+    def callback_job():
+        pass
+
+    @asyncio.coroutine
+    def coroutine_job():
+        pass
+
+    def executor_job():
+        pass
+
+    assert ha.HassJob(callback_job).job_type == ha.HassJobType.Callback
+    assert ha.HassJob(coroutine_job).job_type == \
+        ha.HassJobType.Coroutinefunction
+    assert ha.HassJob(executor_job).job_type == ha.HassJobType.Executor
+
+    with pytest.raises(ValueError):
+        ha.HassJob(coroutine_job())
+
+
+def test_async_add_hass_job_schedule_callback():
+    """Test that we schedule callbacks without checking the target."""
+    hass = MagicMock()
+    job = MagicMock()
+
+    ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(ha.callback(job)))
+    assert len(hass.loop.call_soon.mock_calls) == 1
+    assert len(hass.loop.create_task.mock_calls) == 0
+    assert len(hass.loop.run_in_executor.mock_calls) == 0
+
+
+def test_async_add_hass_job_add_threaded_job_to_pool():
+    """Test that we add executor jobs to the job pool."""
+    hass = MagicMock()
+
+    def job():
+        pass
+
+    ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(job))
+    assert len(hass.loop.call_soon.mock_calls) == 0
+    assert len(hass.loop.create_task.mock_calls) == 0
+    assert len(hass.loop.run_in_executor.mock_calls) == 1
+
+
 def test_stage_shutdown():
     """Simulate a shutdown, test calling stuff."""
     hass = get_test_home_assistant()
@@ -267,6 +317,29 @@ class TestEvent(unittest.TestCase):
         }
         self.assertEqual(expected, event.as_dict())
 
+    def test_as_json(self):
+        """Test the memoized JSON representation."""
+        now = dt_util.utcnow()
+        state = ha.State('light.kitchen', 'on', {'brightness': 144})
+        event = ha.Event(EVENT_STATE_CHANGED, {
+            'entity_id': 'light.kitchen',
+            'new_state': state,
+        }, ha.EventOrigin.local, now)
+
+        self.assertEqual(json.loads(json.dumps(event, cls=JSONEncoder)),
+                         json.loads(event.as_json()))
+        self.assertEqual(json.loads(json.dumps(event.data, cls=JSONEncoder)),
+                         json.loads(event.data_as_json()))
+        self.assertIs(event.as_json(), event.as_json())
+        self.assertIn(state.as_json(), event.as_json())
+
+    def test_as_json_non_string_keys(self):
+        """Test the JSON representation of data with non string keys."""
+        event = ha.Event('some_type', {1: 'one', 'two': None})
+
+        self.assertEqual({'1': 'one', 'two': None},
+                         json.loads(event.data_as_json()))
+
 
 class TestEventBus(unittest.TestCase):
     """Test EventBus methods."""
@@ -300,6 +373,35 @@ class TestEventBus(unittest.TestCase):
         # Should do nothing now
         unsub()
 
+    def test_dispatch_cache_follows_listeners(self):
+        """Test listening and removing listeners updates the dispatch."""
+        calls = []
+
+        @ha.callback
+        def listener(event):
+            """Mock listener."""
+            calls.append(event.event_type)
+
+        self.bus.fire('test')
+        self.hass.block_till_done()
+
+        unsub = self.bus.listen('test', listener)
+        unsub_all = self.bus.listen(MATCH_ALL, listener)
+
+        self.bus.fire('test')
+        self.hass.block_till_done()
+        assert calls == ['test', 'test']
+
+        unsub_all()
+        self.bus.fire('test')
+        self.hass.block_till_done()
+        assert calls == ['test', 'test', 'test']
+
+        unsub()
+        self.bus.fire('test')
+        self.hass.block_till_done()
+        assert calls == ['test', 'test', 'test']
+
     def test_unsubscribe_listener(self):
         """Test unsubscribe listener from returned function."""
         calls = []
@@ -454,6 +556,36 @@ class TestState(unittest.TestCase):
         self.assertIsNone(ha.State.from_dict({'state': 'yes'}))
         self.assertIsNone(ha.State.from_dict({'entity_id': 'yes'}))
 
+    def test_immutable(self):
+        """Test that a state can not be changed."""
+        attributes = {'brightness': 144}
+        state = ha.State('happy.happy', 'on', attributes)
+
+        with self.assertRaises(AttributeError):
+            state.state = 'off'
+
+        with self.assertRaises(TypeError):
+            state.attributes['brightness'] = 0
+
+        attributes['brightness'] = 0
+        self.assertEqual(144, state.attributes['brightness'])
+
+    def test_as_json(self):
+        """Test the memoized JSON representation."""
+        state = ha.State('happy.happy', 'on', {'brightness': 144,
+                                               'rgb': (255, 0, 0)})
+
+        self.assertEqual(json.loads(json.dumps(state, cls=JSONEncoder)),
+                         json.loads(state.as_json()))
+        self.assertEqual({'brightness': 144, 'rgb': [255, 0, 0]},
+                         json.loads(state.attributes_as_json()))
+        self.assertIs(state.as_json(), state.as_json())
+        self.assertEqual(
+            ha.State('happy.happy', 'on', {'brightness': 144,
+                                           'rgb': [255, 0, 0]},
+                     state.last_changed, state.last_updated),
+            ha.State.from_dict(json.loads(state.as_json())))
+
     def test_repr(self):
         """Test state.repr."""
         self.assertEqual("<state happy.happy=on @ 1984-12-08T12:00:00+00:00>",
@@ -490,6 +622,21 @@ class TestStateMachine(unittest.TestCase):
         self.assertFalse(self.states.is_state('light.Bowl', 'off'))
         self.assertFalse(self.states.is_state('light.Non_existing', 'on'))
 
+    def test_set_shares_unchanged_attributes(self):
+        """Test setting equal attributes reuses the previous mapping."""
+        self.states.set('light.Bowl', 'on', {'brightness': 100})
+        old_state = self.states.get('light.Bowl')
+
+        self.states.set('light.Bowl', 'off', {'brightness': 100})
+        new_state = self.states.get('light.Bowl')
+
+        self.assertEqual('off', new_state.state)
+        self.assertIs(old_state.attributes, new_state.attributes)
+
+        self.states.set('light.Bowl', 'off', {'brightness': 50})
+        self.assertEqual(
+            50, self.states.get('light.Bowl').attributes['brightness'])
+
     def test_is_state_attr(self):
         """Test is_state_attr method."""
         self.states.set("light.Bowl", "on", {"brightness": 100})
@@ -164,3 +164,88 @@ class TestDateUtil(unittest.TestCase):
 
         diff = dt_util.now() - timedelta(minutes=365*60*24)
         self.assertEqual(dt_util.get_age(diff), "1 year")
+
+    def test_parse_time_expression(self):
+        """Test parse_time_expression."""
+        self.assertEqual(list(range(60)),
+                         dt_util.parse_time_expression(None, 0, 59))
+        self.assertEqual(list(range(60)),
+                         dt_util.parse_time_expression('*', 0, 59))
+        self.assertEqual(list(range(0, 60, 5)),
+                         dt_util.parse_time_expression('/5', 0, 59))
+        self.assertEqual([1, 2, 3],
+                         dt_util.parse_time_expression([2, 1, 3, 99], 0, 59))
+        self.assertEqual([42], dt_util.parse_time_expression(42, 0, 59))
+        self.assertEqual([], dt_util.parse_time_expression('/two', 0, 59))
+        self.assertEqual([], dt_util.parse_time_expression('/0', 0, 59))
+
+    def test_find_next_time_expression_time(self):
+        """Test find_next_time_expression_time."""
+        def find(now, second=None, minute=None, hour=None, day=None):
+            """Find the next time for an expression."""
+            return dt_util.find_next_time_expression_time(
+                now, dt_util.parse_time_expression(second, 0, 59),
+                dt_util.parse_time_expression(minute, 0, 59),
+                dt_util.parse_time_expression(hour, 0, 23),
+                dt_util.parse_time_expression(day, 1, 31),
+                dt_util.parse_time_expression(None, 1, 12),
+                dt_util.parse_time_expression(None, 1970, 2100))
+
+        now = datetime(2017, 1, 31, 23, 59, 30, tzinfo=dt_util.UTC)
+
+        self.assertEqual(now, find(now))
+        self.assertEqual(now + timedelta(seconds=1),
+                         find(now + timedelta(microseconds=1)))
+        self.assertEqual(datetime(2017, 2, 1, 0, 0, 0, tzinfo=dt_util.UTC),
+                         find(now, second=0))
+        self.assertEqual(datetime(2017, 3, 31, 0, 0, 0, tzinfo=dt_util.UTC),
+                         find(now, second=0, minute=0, hour=0, day=31))
+        self.assertIsNone(find(now, hour=24))
+        self.assertIsNone(find(now, second='/0'))
+
+    def test_find_next_time_expression_time_dst(self):
+        """Test find_next_time_expression_time across DST transitions."""
+        tz = dt_util.get_time_zone('Europe/Vienna')
+        hours = dt_util.parse_time_expression(2, 0, 23)
+        minutes = dt_util.parse_time_expression(30, 0, 59)
+        seconds = dt_util.parse_time_expression(0, 0, 59)
+        days = dt_util.parse_time_expression(None, 1, 31)
+        months = dt_util.parse_time_expression(None, 1, 12)
+        years = dt_util.parse_time_expression(None, 1970, 2100)
+
+        def find(now):
+            """Find the next 02:30:00 in Vienna."""
+            return dt_util.find_next_time_expression_time(
+                now, seconds, minutes, hours, days, months, years)
+
+        # Spring forward: 02:30 does not exist on 2017-03-26
+        self.assertEqual(
+            tz.localize(datetime(2017, 3, 27, 2, 30, 0)),
+            find(tz.localize(datetime(2017, 3, 26, 1, 0, 0))))
+
+        # Fall back: 02:30 exists twice on 2017-10-29, pick the first one
+        self.assertEqual(
+            tz.localize(datetime(2017, 10, 29, 2, 30, 0), is_dst=True),
+            find(tz.localize(datetime(2017, 10, 29, 1, 0, 0))))
+
+        # Within the second 02:xx hour, the first 02:30 has passed
+        self.assertEqual(
+            tz.localize(datetime(2017, 10, 29, 2, 30, 0), is_dst=False),
+            find(tz.localize(datetime(2017, 10, 29, 2, 10, 0), is_dst=False)))
+
+    def test_find_next_time_expression_time_repeated_hour(self):
+        """Test that times in a repeated hour are not in the past."""
+        tz = dt_util.get_time_zone('Europe/Vienna')
+        now = datetime(2017, 10, 29, 1, 0, 3, tzinfo=dt_util.UTC) \
+            .astimezone(tz)
+
+        found = dt_util.find_next_time_expression_time(
+            now, dt_util.parse_time_expression(0, 0, 59),
+            dt_util.parse_time_expression('/5', 0, 59),
+            dt_util.parse_time_expression(None, 0, 23),
+            dt_util.parse_time_expression(None, 1, 31),
+            dt_util.parse_time_expression(None, 1, 12),
+            dt_util.parse_time_expression(None, 1970, 2100))
+
+        self.assertEqual(
+            datetime(2017, 10, 29, 1, 5, 0, tzinfo=dt_util.UTC), found)